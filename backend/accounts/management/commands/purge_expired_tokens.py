@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts import tokens
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete the expired JWTs of the blacklist tables (OutstandingToken, "
+        "BlacklistedToken) in short batches. Run it from cron, or as a worker with --loop."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=tokens.BATCH_SIZE)
+        parser.add_argument("--pause", type=float, default=0.0, help="Seconds to sleep between batches.")
+        parser.add_argument("--loop", action="store_true", help="Keep purging.")
+        parser.add_argument("--interval", type=float, default=3600.0, help="Seconds between runs with --loop.")
+
+    def handle(self, *args, **options):
+        while True:
+            purged = tokens.purge_expired(batch_size=options["batch_size"], pause=options["pause"])
+            self.stdout.write(self.style.SUCCESS(f"Purged {purged} expired tokens."))
+            if not options["loop"]:
+                return
+            time.sleep(options["interval"])
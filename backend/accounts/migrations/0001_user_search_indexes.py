@@ -0,0 +1,39 @@
+from django.db import migrations
+
+# Case-insensitive prefix search of the user list (username__istartswith,
+# email__istartswith) runs UPPER(column::text) LIKE 'PREFIX%'. Only an index on
+# that expression with text_pattern_ops can serve it. PostgreSQL only: SQLite
+# doesn't use indexes for LIKE.
+INDEXES = {
+    'auth_user_username_upper_like': 'username',
+    'auth_user_email_upper_like': 'email',
+}
+
+
+def create(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, column in INDEXES.items():
+        schema_editor.execute(
+            f'CREATE INDEX CONCURRENTLY IF NOT EXISTS "{name}" ON "auth_user" (UPPER("{column}"::text) text_pattern_ops)'
+        )
+
+
+def drop(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name in INDEXES:
+        schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS "{name}"')
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.RunPython(create, drop),
+    ]
@@ -0,0 +1,31 @@
+from django.db import migrations
+
+# The expired-token purge (accounts/tokens.py) scans token_blacklist_outstandingtoken
+# by expires_at, a third-party table without an index on it.
+INDEX = 'outstandingtoken_expires_idx'
+
+
+def create(apps, schema_editor):
+    concurrently = 'CONCURRENTLY ' if schema_editor.connection.vendor == 'postgresql' else ''
+    schema_editor.execute(
+        f'CREATE INDEX {concurrently}IF NOT EXISTS "{INDEX}" ON "token_blacklist_outstandingtoken" ("expires_at")'
+    )
+
+
+def drop(apps, schema_editor):
+    concurrently = 'CONCURRENTLY ' if schema_editor.connection.vendor == 'postgresql' else ''
+    schema_editor.execute(f'DROP INDEX {concurrently}IF EXISTS "{INDEX}"')
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('accounts', '0001_user_search_indexes'),
+        ('token_blacklist', '0012_alter_outstandingtoken_user'),
+    ]
+
+    operations = [
+        migrations.RunPython(create, drop),
+    ]
@@ -19,3 +19,38 @@ class IsAdminOrEditor(BasePermission):
             request.user.is_authenticated and 
             request.user.groups.filter(name__in=['Administrators', 'Editors']).exists()
         )
+
+
+def _level_for(group_names):
+    if "Administrators" in group_names:
+        return "admin"
+    if "Editors" in group_names:
+        return "editor"
+    return "user"
+
+
+def permission_level(user):
+    """
+    Coarse permission level of a user ('admin', 'editor', 'user' or 'anonymous').
+    The result is memoised on the user object so it costs one query per request at most.
+    """
+    if not user or not user.is_authenticated:
+        return "anonymous"
+    level = getattr(user, "_permission_level", None)
+    if level is None:
+        level = _level_for(set(user.groups.values_list("name", flat=True)))
+        user._permission_level = level
+    return level
+
+
+async def apermission_level(user):
+    """
+    Async version of permission_level, for the ASGI views.
+    """
+    if not user or not user.is_authenticated:
+        return "anonymous"
+    level = getattr(user, "_permission_level", None)
+    if level is None:
+        level = _level_for({name async for name in user.groups.values_list("name", flat=True)})
+        user._permission_level = level
+    return level
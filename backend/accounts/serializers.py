@@ -4,7 +4,19 @@ from rest_framework import serializers
 from django.contrib.auth.models import User, Group
 from django.contrib.auth.password_validation import validate_password
 from rest_framework.validators import UniqueValidator
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenObtainSerializer
+from rest_framework_simplejwt.settings import api_settings
+from django.contrib.auth.models import update_last_login
+
+from core import deferred
+
+
+def group_names(user):
+    """The user's group names in pk order (the first one is its role), queried once per user instance."""
+    if not hasattr(user, '_group_names'):
+        user._group_names = list(user.groups.order_by('pk').values_list('name', flat=True))
+    return user._group_names
+
 
 class GroupSerializer(serializers.ModelSerializer):
     class Meta:
@@ -72,11 +84,22 @@ class UserLoginSerializer(serializers.Serializer):
 
 class UserRoleSerializer(serializers.Serializer):
     group_name = serializers.CharField(max_length=100)
+    action = serializers.ChoiceField(choices=['add', 'remove'])
 
 class MyTokenObtainPairSerializer(TokenObtainPairSerializer):
+    def validate(self, attrs):
+        # TokenObtainPairSerializer.validate, with the last_login write deferred
+        data = TokenObtainSerializer.validate(self, attrs)  # authenticates self.user
+        refresh = self.get_token(self.user)
+        data['refresh'] = str(refresh)
+        data['access'] = str(refresh.access_token)
+        if api_settings.UPDATE_LAST_LOGIN:
+            deferred.defer(self.context.get('request'), update_last_login, None, self.user)
+        return data
+
     @classmethod
     def get_token(cls, user):
         token = super().get_token(user)
         # Add user's group names to the token
-        token['groups'] = list(user.groups.values_list('name', flat=True))
+        token['groups'] = group_names(user)
         return token
\ No newline at end of file
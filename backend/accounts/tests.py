@@ -1,3 +1,135 @@
-from django.test import TestCase
+import datetime
 
-# Create your tests here.
+from django.contrib.auth.models import Group, User
+from django.core.signals import request_finished
+from django.db import close_old_connections, connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+from core.benchmarks import ACCOUNTS_SCENARIOS, BenchmarkContext, routes_of
+from core import deferred
+from core.factories import make_user, seed
+from core.middleware import DeferredCallsMiddleware
+from core.models import AuditLog
+from core.tests import FAST_HASHERS, run_budget_scenarios
+
+from . import tokens, urls as accounts_urls
+from .views import MyTokenObtainPairView
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS, DATABASE_ROUTERS=[])
+class AccountEndpointQueryBudgetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed(5)
+
+    def setUp(self):
+        self.ctx = BenchmarkContext()
+
+    def test_every_route_has_a_scenario(self):
+        covered = {scenario.route for scenario in ACCOUNTS_SCENARIOS}
+        self.assertEqual(routes_of(accounts_urls.urlpatterns) - covered, set())
+
+    def test_query_budgets(self):
+        run_budget_scenarios(self, ACCOUNTS_SCENARIOS)
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS, DATABASE_ROUTERS=[])
+class UserListTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed(1)
+
+    def setUp(self):
+        self.ctx = BenchmarkContext()
+        editors = Group.objects.get(name="Editors")
+        for n in range(30):
+            user = User.objects.create(username=f"staff{n:02d}", email=f"person{n:02d}@example.com")
+            user.groups.add(editors)
+
+    def get(self, url):
+        return self.client.get(url, **self.ctx.headers("admin"))
+
+    def test_pages_cost_the_same_queries_whatever_their_size(self):
+        with CaptureQueriesContext(connection) as small:
+            self.get("/api/accounts/users/?page_size=2")
+        with CaptureQueriesContext(connection) as large:
+            page = self.get("/api/accounts/users/?page_size=25").json()
+        self.assertEqual(len(large), len(small))
+        self.assertEqual(page["results"][0]["username"], "bench-admin")
+        self.assertEqual(page["results"][2]["groups"], ["Editors"])
+
+    def test_cursor_walks_every_user_once(self):
+        url, seen = "/api/accounts/users/?page_size=7", []
+        while url:
+            page = self.get(url).json()
+            seen += [user["username"] for user in page["results"]]
+            url = page["next"]
+        self.assertEqual(seen, sorted(User.objects.values_list("username", flat=True)))
+
+    def test_search_matches_username_or_email_prefix(self):
+        by_name = self.get("/api/accounts/users/?search=STAFF1").json()["results"]
+        self.assertEqual([user["username"] for user in by_name], [f"staff{n}" for n in range(10, 20)])
+        by_email = self.get("/api/accounts/users/?search=person05").json()["results"]
+        self.assertEqual([user["username"] for user in by_email], ["staff05"])
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class LoginTests(TestCase):
+    def setUp(self):
+        self.user = make_user("shift-clerk", "Editors", "pass-123")
+
+    def test_audit_and_last_login_are_written_after_the_response(self):
+        request = RequestFactory().post("/api/accounts/login/", {"username": "shift-clerk", "password": "pass-123"},
+                                        content_type="application/json")
+        response = DeferredCallsMiddleware(MyTokenObtainPairView.as_view())(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(AuditLog.objects.exists())
+        self.user.refresh_from_db()
+        self.assertIsNone(self.user.last_login)
+
+        # What the server does once the body is sent. As in Django's test client,
+        # request_finished must not close the test's connection.
+        request_finished.disconnect(close_old_connections)
+        try:
+            response.close()
+        finally:
+            request_finished.connect(close_old_connections)
+        self.user.refresh_from_db()
+        self.assertIsNotNone(self.user.last_login)
+        audit = AuditLog.objects.get()
+        self.assertEqual((audit.action, audit.user, audit.role), ("LOGIN", "shift-clerk", "Editors"))
+
+    def test_a_failing_deferred_call_does_not_stop_the_others(self):
+        done = []
+        with self.assertLogs("core.deferred", "ERROR"):
+            deferred.run([lambda: 1 / 0, lambda: done.append(True)])
+        self.assertEqual(done, [True])
+
+
+class TokenPurgeTests(TestCase):
+    def setUp(self):
+        user = make_user("refresher")
+        now = timezone.now()
+        for n in range(7):
+            expires = now + datetime.timedelta(hours=n - 4, minutes=30)  # four expired, three valid
+            token = OutstandingToken.objects.create(user=user, jti=f"jti-{n}", token="t", expires_at=expires)
+            if n % 2:
+                BlacklistedToken.objects.create(token=token)
+
+    def test_purges_expired_tokens_in_batches(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(tokens.purge_expired(batch_size=3), 4)
+        statements = [q["sql"] for q in queries if not q["sql"].startswith(("SAVEPOINT", "RELEASE"))]
+        self.assertEqual(len(statements), 2 * 4 + 1)  # per batch: ids, rows, blacklist and token deletes
+        self.assertTrue(all(expires > timezone.now() for expires in OutstandingToken.objects.values_list("expires_at", flat=True)))
+        self.assertEqual(OutstandingToken.objects.count(), 3)
+        self.assertEqual(BlacklistedToken.objects.count(), 1)
+
+    @override_settings(METRICS_ALLOWED_IPS=[])
+    def test_metrics_report_the_table_sizes(self):
+        body = self.client.get("/metrics").content.decode()
+        self.assertIn('db_table_rows{table="token_blacklist_outstandingtoken"} 7', body)
+        self.assertIn('db_table_rows{table="token_blacklist_blacklistedtoken"} 3', body)
@@ -0,0 +1,109 @@
+# backend/accounts/tokens.py
+"""
+Maintenance of the JWT blacklist tables.
+
+With ROTATE_REFRESH_TOKENS and BLACKLIST_AFTER_ROTATION every refresh adds an
+OutstandingToken row, and a BlacklistedToken row for the token it replaces.
+Once a token has expired neither row is of any use: the token fails its
+expiry check before the blacklist is consulted.
+
+``purge_expired()`` deletes them in batches of BATCH_SIZE, each in its own short
+transaction. It finds them through the expires_at index (accounts migration
+0002) and skips the rows another purger has locked. It runs from the
+``purge_expired_tokens`` command, or from a thread of each server process when
+TOKEN_PURGE_INTERVAL is set: the ASGI and WSGI entry points start it, so
+management commands, workers and tests never do.
+
+``table_sizes`` adds the size of both tables to /metrics.
+"""
+
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+from core.metrics import register_collector
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+TABLES = (OutstandingToken._meta.db_table, BlacklistedToken._meta.db_table)
+
+
+def purge_expired(batch_size=BATCH_SIZE, pause=0.0, now=None):
+    """
+    Delete the tokens that expired before ``now`` and their blacklist entries,
+    sleeping ``pause`` seconds between batches. Returns the number of tokens deleted.
+    """
+    now = now or timezone.now()
+    deleted = 0
+    while True:
+        with transaction.atomic():
+            ids = list(
+                OutstandingToken.objects.select_for_update(skip_locked=True)
+                .filter(expires_at__lte=now).order_by("expires_at").values_list("pk", flat=True)[:batch_size]
+            )
+            if not ids:
+                return deleted
+            # Cascades to their BlacklistedToken rows
+            deleted += OutstandingToken.objects.filter(pk__in=ids).delete()[1].get(OutstandingToken._meta.label, 0)
+        if pause:
+            time.sleep(pause)
+
+
+def _purge_forever(interval):
+    while True:
+        time.sleep(interval)
+        try:
+            purged = purge_expired()
+            if purged:
+                logger.info("Purged %d expired tokens", purged)
+        except DatabaseError:
+            logger.exception("Purging expired tokens failed")
+        finally:
+            connection.close()  # this thread's connection; don't hold it between runs
+
+
+def start_purge_thread(interval):
+    thread = threading.Thread(target=_purge_forever, args=(interval,), name="token-purge", daemon=True)
+    thread.start()
+    return thread
+
+
+def start_server_purging():
+    """Start the purge thread of a server process, if TOKEN_PURGE_INTERVAL is set (backend/asgi.py, wsgi.py)."""
+    if settings.TOKEN_PURGE_INTERVAL:
+        return start_purge_thread(settings.TOKEN_PURGE_INTERVAL)
+    return None
+
+
+@register_collector
+def table_sizes():
+    """Rows (and bytes, on PostgreSQL) of the blacklist tables; estimated rows on PostgreSQL."""
+    try:
+        with connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                cursor.execute(
+                    "SELECT relname, GREATEST(reltuples, 0)::bigint, pg_total_relation_size(oid) FROM pg_class "
+                    "WHERE relkind = 'r' AND relname = ANY(%s) AND pg_table_is_visible(oid)",
+                    [list(TABLES)],
+                )
+                sizes = cursor.fetchall()
+            else:
+                sizes = []
+                for table in TABLES:
+                    cursor.execute(f"SELECT COUNT(*) FROM {connection.ops.quote_name(table)}")
+                    sizes.append((table, cursor.fetchone()[0], None))
+    except DatabaseError:
+        logger.warning("Could not read the token table sizes", exc_info=True)
+        return []
+    metrics = [("db_table_rows", "gauge", "Rows in the table (estimated on PostgreSQL).",
+                [({"table": table}, rows) for table, rows, _ in sizes])]
+    if any(size is not None for _, _, size in sizes):
+        metrics.append(("db_table_bytes", "gauge", "Size of the table with its indexes and TOAST data.",
+                        [({"table": table}, size) for table, _, size in sizes]))
+    return metrics
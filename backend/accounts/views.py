@@ -1,18 +1,21 @@
 # backend/accounts/views.py
 
 from rest_framework import generics, status
+from rest_framework.pagination import CursorPagination
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth.models import User, Group
+from django.db.models import Q
 from django.contrib.auth import authenticate, login, logout
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenBlacklistView
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from core import deferred
 from core.views import log_audit
-from django.contrib.auth import get_user_model
 from accounts.permissions import IsAdministrator, IsAdminOrEditor
 # Import the new GroupSerializer
-from .serializers import UserSerializer, UserLoginSerializer, UserRoleSerializer, GroupSerializer, MyTokenObtainPairSerializer
+from .serializers import UserSerializer, UserLoginSerializer, UserRoleSerializer, GroupSerializer, MyTokenObtainPairSerializer, group_names
 #below new imports
 """from django.contrib.auth.models import User
 from django.core.mail import send_mail
@@ -88,21 +91,42 @@ class UserLogoutView(APIView):
             return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
 
+class UserCursorPagination(CursorPagination):
+    """
+    Pages of users in username order. The cursor seeks past the last username
+    of the previous page, so deep pages cost the same as the first one.
+    """
+    ordering = 'username'
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+
 class UserListCreateView(generics.ListCreateAPIView):
     """
     API endpoint for listing all users and creating new users.
     Only accessible by admin users.
+    ?search= keeps the users whose username or email starts with it
+    (case-insensitive; indexed by accounts migration 0001).
     """
-    queryset = User.objects.all().order_by('username')
+    queryset = User.objects.prefetch_related('groups').order_by('username')
     serializer_class = UserSerializer
     permission_classes = [IsAdministrator]
+    pagination_class = UserCursorPagination
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        search = self.request.query_params.get('search', '').strip()
+        if search:
+            queryset = queryset.filter(Q(username__istartswith=search) | Q(email__istartswith=search))
+        return queryset
 
 class UserDetailView(generics.RetrieveUpdateDestroyAPIView):
     """
     API endpoint for retrieving, updating, or deleting a single user.
     Only accessible by admin users.
     """
-    queryset = User.objects.all()
+    queryset = User.objects.prefetch_related('groups')
     serializer_class = UserSerializer
     permission_classes = [IsAdministrator]
     lookup_field = 'pk'
@@ -131,14 +155,15 @@ class UserRoleManagementView(APIView):
         except Group.DoesNotExist:
             return Response({"detail": f"Group '{group_name}' not found."}, status=status.HTTP_404_NOT_FOUND)
 
+        in_group = user.groups.filter(pk=group.pk).exists()
         if action == 'add':
-            if group not in user.groups.all(): # Prevent adding same group multiple times
+            if not in_group: # Prevent adding same group multiple times
                 user.groups.add(group)
                 message = f"User '{user.username}' added to group '{group_name}'."
             else:
                 message = f"User '{user.username}' is already in group '{group_name}'."
         elif action == 'remove':
-            if group in user.groups.all(): # Prevent removing non-existent group
+            if in_group: # Prevent removing non-existent group
                 user.groups.remove(group)
                 message = f"User '{user.username}' removed from group '{group_name}'."
             else:
@@ -159,15 +184,22 @@ class GroupListView(generics.ListAPIView):
     permission_classes = [IsAdministrator]
 
 class MyTokenObtainPairView(TokenObtainPairView):
+    """
+    JWT login. The user authenticated by the serializer and its group names are
+    reused for the audit role; the audit and last_login writes run after the
+    response is sent (core/deferred.py).
+    """
     def post(self, request, *args, **kwargs):
-        response = super().post(request, *args, **kwargs)
-        if response.status_code == 200:
-            username = request.data.get("username")
-            User = get_user_model()
-            user_obj = User.objects.filter(username=username).first()
-            role = user_obj.groups.first().name if user_obj and user_obj.groups.exists() else "User"
-            log_audit(request, "LOGIN", f"User {username} logged in.", username=username, role=role)
-        return response
+        serializer = self.get_serializer(data=request.data)
+        try:
+            serializer.is_valid(raise_exception=True)
+        except TokenError as e:
+            raise InvalidToken(e.args[0])
+        username = serializer.user.get_username()
+        groups = group_names(serializer.user)
+        role = groups[0] if groups else "User"
+        deferred.defer(request, log_audit, request, "LOGIN", f"User {username} logged in.", username=username, role=role)
+        return Response(serializer.validated_data, status=status.HTTP_200_OK)
 
 class MyTokenBlacklistView(TokenBlacklistView):
     def post(self, request, *args, **kwargs):
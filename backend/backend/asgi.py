@@ -5,6 +5,11 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
+
+Serve it with uvicorn (directly or as a gunicorn worker) to get the async
+endpoints under /api/async/, e.g.:
+
+    gunicorn backend.asgi:application -k uvicorn.workers.UvicornWorker
 """
 
 import os
@@ -14,3 +19,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 
 application = get_asgi_application()
+
+# Server processes only: not started by manage.py commands, workers or tests
+from accounts.tokens import start_server_purging  # noqa: E402
+
+start_server_purging()
@@ -41,6 +41,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.RequestProfilingMiddleware',  # Only active with PROFILING_ENABLED
+    'core.middleware.DeferredCallsMiddleware',  # Deferred writes run after the response is sent
+    'core.middleware.RequestMetricsMiddleware',  # Times everything below
+    'core.middleware.CompressionMiddleware',  # Brotli/gzip; before anything that reads the body
     'corsheaders.middleware.CorsMiddleware',  # Must come before CommonMiddleware
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -49,6 +53,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.middleware.ReplicaRoutingMiddleware',
 ]
 
 ROOT_URLCONF = 'backend.urls'
@@ -79,7 +84,154 @@ DATABASES = {
         'PASSWORD': 'Postgree',
         'HOST': 'localhost',
         'PORT': '5432',
+    },
+    # Streaming replica of 'default' used by the report and dashboard views
+    # (see core/routers.py). Without REPLICA_DB_* it points at the primary,
+    # so a single-database setup keeps working unchanged.
+    'replica': {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': os.environ.get('REPLICA_DB_NAME', 'fmsystem_db'),
+        'USER': os.environ.get('REPLICA_DB_USER', 'postgres'),
+        'PASSWORD': os.environ.get('REPLICA_DB_PASSWORD', 'Postgree'),
+        'HOST': os.environ.get('REPLICA_DB_HOST', 'localhost'),
+        'PORT': os.environ.get('REPLICA_DB_PORT', '5432'),
+        'TEST': {'MIRROR': 'default'},
+    },
+}
+
+DATABASE_ROUTERS = ['core.routers.PrimaryReplicaRouter']
+
+# Connection handling
+# With psycopg 3 and psycopg_pool installed every worker process keeps a bounded
+# pool per alias; once DB_POOL_MAX_SIZE connections are busy, further requests
+# wait up to DB_POOL_TIMEOUT seconds instead of opening new connections. Without
+# them, connections persist between requests and are health-checked before reuse.
+try:
+    import psycopg  # noqa: F401
+    import psycopg_pool  # noqa: F401
+    DB_POOL_AVAILABLE = True
+except ImportError:
+    DB_POOL_AVAILABLE = False
+
+for _db in DATABASES.values():
+    if DB_POOL_AVAILABLE:
+        _db['OPTIONS'] = {
+            'pool': {
+                'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', 2)),
+                'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', 20)),
+                'timeout': int(os.environ.get('DB_POOL_TIMEOUT', 10)),
+            },
+        }
+    else:
+        _db['CONN_MAX_AGE'] = int(os.environ.get('DB_CONN_MAX_AGE', 60))
+        _db['CONN_HEALTH_CHECKS'] = True
+
+# After a write, a client reads from the primary for this many seconds
+REPLICA_PIN_SECONDS = int(os.environ.get('REPLICA_PIN_SECONDS', 10))
+# The cache holding those pins. Every worker process must see it (DJANGO_CACHE_BACKEND
+# "redis", or "file" on a single host): with a separate replica a per-process
+# "locmem" cache is refused at startup.
+REPLICA_PIN_CACHE_ALIAS = os.environ.get('REPLICA_PIN_CACHE_ALIAS', 'default')
+
+# Cache
+# Backs the response cache of the read endpoints (core/cache.py).
+# DJANGO_CACHE_BACKEND: "locmem" (per process, default), "file" or "redis".
+# With several worker processes use "file" or "redis" so invalidations are shared.
+CACHE_BACKEND = os.environ.get('DJANGO_CACHE_BACKEND', 'locmem')
+if CACHE_BACKEND == 'redis':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ.get('DJANGO_CACHE_LOCATION', 'redis://127.0.0.1:6379/1'),
+        }
+    }
+elif CACHE_BACKEND == 'file':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('DJANGO_CACHE_LOCATION', str(BASE_DIR / 'cache')),
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'fmsystem',
+            'OPTIONS': {'MAX_ENTRIES': 5000},
+        }
     }
+
+RESPONSE_CACHE_ALIAS = 'default'
+RESPONSE_CACHE_TIMEOUT = int(os.environ.get('RESPONSE_CACHE_TIMEOUT', 300))  # seconds
+
+# Request metrics (core/metrics.py)
+# Fraction of requests timed and counted; 0 turns the instrumentation off.
+METRICS_SAMPLE_RATE = float(os.environ.get('METRICS_SAMPLE_RATE', 1.0))
+# Clients allowed to scrape /metrics; empty allows everyone.
+METRICS_ALLOWED_IPS = [ip for ip in os.environ.get('METRICS_ALLOWED_IPS', '127.0.0.1,::1').split(',') if ip]
+
+# Live dashboard stream (core/live.py): how often each process checks for changes,
+# and the idle interval between keep-alive comments.
+LIVE_POLL_SECONDS = float(os.environ.get('LIVE_POLL_SECONDS', 2))
+LIVE_HEARTBEAT_SECONDS = float(os.environ.get('LIVE_HEARTBEAT_SECONDS', 15))
+# How long a stream ticket (POST /api/live/ticket/) can wait before it's used.
+LIVE_TICKET_SECONDS = int(os.environ.get('LIVE_TICKET_SECONDS', 30))
+
+# Per-user token buckets (core/throttling.py): scope -> (burst capacity, tokens
+# refilled per second). A scope left out isn't throttled.
+THROTTLE_BUCKETS = {
+    'lookup': (60, 2.0),   # UPIN checks and record lookups
+    'report': (6, 0.1),    # full reports: six in a row, then one every 10 s
+    'upload': (20, 0.5),
+}
+# A cache shared by all workers (e.g. Redis) for one bucket per user across them;
+# None keeps the buckets in each process.
+THROTTLE_CACHE_ALIAS = os.environ.get('THROTTLE_CACHE_ALIAS') or None
+
+# Seconds between purges of expired JWTs by a thread of each server process, started
+# by backend/asgi.py and wsgi.py (accounts/tokens.py); 0 leaves it to
+# `manage.py purge_expired_tokens --loop`.
+TOKEN_PURGE_INTERVAL = float(os.environ.get('TOKEN_PURGE_INTERVAL', 0))
+
+# Full-text search of uploaded PDFs (core/fulltext.py): the text search configuration
+# of the tsvector column. 'simple' only lower-cases, which suits mixed Amharic and
+# English text; a language configuration also stems.
+FULLTEXT_CONFIG = os.environ.get('FULLTEXT_CONFIG', 'simple')
+
+# Incremental backups (core/backup.py): the store the files and snapshots are written to.
+# Put it on another disk or a mounted remote volume.
+BACKUP_ROOT = os.environ.get('BACKUP_ROOT', str(BASE_DIR / 'backups'))
+
+# Storage tiering (core/tiering.py): uploads nobody has read for this many days are
+# compressed by `manage.py tier_files`.
+TIER_COLD_AFTER_DAYS = int(os.environ.get('TIER_COLD_AFTER_DAYS', 60))
+
+# Response compression (core.middleware.CompressionMiddleware): smaller bodies are
+# sent as is; Brotli needs the brotli package, gzip is always available.
+COMPRESS_MIN_LENGTH = int(os.environ.get('COMPRESS_MIN_LENGTH', 200))
+BROTLI_QUALITY = int(os.environ.get('BROTLI_QUALITY', 5))
+
+# Request profiling (core/profiling.py), stored as RequestProfile rows in the admin.
+# Off by default; PROFILE_SAMPLE_RATE of the requests run under cProfile, and any
+# request slower than PROFILE_SLOW_REQUEST_MS is kept with a stack sample.
+PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', 'False') == 'True'
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 0.001))
+PROFILE_SLOW_REQUEST_MS = int(os.environ.get('PROFILE_SLOW_REQUEST_MS', 1000))
+PROFILE_SLOW_QUERY_MS = int(os.environ.get('PROFILE_SLOW_QUERY_MS', 100))  # EXPLAIN these
+PROFILE_STACK_INTERVAL_MS = int(os.environ.get('PROFILE_STACK_INTERVAL_MS', 5))
+PROFILE_MAX_ROWS = int(os.environ.get('PROFILE_MAX_ROWS', 500))
+
+# Logging
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'core': {'handlers': ['console'], 'level': os.environ.get('DJANGO_LOG_LEVEL', 'INFO')},
+    },
 }
 
 # Password validation
@@ -100,6 +252,18 @@ USE_TZ = True
 STATIC_URL = 'static/'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+# Uploads are served by core.views.media_file, which reads the compressed tier but
+# checks no credentials (the frontend links to files with plain URLs). Outside
+# DEBUG it only answers with SERVE_MEDIA set, behind a reverse proxy that restricts
+# MEDIA_URL to the archive's users. Otherwise the proxy serves MEDIA_ROOT itself,
+# and `tier_files` must not run: the proxy can't read compressed files.
+SERVE_MEDIA = os.environ.get('SERVE_MEDIA', '') == '1'
+
+STORAGES = {
+    # Uploads, with a compressed tier for the files nobody reads (core/storage.py)
+    'default': {'BACKEND': 'core.storage.TieredStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
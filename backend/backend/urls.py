@@ -2,7 +2,8 @@ from django.contrib import admin
 from django.urls import path, include  # ✅ Clean single import
 
 from django.conf import settings
-from django.conf.urls.static import static
+
+from core.views import media_file
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -11,5 +12,8 @@ urlpatterns = [
     path('api/accounts/', include('accounts.urls')),
 ]
 
-# ✅ This line allows you to serve uploaded files (like documents/images) during development
-urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+# Uploaded files, decompressed on the fly when kept in the compressed tier (core/storage.py).
+# Outside DEBUG only with SERVE_MEDIA, behind a proxy restricting access (settings.py).
+urlpatterns += [
+    path(f"{settings.MEDIA_URL.lstrip('/')}<path:name>", media_file, name='media-file'),
+]
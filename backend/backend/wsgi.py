@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 
 application = get_wsgi_application()
+
+# Server processes only: not started by manage.py commands, workers or tests
+from accounts.tokens import start_server_purging  # noqa: E402
+
+start_server_purging()
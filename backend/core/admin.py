@@ -1,8 +1,89 @@
 from django.contrib import admin
-from .models import AuditLog
+from django.utils.html import format_html, format_html_join
+from django.utils import timezone
+from .models import AuditLog, DuplicateCluster, Job, RequestProfile
 
 @admin.register(AuditLog)
 class AuditLogAdmin(admin.ModelAdmin):
     list_display = ("timestamp", "user", "action", "ip_address", "details")
     search_fields = ("user", "action", "details", "ip_address")
     list_filter = ("action", "timestamp")
+
+
+@admin.register(RequestProfile)
+class RequestProfileAdmin(admin.ModelAdmin):
+    list_display = ("created_at", "reason", "method", "path", "status_code", "duration_ms", "sql_count", "sql_ms")
+    search_fields = ("path", "view_name")
+    list_filter = ("reason", "view_name", "method")
+    exclude = ("profile", "queries")
+    readonly_fields = (
+        "created_at", "reason", "method", "path", "view_name", "status_code",
+        "duration_ms", "sql_count", "sql_ms", "profile_report", "sql_report",
+    )
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    @admin.display(description="Profile")
+    def profile_report(self, obj):
+        return format_html("<pre>{}</pre>", obj.profile)
+
+    @admin.display(description="SQL")
+    def sql_report(self, obj):
+        return format_html_join(
+            "", "<p><b>{} ms</b> ({})</p><pre>{}</pre><pre>{}</pre><pre>{}</pre>",
+            ((q["ms"], q.get("alias", ""), q["sql"], ", ".join(q["params"]), q["explain"]) for q in obj.queries),
+        )
+
+
+@admin.register(DuplicateCluster)
+class DuplicateClusterAdmin(admin.ModelAdmin):
+    list_display = ("created_at", "size", "score", "reasons", "status", "reviewed_by")
+    list_filter = ("status",)
+    readonly_fields = ("created_at", "size", "score", "reasons", "record_list", "reviewed_by")
+    exclude = ("records",)
+    actions = ("confirm", "dismiss")
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.display(description="Records")
+    def record_list(self, obj):
+        return format_html_join(
+            "", "<p>{} &middot; {} &middot; {} &middot; {} &middot; {}</p>",
+            ((r.UPIN, r.PropertyOwnerName, r.NationalId, r.PhoneNumber, r.ExistingArchiveCode)
+             for r in obj.records.order_by("pk")),
+        )
+
+    def save_model(self, request, obj, form, change):
+        obj.reviewed_by = request.user.username
+        super().save_model(request, obj, form, change)
+
+    def _review(self, request, queryset, status):
+        queryset.update(status=status, reviewed_by=request.user.username)
+
+    @admin.action(description="Confirm as duplicates")
+    def confirm(self, request, queryset):
+        self._review(request, queryset, DuplicateCluster.CONFIRMED)
+
+    @admin.action(description="Dismiss (not duplicates)")
+    def dismiss(self, request, queryset):
+        self._review(request, queryset, DuplicateCluster.DISMISSED)
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ("id", "task", "status", "attempts", "run_at", "created_by", "finished_at")
+    list_filter = ("status", "task")
+    readonly_fields = [field.name for field in Job._meta.fields]
+    actions = ("retry",)
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.action(description="Queue again")
+    def retry(self, request, queryset):
+        queryset.exclude(status=Job.RUNNING).update(status=Job.QUEUED, run_at=timezone.now(), attempts=0, worker="")
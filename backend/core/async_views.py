@@ -0,0 +1,248 @@
+# backend/core/async_views.py
+"""
+Async (ASGI) versions of the hot read endpoints.
+
+They return the same payloads as their counterparts in core/views.py but run on
+Django's async ORM, so one ASGI worker can keep hundreds of report requests in
+flight while they wait on PostgreSQL. DRF views are synchronous, so these are
+plain Django views that authenticate the JWT themselves.
+"""
+
+import math
+from datetime import timedelta
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.db.models import Count
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, AuthenticationFailed
+
+from accounts.permissions import apermission_level
+
+from . import live, throttling, vocab
+from .cache import cache_response
+from .models import Record, RecordFile, AuditLog
+from .renderers import negotiate
+from .routers import read_from_replica
+from .serializers import RecordSerializer, requested_fields
+
+
+def _json(data, status=200):
+    response = JsonResponse(data, status=status, safe=False)
+    response.data = data  # picked up by cache_response
+    return response
+
+
+async def _authenticate(request, ticket=False):
+    """
+    (user, expiry of the credentials as a timestamp or None), or (None, None).
+    With ``ticket``, a stream ticket (core/live.py) in ?ticket= also counts.
+    """
+    if ticket and 'ticket' in request.GET:
+        redeemed = await live.aredeem_ticket(request.GET['ticket'])
+        if redeemed is None:
+            return None, None
+        user_pk, expires_at = redeemed
+        user = await get_user_model().objects.filter(pk=user_pk, is_active=True).afirst()
+        return user, expires_at
+    try:
+        result = await sync_to_async(JWTAuthentication().authenticate)(request)
+    except (InvalidToken, AuthenticationFailed):
+        return None, None
+    if result is not None:
+        return result[0], result[1]['exp']
+    user = await request.auser()  # session login (browsable API, admin)
+    return (user, None) if user.is_authenticated else (None, None)
+
+
+def async_api_view(admin_only=False, throttle=None, ticket=False):
+    """
+    GET-only async endpoint with the same authentication rules as the sync API:
+    JWT or session, IsAuthenticated, and IsAdministrator when ``admin_only``.
+    ``throttle`` names the token bucket scope of the view (core/throttling.py).
+    ``ticket`` also accepts a stream ticket in the query string. The view finds
+    when the credentials expire in ``request.auth_expires_at``.
+    """
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return _json({"detail": f'Method "{request.method}" not allowed.'}, status=405)
+            user, expires_at = await _authenticate(request, ticket)
+            if user is None:
+                return _json({"detail": "Authentication credentials were not provided."}, status=401)
+            if admin_only and not await user.groups.filter(name="Administrators").aexists():
+                return _json({"detail": "You do not have permission to perform this action."}, status=403)
+            request.user, request.auth_expires_at = user, expires_at
+            if throttle:
+                wait = await throttling.acheck(throttle, throttling.client_ident(request, request.META.get('REMOTE_ADDR')))
+                if wait:
+                    response = _json({"detail": f"Request was throttled. Expected available in {math.ceil(wait)} seconds."},
+                                     status=429)
+                    response['Retry-After'] = str(math.ceil(wait))
+                    return response
+            return await view(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def compact_formats(view):
+    """
+    Re-render the payload of ``view`` as columnar JSON or MessagePack when the
+    client asks for it (core/renderers.py). Goes above ``cache_response``.
+    """
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        response = await view(request, *args, **kwargs)
+        renderer = negotiate(request)
+        data = getattr(response, 'data', None)
+        if type(renderer) is JSONRenderer or data is None:
+            return response
+        return HttpResponse(renderer.render(data), status=response.status_code, content_type=renderer.media_type)
+    return wrapper
+
+
+async def _serialize_records(request, queryset):
+    # Files are prefetched and labels cached, so serialization below never touches the database.
+    # ?fields= and ?exclude= narrow the columns read as well as the output.
+    options = requested_fields(request)
+    queryset = RecordSerializer.narrow(queryset.prefetch_related('files'), **options)
+    records = [record async for record in queryset]
+    serializer = RecordSerializer(records, many=True, **options)
+    await sync_to_async(vocab.warm_records)(records, serializer.child.fields)
+    return serializer.data
+
+
+# Search by UPIN or File Code
+@async_api_view(throttle='lookup')
+@compact_formats
+@cache_response(Record, RecordFile)
+async def record_search(request):
+    upin = request.GET.get('UPIN')
+    file_code = request.GET.get('ExistingArchiveCode')
+
+    if upin:
+        records = Record.objects.filter(UPIN=upin)
+    elif file_code:
+        records = Record.objects.filter(ExistingArchiveCode=file_code)
+    else:
+        return _json({'error': 'No search parameter provided'}, status=400)
+
+    return _json(await _serialize_records(request, records))
+
+
+def _search_by(field, name):
+    async def view(request):
+        value = request.GET.get(field)
+        if value:
+            records = await sync_to_async(vocab.filter_by_label)(Record.objects, field, value)
+            return _json(await _serialize_records(request, records))
+        return _json({'error': f'{field} parameter is required'}, status=400)
+    # Named before decorating: the cache key is derived from the view's name
+    view.__name__ = view.__qualname__ = name
+    return read_from_replica(async_api_view(throttle='report')(compact_formats(cache_response(Record, RecordFile)(view))))
+
+
+search_records_by_service = _search_by('ServiceOfEstate', 'search_records_by_service')
+search_records_by_kebele = _search_by('kebele', 'search_records_by_kebele')
+search_records_by_proof = _search_by('proofOfPossession', 'search_records_by_proof')
+search_records_by_possession = _search_by('possessionStatus', 'search_records_by_possession')
+
+
+async def count_by(field):
+    stats = Record.objects.values(field).annotate(count=Count(field)).order_by("-count")
+    return await sync_to_async(vocab.with_labels)([row async for row in stats], field)
+
+
+@read_from_replica
+@async_api_view()
+@cache_response(Record)
+async def proof_of_possession_stats(request):
+    return _json(await count_by("proofOfPossession"))
+
+
+@read_from_replica
+@async_api_view()
+@cache_response(Record)
+async def service_of_estate_stats(request):
+    return _json(await count_by("ServiceOfEstate"))
+
+
+async def amount_paid_counts():
+    first_paid = await Record.objects.filter(FirstAmount__gt=0).acount()
+    second_paid = await Record.objects.filter(SecondAmount__gt=0).acount()
+    third_paid = await Record.objects.filter(ThirdAmount__gt=0).acount()
+    return [
+        {"name": "FirstAmount Paid", "count": first_paid},
+        {"name": "SecondAmount Paid", "count": second_paid},
+        {"name": "ThirdAmount Paid", "count": third_paid},
+    ]
+
+
+@read_from_replica
+@async_api_view()
+@cache_response(Record)
+async def amount_paid_statistics(request):
+    return _json(await amount_paid_counts())
+
+
+async def dashboard_counts():
+    now = timezone.now()
+    start_of_month = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    seven_days_ago = now - timedelta(days=7)
+
+    return {
+        "totalRecords": await Record.objects.acount(),
+        "registeredUsers": await get_user_model().objects.acount(),
+        "reportsGenerated": await AuditLog.objects.filter(action__in=['REPORT_GENERATED', 'VIEW']).acount(),
+        "filesUploaded": await RecordFile.objects.filter(uploaded_at__gte=start_of_month).acount(),
+        "recentActiveUsers": await (
+            AuditLog.objects.filter(action="LOGIN", timestamp__gte=seven_days_ago)
+            .values_list("user", flat=True)
+            .distinct()
+            .acount()
+        ),
+    }
+
+
+@read_from_replica
+@async_api_view(admin_only=True)
+@cache_response(Record, RecordFile, AuditLog, get_user_model())
+async def dashboard_metrics(request):
+    return _json(await dashboard_counts())
+
+
+async def live_dashboard_payload():
+    return {
+        "dashboard": await dashboard_counts(),
+        "proofOfPossession": await count_by("proofOfPossession"),
+        "serviceOfEstate": await count_by("ServiceOfEstate"),
+        "amountPaid": await amount_paid_counts(),
+    }
+
+
+dashboard_feed = live.Feed(live_dashboard_payload, (Record, RecordFile, AuditLog, get_user_model()))
+
+
+@async_api_view(ticket=True)
+async def live_dashboard(request):
+    """
+    Server-Sent Events for the dashboard and statistics charts: a "snapshot"
+    event with every figure, then "delta" events with the figures that changed.
+    One shared producer per process computes them (core/live.py). The dashboard
+    figures are sent to administrators only, like dashboard_metrics.
+    EventSource clients authenticate with ?ticket= (see live_ticket); the
+    stream ends with an "expired" event when their token does.
+    """
+    visible = None
+    if await apermission_level(request.user) != "admin":
+        visible = {"proofOfPossession", "serviceOfEstate", "amountPaid"}
+    queue = dashboard_feed.subscribe()
+    response = StreamingHttpResponse(dashboard_feed.stream(queue, visible, request.auth_expires_at), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # nginx: pass events through unbuffered
+    return response
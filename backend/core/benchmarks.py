@@ -0,0 +1,304 @@
+# backend/core/benchmarks.py
+"""
+Endpoint scenarios shared by the query-budget tests and the ``benchmark`` command.
+
+Every route of core/urls.py and accounts/urls.py has at least one scenario with
+the exact number of SQL queries it is allowed to run (its budget). Budgets do not
+depend on the seeded volume: a view whose query count grows with the data (an
+N+1) fails the tests as soon as there is more than a handful of rows.
+
+When a change legitimately adds a query, update the budget in the same commit.
+"""
+
+import itertools
+import time
+from contextlib import ExitStack
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connections
+from django.test.client import MULTIPART_CONTENT, BOUNDARY, encode_multipart
+from django.test.utils import CaptureQueriesContext
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from . import fulltext, vocab
+from .cache import get_cache
+from .factories import build_record, make_user, record_labels
+from .models import Job, Record, RecordFile
+
+PASSWORD = "bench-pass-123"
+
+
+@dataclass
+class Scenario:
+    name: str
+    route: str                      # pattern string as written in the urls module
+    path: str                       # formatted with the context values
+    budget: int                     # maximum number of SQL queries
+    method: str = "get"
+    user: Optional[str] = "admin"   # "admin", "clerk" or None (anonymous)
+    data: object = None             # dict, or callable(values) -> dict
+    json: bool = False              # send data as JSON instead of multipart
+    status: tuple = (200,)
+    prepare: Optional[Callable] = None  # callable(ctx) -> extra values (fresh objects)
+    tags: tuple = field(default_factory=tuple)
+
+
+def _record_fields(values):
+    record = build_record(values["seq"])
+    return {
+        "PropertyOwnerName": record.PropertyOwnerName,
+        "ExistingArchiveCode": record.ExistingArchiveCode,
+        "UPIN": values.get("new_upin", values["upin"]),
+        "spaceSize": record.spaceSize,
+        **record_labels(values["seq"]),
+    }
+
+
+def _pdf(values):
+    return SimpleUploadedFile(f"bench-{values['seq']}.pdf", b"%PDF-1.4 benchmark", content_type="application/pdf")
+
+
+def _fresh_upin(ctx):
+    return {"new_upin": f"BENCH-{ctx.values['seq']:09d}"}
+
+
+def _fresh_record(ctx):
+    record = build_record(10**9 + ctx.values["seq"])
+    record.save()
+    return {"fresh_pk": record.pk, "fresh_upin": record.UPIN}
+
+
+def _fresh_file(ctx):
+    record_file = RecordFile.objects.create(
+        record_id=ctx.values["pk"], uploaded_file="uploads/bench-delete.pdf", category="additional"
+    )
+    return {"fresh_file_id": record_file.pk}
+
+
+def _fresh_job(ctx):
+    job = Job.objects.create(task="core.tasks.hash_record_file", args=[ctx.values["file_id"]],
+                             status=Job.FAILED, attempts=5, created_by=ctx.admin.username)
+    return {"job_id": job.pk}
+
+
+def _file_text(ctx):
+    record_file = RecordFile.objects.get(pk=ctx.values["file_id"])
+    fulltext.store(record_file, "Invoice 4471 for the lease of plot 12, Kebele 03", 1)
+    return {}
+
+
+def _fresh_user(ctx):
+    return {"new_username": f"bench-user-{ctx.values['seq']}"}
+
+
+def _fresh_refresh(ctx):
+    return {"refresh": str(RefreshToken.for_user(ctx.admin))}
+
+
+CORE_SCENARIOS = [
+    Scenario("list-records", "api/records/", "/api/records/", budget=3, tags=("report",)),
+    Scenario("create-record", "api/records/", "/api/records/", budget=8, method="post",
+             data=_record_fields, prepare=_fresh_upin, status=(201,)),
+    Scenario("record-search", "api/records/search/", "/api/records/search/?UPIN={upin}", budget=4),
+    Scenario("record-update-by-upin", "api/records/upin/<str:upin>", "/api/records/upin/{upin}", budget=6,
+             method="put", data={"PropertyOwnerName": "Owner renamed"}),
+    Scenario("record-detail-put", "api/records/<int:pk>", "/api/records/{pk}", budget=12, method="put",
+             data=_record_fields),
+    Scenario("record-detail-delete", "api/records/<int:pk>", "/api/records/{fresh_pk}", budget=10,
+             method="delete", prepare=_fresh_record, status=(204,)),
+    Scenario("search-by-service", "api/records/search-by-service/",
+             "/api/records/search-by-service/?ServiceOfEstate={service}", budget=4, tags=("report",)),
+    Scenario("search-by-kebele", "api/records/search-by-kebele/",
+             "/api/records/search-by-kebele/?kebele={kebele}", budget=4, tags=("report",)),
+    # A report page: a few columns, no files
+    Scenario("search-by-kebele-sparse", "api/records/search-by-kebele/",
+             "/api/records/search-by-kebele/?kebele={kebele}&fields=id,UPIN,PropertyOwnerName,placeLevel,spaceSize",
+             budget=3, tags=("report",)),
+    Scenario("search-by-proof", "api/records/search-by-proof/",
+             "/api/records/search-by-proof/?proofOfPossession={proof}", budget=4, tags=("report",)),
+    Scenario("search-by-possession", "api/records/search-by-possession/",
+             "/api/records/search-by-possession/?possessionStatus={possession}", budget=4, tags=("report",)),
+    Scenario("recent-records", "api/records/recent/", "/api/records/recent/", budget=4),
+    Scenario("proof-of-possession-stats", "api/statistics/proof-of-possession",
+             "/api/statistics/proof-of-possession", budget=3),
+    Scenario("service-of-estate-stats", "api/statistics/service-of-estate",
+             "/api/statistics/service-of-estate", budget=3),
+    Scenario("amount-paid-stats", "api/statistics/amount-paid", "/api/statistics/amount-paid", budget=5),
+    Scenario("record-files", "api/records/<str:upin>/files/", "/api/records/{upin}/files/", budget=4),
+    Scenario("check-upin", "api/records/check-upin/<str:upin>/", "/api/records/check-upin/{upin}/", budget=2),
+    Scenario("replace-file", "api/files/<int:fileId>/replace/", "/api/files/{file_id}/replace/", budget=5,
+             method="put", data=lambda values: {"uploaded_file": _pdf(values)}),
+    Scenario("delete-file", "api/files/<int:fileId>/delete/", "/api/files/{fresh_file_id}/delete/", budget=5,
+             method="delete", prepare=_fresh_file, status=(204,)),
+    Scenario("upload-file", "api/files/<str:upin>/upload/", "/api/files/{upin}/upload/", budget=4,
+             method="post", data=lambda values: {"uploaded_file": _pdf(values), "display_name": "Scan"},
+             status=(201,)),
+    Scenario("file-search", "api/files/search/", "/api/files/search/?q=invoice+plot", budget=2,
+             prepare=_file_text),
+    Scenario("record-update", "api/records/<str:upin>/", "/api/records/{upin}/", budget=7, method="put",
+             data={"PropertyOwnerName": "Owner renamed"}),
+    Scenario("audit-logs", "api/audit-logs/", "/api/audit-logs/", budget=3),
+    Scenario("dashboard-metrics", "api/dashboard-metrics/", "/api/dashboard-metrics/", budget=8),
+    Scenario("async-record-search", "api/async/records/search/", "/api/async/records/search/?UPIN={upin}",
+             budget=4),
+    Scenario("async-search-by-service", "api/async/records/search-by-service/",
+             "/api/async/records/search-by-service/?ServiceOfEstate={service}", budget=4, tags=("report",)),
+    Scenario("async-search-by-kebele", "api/async/records/search-by-kebele/",
+             "/api/async/records/search-by-kebele/?kebele={kebele}", budget=4, tags=("report",)),
+    Scenario("async-search-by-proof", "api/async/records/search-by-proof/",
+             "/api/async/records/search-by-proof/?proofOfPossession={proof}", budget=4, tags=("report",)),
+    Scenario("async-search-by-possession", "api/async/records/search-by-possession/",
+             "/api/async/records/search-by-possession/?possessionStatus={possession}", budget=4, tags=("report",)),
+    Scenario("async-proof-of-possession-stats", "api/async/statistics/proof-of-possession",
+             "/api/async/statistics/proof-of-possession", budget=3),
+    Scenario("async-service-of-estate-stats", "api/async/statistics/service-of-estate",
+             "/api/async/statistics/service-of-estate", budget=3),
+    Scenario("async-amount-paid-stats", "api/async/statistics/amount-paid",
+             "/api/async/statistics/amount-paid", budget=5),
+    Scenario("async-dashboard-metrics", "api/async/dashboard-metrics/", "/api/async/dashboard-metrics/",
+             budget=8),
+    # An endless stream; the test client only checks its authentication (LiveDashboardTests reads it)
+    Scenario("async-live-dashboard", "api/async/live/dashboard/", "/api/async/live/dashboard/", budget=0,
+             user=None, status=(401,)),
+    Scenario("live-ticket", "api/live/ticket/", "/api/live/ticket/", budget=1, method="post", user="clerk"),
+    Scenario("vocabularies", "api/vocabularies/", "/api/vocabularies/", budget=1, user="clerk"),
+    Scenario("record-history", "api/records/<int:pk>/history/", "/api/records/{pk}/history/", budget=2,
+             user="clerk"),
+    Scenario("shelf-contents", "api/archive/shelves/", "/api/archive/shelves/?row={row}-{row_to}&shelf={shelf}",
+             budget=3, user="clerk"),
+    Scenario("next-location", "api/archive/next-location/",
+             "/api/archive/next-location/?row={row}&shelf={shelf}&folder={folder}", budget=3),
+    Scenario("next-location-folder", "api/archive/next-location/",
+             "/api/archive/next-location/?row={row}&shelf={shelf}", budget=3),
+    Scenario("debt-analytics", "api/analytics/debt/",
+             "/api/analytics/debt/?group_by=ServiceOfEstate&kebele={kebele}", budget=4, tags=("report",)),
+    Scenario("activity-timeseries", "api/analytics/activity/", "/api/analytics/activity/?bucket=week",
+             budget=4, tags=("report",)),
+    # Token table sizes: one pg_class read on PostgreSQL, a COUNT per table elsewhere
+    Scenario("metrics", "metrics", "/metrics", budget=2, user=None),
+    Scenario("job-list", "api/jobs/", "/api/jobs/?status=failed", budget=3, prepare=_fresh_job),
+    Scenario("job-detail", "api/jobs/<int:pk>/", "/api/jobs/{job_id}/", budget=2, prepare=_fresh_job),
+    Scenario("job-retry", "api/jobs/<int:pk>/retry/", "/api/jobs/{job_id}/retry/", budget=4, method="post",
+             prepare=_fresh_job),
+    Scenario("router-root", "", "/", budget=1),
+    Scenario("router-record-list", "^records/$", "/records/", budget=3, tags=("report",)),
+    Scenario("router-record-detail", "^records/(?P<pk>[^/.]+)/$", "/records/{pk}/", budget=3),
+]
+
+ACCOUNTS_SCENARIOS = [
+    Scenario("register", "register/", "/api/accounts/register/", budget=4, method="post", user=None,
+             json=True, prepare=_fresh_user, status=(201,),
+             data=lambda values: {"username": values["new_username"], "password": PASSWORD}),
+    Scenario("login", "login/", "/api/accounts/login/", budget=5, method="post", user=None, json=True,
+             data={"username": "bench-admin", "password": PASSWORD}),
+    Scenario("logout", "logout/", "/api/accounts/logout/", budget=11, method="post", json=True,
+             prepare=_fresh_refresh, status=(205,), data=lambda values: {"refresh_token": values["refresh"]}),
+    Scenario("token-obtain", "token/obtain/", "/api/accounts/token/obtain/", budget=4, method="post",
+             user=None, json=True, data={"username": "bench-admin", "password": PASSWORD}),
+    Scenario("token-refresh", "token/refresh/", "/api/accounts/token/refresh/", budget=13, method="post",
+             user=None, json=True, prepare=_fresh_refresh, data=lambda values: {"refresh": values["refresh"]}),
+    Scenario("user-list", "users/", "/api/accounts/users/", budget=4),
+    Scenario("user-search", "users/", "/api/accounts/users/?search=BENCH-C&page_size=10", budget=4),
+    Scenario("user-detail", "users/<int:pk>/", "/api/accounts/users/{clerk_id}/", budget=4),
+    Scenario("user-roles", "users/<int:pk>/roles/", "/api/accounts/users/{clerk_id}/roles/", budget=5,
+             method="post", json=True, data={"group_name": "Editors", "action": "add"}),
+    Scenario("group-list", "groups/", "/api/accounts/groups/", budget=3),
+    Scenario("token", "token/", "/api/accounts/token/", budget=5, method="post", user=None, json=True,
+             data={"username": "bench-admin", "password": PASSWORD}),
+    Scenario("token-blacklist", "token/blacklist/", "/api/accounts/token/blacklist/", budget=8,
+             method="post", json=True, prepare=_fresh_refresh, data=lambda values: {"refresh": values["refresh"]}),
+]
+
+SCENARIOS = CORE_SCENARIOS + ACCOUNTS_SCENARIOS
+
+
+def routes_of(urlpatterns):
+    """
+    Pattern strings of a urls module, without DRF's ``.json``-style format suffix routes.
+    """
+    return {str(p.pattern) for p in urlpatterns if "format>" not in str(p.pattern)}
+
+
+class BenchmarkContext:
+    """
+    Users, tokens and sample values the scenarios are formatted with.
+    Expects the records to be seeded already.
+    """
+
+    def __init__(self):
+        self.admin = make_user("bench-admin", "Administrators", PASSWORD)
+        self.clerk = make_user("bench-clerk", "Editors", PASSWORD)
+        self.tokens = {
+            "admin": str(RefreshToken.for_user(self.admin).access_token),
+            "clerk": str(RefreshToken.for_user(self.clerk).access_token),
+        }
+        record = Record.objects.order_by("pk").first()
+        self.values = {
+            "pk": record.pk,
+            "upin": record.UPIN,
+            "file_id": record.files.order_by("pk").first().pk,
+            "kebele": vocab.vocabulary("kebele").label(record.kebele_id),
+            "service": vocab.vocabulary("ServiceOfEstate").label(record.ServiceOfEstate_id),
+            "proof": vocab.vocabulary("proofOfPossession").label(record.proofOfPossession_id),
+            "possession": vocab.vocabulary("possessionStatus").label(record.possessionStatus_id),
+            "clerk_id": self.clerk.pk,
+            "row": record.location_row,
+            "row_to": record.location_row + 2,
+            "shelf": record.location_shelf,
+            "folder": record.location_folder,
+        }
+        self._seq = itertools.count(1)
+
+    def headers(self, user):
+        if user is None:
+            return {}
+        return {"HTTP_AUTHORIZATION": f"Bearer {self.tokens[user]}"}
+
+
+def _capture_queries(stack, aliases):
+    captures, seen = [], set()
+    for alias in aliases:
+        connection = connections[alias]
+        if id(connection) not in seen:
+            seen.add(id(connection))
+            captures.append(stack.enter_context(CaptureQueriesContext(connection)))
+    return captures
+
+
+def run_scenario(client, scenario, ctx, aliases=("default",)):
+    """
+    Issue one request for ``scenario`` on a cold response cache.
+    Returns (response, number of SQL queries on ``aliases``, seconds).
+    """
+    ctx.values["seq"] = next(ctx._seq)
+    values = dict(ctx.values)
+    if scenario.prepare:
+        values.update(scenario.prepare(ctx))
+    path = scenario.path.format(**values)
+    data = scenario.data(values) if callable(scenario.data) else scenario.data
+
+    kwargs = ctx.headers(scenario.user)
+    if scenario.json:
+        kwargs["content_type"] = "application/json"
+    elif scenario.method in ("put", "patch") and data is not None:
+        data = encode_multipart(BOUNDARY, data)
+        kwargs["content_type"] = MULTIPART_CONTENT
+
+    get_cache().clear()
+    with ExitStack() as stack:
+        captures = _capture_queries(stack, aliases)
+        start = time.perf_counter()
+        if data is None:
+            response = getattr(client, scenario.method)(path, **kwargs)
+        else:
+            response = getattr(client, scenario.method)(path, data, **kwargs)
+        elapsed = time.perf_counter() - start
+    return response, sum(len(capture) for capture in captures), elapsed
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
@@ -0,0 +1,104 @@
+# backend/core/blobs.py
+"""
+Removal of stored files (blobs) that no RecordFile references any more.
+
+Deleting a RecordFile, directly or through its record, or replacing its file
+queues the old path in the BlobDeletion outbox. The outbox row is written in
+the same transaction as the change, so a rolled-back delete keeps its file.
+``process_deletions()``, run by the ``process_blob_deletions`` worker, deletes
+the queued files outside of any request.
+
+``sweep_orphans()`` catches whatever the outbox missed, such as files written
+by a failed upload or left over from before the outbox existed. It walks the
+storage one directory at a time and checks each chunk of names against
+recordfile_path_idx.
+"""
+
+import datetime
+import logging
+
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+
+from .models import BlobDeletion, RecordFile
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_DIR = "uploads"
+BATCH_SIZE = 500
+MAX_ATTEMPTS = 5
+# Files younger than this may belong to an upload whose row isn't committed yet
+SWEEP_MIN_AGE = datetime.timedelta(hours=1)
+
+
+def queue_deletion(paths):
+    """Queue ``paths`` (storage names) for deletion, in the caller's transaction."""
+    BlobDeletion.objects.bulk_create([BlobDeletion(path=path) for path in paths if path])
+
+
+def referenced(paths):
+    """The subset of ``paths`` still referenced by a RecordFile."""
+    return set(RecordFile.objects.filter(uploaded_file__in=paths).values_list("uploaded_file", flat=True))
+
+
+def process_deletions(storage=default_storage, batch_size=BATCH_SIZE):
+    """
+    Delete the queued files, one batch per transaction; workers running side by
+    side skip each other's rows. Returns the number of files deleted.
+    """
+    deleted = 0
+    while True:
+        with transaction.atomic():
+            batch = list(
+                BlobDeletion.objects.select_for_update(skip_locked=True)
+                .filter(attempts__lt=MAX_ATTEMPTS).order_by("pk")[:batch_size]
+            )
+            if not batch:
+                return deleted
+            keep = referenced({entry.path for entry in batch})  # re-attached since it was queued
+            done, failed = [], []
+            for entry in batch:
+                try:
+                    if entry.path not in keep:
+                        storage.delete(entry.path)
+                        deleted += 1
+                    done.append(entry.pk)
+                except OSError as exc:
+                    logger.warning("Could not delete blob %s: %s", entry.path, exc)
+                    entry.attempts += 1
+                    entry.last_error = str(exc)
+                    failed.append(entry)
+            BlobDeletion.objects.filter(pk__in=done).delete()
+            BlobDeletion.objects.bulk_update(failed, ["attempts", "last_error"])
+
+
+def _walk(storage, directory):
+    """Yield (directory, file names) for ``directory`` and each of its subdirectories."""
+    try:
+        directories, files = storage.listdir(directory)
+    except FileNotFoundError:
+        return
+    yield directory, files
+    for name in directories:
+        yield from _walk(storage, f"{directory}/{name}")
+
+
+def sweep_orphans(storage=default_storage, directory=UPLOAD_DIR, min_age=SWEEP_MIN_AGE, dry_run=False):
+    """
+    Delete the files under ``directory`` that no RecordFile references and that
+    are older than ``min_age``. Returns (files scanned, orphan paths).
+    """
+    cutoff = timezone.now() - min_age
+    scanned, orphans = 0, []
+    for path, names in _walk(storage, directory):
+        for start in range(0, len(names), BATCH_SIZE):
+            chunk = [f"{path}/{name}" for name in names[start:start + BATCH_SIZE]]
+            scanned += len(chunk)
+            keep = referenced(chunk)
+            for name in chunk:
+                if name not in keep and storage.get_modified_time(name) < cutoff:
+                    orphans.append(name)
+                    if not dry_run:
+                        storage.delete(name)
+    return scanned, orphans
@@ -0,0 +1,153 @@
+# backend/core/cache.py
+"""
+Response caching for the read-only endpoints.
+
+Every cached view declares the models it is built from. Each model has a
+generation counter in the cache; saving or deleting a row replaces the counter
+(see core/signals.py), which changes the key of every response built from that
+model. Stale entries are never read again and simply expire.
+"""
+
+import asyncio
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models.query import QuerySet
+from django.http import JsonResponse
+from rest_framework.response import Response
+
+from accounts.permissions import permission_level, apermission_level
+
+
+def get_cache():
+    return caches[getattr(settings, 'RESPONSE_CACHE_ALIAS', 'default')]
+
+
+def _generation_key(model):
+    return f"gen:{model._meta.label_lower}"
+
+
+def get_generations(models):
+    """
+    Current generation of each model, creating missing counters on the way.
+    """
+    cache = get_cache()
+    keys = [_generation_key(model) for model in models]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            value = time.time_ns()
+            # Another process may have created the counter in the meantime
+            found[key] = value if cache.add(key, value, None) else cache.get(key, value)
+    return [found[key] for key in keys]
+
+
+async def aget_generations(models):
+    cache = get_cache()
+    keys = [_generation_key(model) for model in models]
+    found = await cache.aget_many(keys)
+    for key in keys:
+        if key not in found:
+            value = time.time_ns()
+            found[key] = value if await cache.aadd(key, value, None) else await cache.aget(key, value)
+    return [found[key] for key in keys]
+
+
+def bump_generation(model):
+    # A fresh timestamp rather than incr(): works the same on every backend and
+    # never reuses a value if the counter was evicted.
+    get_cache().set(_generation_key(model), time.time_ns(), None)
+
+
+def _response_key(view, request, level, generations, args, kwargs):
+    query = request.query_params if hasattr(request, 'query_params') else request.GET
+    parts = [
+        repr(sorted(query.lists())),
+        repr(args),
+        repr(sorted((kwargs or {}).items())),
+        repr(generations),
+    ]
+    digest = hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()
+    return f"resp:{view.__module__}.{view.__qualname__}:{level}:{digest}"
+
+
+def response_cache_key(view, request, models, args=(), kwargs=None):
+    return _response_key(
+        view, request, permission_level(request.user), get_generations(models), args, kwargs
+    )
+
+
+async def aresponse_cache_key(view, request, models, args=(), kwargs=None):
+    return _response_key(
+        view, request, await apermission_level(request.user), await aget_generations(models), args, kwargs
+    )
+
+
+def cache_response(*models, timeout=None):
+    """
+    Cache successful GET responses of a view for authenticated users.
+
+    The key covers the query parameters, the URL arguments, the user's permission
+    level and the generation of every model in ``models``. Works on function views
+    (below ``@api_view``), on view methods through ``method_decorator`` and on the
+    async views of core/async_views.py (below their authentication decorator).
+    """
+    def decorator(view):
+        if asyncio.iscoroutinefunction(view):
+            return _async_wrapper(view, models, timeout)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD') or not request.user.is_authenticated:
+                return view(request, *args, **kwargs)
+
+            cache = get_cache()
+            key = response_cache_key(view, request, models, args, kwargs)
+            hit = cache.get(key)
+            if hit is not None:
+                data, status_code = hit
+                return Response(data, status=status_code)
+
+            response = view(request, *args, **kwargs)
+            if isinstance(response, Response) and response.status_code == 200:
+                data = response.data
+                if isinstance(data, QuerySet):
+                    data = list(data)
+                cache.set(key, (data, response.status_code), _timeout(timeout))
+            return response
+        return wrapper
+    return decorator
+
+
+def _async_wrapper(view, models, timeout):
+    # Async views return JsonResponse, so the payload is cached before rendering
+    # and the view hands it over as response.data.
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD') or not request.user.is_authenticated:
+            return await view(request, *args, **kwargs)
+
+        cache = get_cache()
+        key = await aresponse_cache_key(view, request, models, args, kwargs)
+        hit = await cache.aget(key)
+        if hit is not None:
+            data, status_code = hit
+            response = JsonResponse(data, status=status_code, safe=False)
+            response.data = data
+            return response
+
+        response = await view(request, *args, **kwargs)
+        data = getattr(response, 'data', None)
+        if response.status_code == 200 and data is not None:
+            await cache.aset(key, (data, response.status_code), _timeout(timeout))
+        return response
+    return wrapper
+
+
+def _timeout(timeout):
+    if timeout is not None:
+        return timeout
+    return getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 300)
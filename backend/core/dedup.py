@@ -0,0 +1,271 @@
+# backend/core/dedup.py
+"""
+Detection of duplicate records: one owner or archive folder entered twice.
+
+Comparing every record with every other is quadratic. Instead each record gets
+a few blocking keys:
+
+- the phonetic key of the owner name: Soundex for Latin words, the consonant
+  of each syllable (homophones merged) for Ethiopic ones, sorted so that word
+  order doesn't matter;
+- the digits of the NationalId;
+- the last nine digits of the phone number (no country code or leading 0);
+- the start of the archive code, upper case, without separators or leading zeros.
+
+Only records sharing a key are compared. A pair is a candidate when its
+score, name similarity plus the identifiers that match (see ``score()``),
+reaches the threshold. Blocks are compared in worker processes. Candidate
+pairs are joined into clusters and written to DuplicateCluster for review.
+"""
+
+import difflib
+import itertools
+import multiprocessing
+import re
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+
+from django.db import connections, transaction
+
+from .models import DuplicateCluster, Record
+
+THRESHOLD = 0.75
+NAME_WEIGHT = 0.5
+NAME_MATCH = 0.85  # name similarity reported as a matching name
+FIELD_WEIGHTS = {"NationalId": 0.35, "PhoneNumber": 0.15, "ExistingArchiveCode": 0.15}
+ARCHIVE_PREFIX_LENGTH = 12
+# Larger blocks (a very common name) only compare records that sort close by name
+MAX_BLOCK_SIZE = 200
+WINDOW = 20
+TASK_PAIRS = 50_000  # comparisons sent to a worker at a time
+CHUNK_SIZE = 10_000
+
+_SOUNDEX = {char: str(code) for code, letters in enumerate(
+    ("aeiouyhw", "bfpv", "cgjkqsxz", "dt", "l", "mn", "r")) for char in letters}
+_SOUNDEX.update(dict.fromkeys("aeiouyhw", ""))
+# Ethiopic syllables come in rows of eight, one row per consonant
+ETHIOPIC = range(0x1200, 0x1380)
+_HOMOPHONES = {0x1210: 0x1200, 0x1280: 0x1200, 0x1220: 0x1230, 0x12D0: 0x12A0, 0x1340: 0x1338}
+
+
+def _consonant(char):
+    base = ord(char) & ~7
+    return chr(_HOMOPHONES.get(base, base))
+
+
+def simplify(name):
+    """``name`` folded for comparison: lower case, Ethiopic vowels dropped, words sorted."""
+    name = unicodedata.normalize("NFKC", name or "").casefold()
+    name = "".join(_consonant(char) if ord(char) in ETHIOPIC else char for char in name)
+    return " ".join(sorted(re.findall(r"\w+", name)))
+
+
+def soundex(word):
+    codes, previous = [], _SOUNDEX.get(word[0])
+    for char in word[1:]:
+        code = _SOUNDEX.get(char)
+        if code is None:
+            continue
+        if code and code != previous:
+            codes.append(code)
+        if char not in "hw":
+            previous = code
+    return (word[0].upper() + "".join(codes) + "000")[:4]
+
+
+def phonetic(simplified):
+    """Order-independent phonetic key of a ``simplify()``-ed name."""
+    words = []
+    for word in simplified.split():
+        if word.isdigit():
+            words.append(word)
+        elif word[0] in _SOUNDEX:
+            words.append(soundex(word))
+        else:  # Ethiopic consonants, already folded; drop doubled letters
+            words.append("".join(char for char, _ in itertools.groupby(word)))
+    return " ".join(sorted(words))
+
+
+def digits(value):
+    return "".join(re.findall(r"\d", value or ""))
+
+
+def national_id(value):
+    value = digits(value)
+    return value if len(value) >= 6 else None
+
+
+def phone(value):
+    value = digits(value)
+    if value.startswith("251"):
+        value = value[3:]
+    value = value.lstrip("0")[-9:]
+    return value if len(value) == 9 else None
+
+
+def archive_code(value):
+    """The code in upper case, without separators or the leading zeros of its numbers."""
+    parts = re.findall(r"[^\W\d_]+|\d+", (value or "").upper())
+    return "".join(part.lstrip("0") or "0" if part.isdigit() else part for part in parts) or None
+
+
+def row(pk, name, nid, phone_number, code):
+    """The tuple compared by the workers."""
+    return (pk, simplify(name), national_id(nid), phone(phone_number), archive_code(code))
+
+
+def keys(entry):
+    pk, name, nid, phone_number, code = entry
+    if name:
+        yield "n:" + phonetic(name)
+    if nid:
+        yield "i:" + nid
+    if phone_number:
+        yield "p:" + phone_number
+    if code:
+        yield "a:" + code[:ARCHIVE_PREFIX_LENGTH]
+
+
+def score(a, b, threshold=THRESHOLD):
+    """(score, matched fields) of two rows, or None when the pair can't reach ``threshold``."""
+    reasons = [field for field, x, y in zip(FIELD_WEIGHTS, a[2:], b[2:]) if x and x == y]
+    value = sum(FIELD_WEIGHTS[field] for field in reasons)
+    if value + NAME_WEIGHT < threshold:  # even identical names wouldn't be enough
+        return None
+    similarity = difflib.SequenceMatcher(None, a[1], b[1]).ratio()
+    value = min(1.0, value + NAME_WEIGHT * similarity)
+    if value < threshold:
+        return None
+    if similarity >= NAME_MATCH:
+        reasons.append("PropertyOwnerName")
+    return value, reasons
+
+
+def _pairs(block):
+    if len(block) <= MAX_BLOCK_SIZE:
+        return itertools.combinations(block, 2)
+    block = sorted(block, key=lambda entry: entry[1])
+    return ((a, b) for i, a in enumerate(block) for b in block[i + 1:i + 1 + WINDOW])
+
+
+def compare(blocks, threshold=THRESHOLD):
+    """Candidate pairs of ``blocks`` (lists of rows): [(pk, pk, score, reasons)]."""
+    found = []
+    for block in blocks:
+        for a, b in _pairs(block):
+            match = score(a, b, threshold)
+            if match:
+                found.append((min(a[0], b[0]), max(a[0], b[0]), *match))
+    return found
+
+
+def _cost(block):
+    n = len(block)
+    return n * (n - 1) // 2 if n <= MAX_BLOCK_SIZE else n * WINDOW
+
+
+def _tasks(rows, blocks):
+    """The blocks of two or more rows, grouped into tasks of about TASK_PAIRS comparisons."""
+    task, cost = [], 0
+    for members in blocks.values():
+        if isinstance(members, int):
+            continue
+        task.append([rows[i] for i in members])
+        cost += _cost(members)
+        if cost >= TASK_PAIRS:
+            yield task
+            task, cost = [], 0
+    if task:
+        yield task
+
+
+def _clusters(pairs):
+    """Connected groups of the candidate pairs: [(pks, weakest score, reasons)]."""
+    parent = {}
+
+    def root(pk):
+        while parent.setdefault(pk, pk) != pk:
+            parent[pk] = parent[parent[pk]]
+            pk = parent[pk]
+        return pk
+
+    for a, b, _, _ in pairs.values():
+        parent[root(a)] = root(b)
+    groups = {}
+    for (a, b), (_, _, value, reasons) in pairs.items():
+        group = groups.setdefault(root(a), [set(), 1.0, set()])
+        group[0].update((a, b))
+        group[1] = min(group[1], value)
+        group[2].update(reasons)
+    return [(sorted(pks), value, sorted(reasons)) for pks, value, reasons in groups.values()]
+
+
+_inherited = []  # the parent's connections in a forked worker, kept so they are never closed
+
+
+def _drop_inherited_connections():
+    """
+    Initializer of the forked workers: they share the parent's database sockets,
+    which closing (even by garbage collection) would end the parent's sessions.
+    The workers don't query; forget the connections without closing them.
+    """
+    for connection in connections.all(initialized_only=True):
+        _inherited.append(connection.connection)
+        connection.connection = None
+
+
+def find(workers=1, threshold=THRESHOLD, queryset=None):
+    """
+    Candidate clusters among the records of ``queryset`` (all records by default),
+    compared by ``workers`` processes. Returns (records scanned, clusters).
+    """
+    queryset = Record.objects.all() if queryset is None else queryset
+    rows, blocks = [], {}
+    records = queryset.order_by().values_list("pk", "PropertyOwnerName", "NationalId", "PhoneNumber",
+                                              "ExistingArchiveCode")
+    for i, values in enumerate(records.iterator(chunk_size=CHUNK_SIZE)):
+        rows.append(row(*values))
+        for key in keys(rows[i]):
+            members = blocks.get(key)
+            if members is None:  # most keys are unique: keep a bare index until a second row shares it
+                blocks[key] = i
+            elif isinstance(members, int):
+                blocks[key] = [members, i]
+            else:
+                members.append(i)
+    tasks = _tasks(rows, blocks)
+    if workers > 1:
+        with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("fork"),
+                                 initializer=_drop_inherited_connections) as pool:
+            results = list(pool.map(compare, tasks, itertools.repeat(threshold)))
+    else:
+        results = [compare(task, threshold) for task in tasks]
+    pairs = {}
+    for a, b, value, reasons in itertools.chain.from_iterable(results):
+        pairs[a, b] = (a, b, value, reasons)  # pairs sharing several blocks are found more than once
+    return len(rows), _clusters(pairs)
+
+
+def save(clusters):
+    """
+    Replace the open clusters with ``clusters``, leaving out any whose records
+    were already reviewed as one cluster. Returns the number written.
+    """
+    with transaction.atomic():
+        reviewed = {}
+        through = DuplicateCluster.records.through
+        for cluster_id, record_id in (through.objects.exclude(duplicatecluster__status=DuplicateCluster.OPEN)
+                                      .values_list("duplicatecluster_id", "record_id")):
+            reviewed.setdefault(cluster_id, set()).add(record_id)
+        reviewed = {frozenset(pks) for pks in reviewed.values()}
+        DuplicateCluster.objects.filter(status=DuplicateCluster.OPEN).delete()
+        clusters = [cluster for cluster in clusters if frozenset(cluster[0]) not in reviewed]
+        created = DuplicateCluster.objects.bulk_create([
+            DuplicateCluster(reasons=reasons, score=round(value, 3), size=len(pks))
+            for pks, value, reasons in clusters
+        ])
+        through.objects.bulk_create([
+            through(duplicatecluster_id=cluster.pk, record_id=pk)
+            for cluster, (pks, _, _) in zip(created, clusters) for pk in pks
+        ], batch_size=CHUNK_SIZE)
+    return len(created)
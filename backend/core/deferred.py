@@ -0,0 +1,44 @@
+# backend/core/deferred.py
+"""
+Writes that don't have to happen before the response is sent.
+
+``defer(request, func, *args)`` queues a call on the request. Once the view has
+returned, DeferredCallsMiddleware hands the calls to the response, which runs
+them when it is closed. WSGI and ASGI servers close the response after sending
+its body, so the client doesn't wait for them. They run on the request's
+thread and database connection, after its transaction has ended.
+
+A call that fails is logged and the others still run. Only use this for
+bookkeeping the response doesn't depend on, such as last_login and audit rows.
+"""
+
+import functools
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def defer(request, func, *args, **kwargs):
+    """Run ``func(*args, **kwargs)`` after the response to ``request`` is sent (now when there is no request)."""
+    call = functools.partial(func, *args, **kwargs)
+    if request is None:
+        call()
+        return
+    request = getattr(request, "_request", request)  # a DRF Request wraps the HttpRequest
+    request.__dict__.setdefault("_deferred_calls", []).append(call)
+
+
+def run(calls):
+    for call in calls:
+        try:
+            call()
+        except Exception:
+            logger.exception("Deferred call %r failed", call)
+
+
+def attach(request, response):
+    """Make ``response`` run the calls deferred on ``request`` when it is closed."""
+    calls = request.__dict__.pop("_deferred_calls", None)
+    if calls:
+        # The same hook FileResponse uses to close its file after sending it
+        response._resource_closers.append(functools.partial(run, calls))
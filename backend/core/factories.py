@@ -0,0 +1,113 @@
+# backend/core/factories.py
+"""
+Bulk factories for seeding realistic volumes of records, files and audit logs.
+
+Used by the query-budget tests and the ``benchmark`` management command. Values
+are derived from the row number, so two runs with the same volume seed the same data.
+"""
+
+import random
+
+from django.contrib.auth.models import User, Group
+
+from . import rollups, vocab
+from .models import Record, RecordFile, AuditLog
+
+KEBELES = [f"{n:02d}" for n in range(1, 21)]
+SERVICES = ["Residential", "Commercial", "Government", "Religious", "Industrial", "Urban Agriculture"]
+PLACE_LEVELS = ["1st", "2nd", "3rd", "4th"]
+POSSESSION_STATUSES = ["Legal", "Illegal", "Pending"]
+PROOFS = ["Title Deed", "Lease Contract", "Court Decision", "None"]
+DEBT_RESTRICTIONS = ["None", "Debt", "Restriction"]
+FILE_CATEGORIES = ["required", "additional"]
+AUDIT_ACTIONS = ["LOGIN", "VIEW", "CREATE", "UPDATE"]
+
+
+def record_labels(n):
+    """The labels of the categorical columns of record ``n``."""
+    rng = random.Random(-n)
+    return {
+        "ServiceOfEstate": rng.choice(SERVICES),
+        "placeLevel": rng.choice(PLACE_LEVELS),
+        "possessionStatus": rng.choice(POSSESSION_STATUSES),
+        "kebele": rng.choice(KEBELES),
+        "proofOfPossession": rng.choice(PROOFS),
+        "DebtRestriction": rng.choice(DEBT_RESTRICTIONS),
+    }
+
+
+def build_record(n):
+    rng = random.Random(n)
+    record = Record(
+        PropertyOwnerName=f"Owner {n}",
+        ExistingArchiveCode=f"AR-{n // 10:06d}",
+        UPIN=f"UPIN-{n:08d}",
+        PhoneNumber=f"09{rng.randrange(10**8):08d}",
+        NationalId=f"{rng.randrange(10**12):012d}",
+        spaceSize=str(rng.randrange(50, 2000)),
+        **{f"{field}_id": vocab.vocabulary(field).key(label, create=True)
+           for field, label in record_labels(n).items()},
+        unpaidTaxDebt=rng.randrange(0, 50000),
+        unpaidPropTaxDebt=rng.randrange(0, 20000),
+        unpaidLeaseDebt=rng.randrange(0, 100000),
+        FirstAmount=str(rng.randrange(0, 5000)),
+        SecondAmount=str(rng.randrange(0, 5000)),
+        ThirdAmount=str(rng.randrange(0, 5000)),
+        FolderNumber=str(rng.randrange(1, 500)),
+        Row=str(rng.randrange(1, 40)),
+        ShelfNumber=str(rng.randrange(1, 20)),
+        NumberOfPages=rng.randrange(1, 200),
+        sortingNumber=str(n),
+    )
+    record.refresh_location()  # bulk_create does not call save()
+    return record
+
+
+def seed(records=1000, files_per_record=2, audit_logs_per_record=1, start=0, batch_size=5000):
+    """
+    Insert ``records`` records numbered from ``start``, each with its files and
+    audit log entries, in batches of ``batch_size``, then rebuild the rollups
+    (bulk inserts bypass the signals maintaining them). Returns the created
+    records of the last batch (handy for picking test subjects).
+    """
+    vocab.clear()  # keys cached from a rolled-back test transaction would be stale
+    created = []
+    for offset in range(start, start + records, batch_size):
+        stop = min(offset + batch_size, start + records)
+        created = Record.objects.bulk_create([build_record(n) for n in range(offset, stop)])
+
+        RecordFile.objects.bulk_create([
+            RecordFile(
+                record=record,
+                uploaded_file=f"uploads/{record.UPIN}-{i}.pdf",
+                display_name=f"Document {i}",
+                category=FILE_CATEGORIES[i % len(FILE_CATEGORIES)],
+                type="application/pdf",
+                file_hash=f"{record.pk:032x}{i:032x}",
+            )
+            for record in created
+            for i in range(files_per_record)
+        ], batch_size=batch_size)
+
+        AuditLog.objects.bulk_create([
+            AuditLog(
+                user=f"clerk{record.pk % 50}",
+                action=AUDIT_ACTIONS[(record.pk + i) % len(AUDIT_ACTIONS)],
+                details=f"Record {record.UPIN}",
+                ip_address="127.0.0.1",
+                role="Editors",
+            )
+            for record in created
+            for i in range(audit_logs_per_record)
+        ], batch_size=batch_size)
+    rollups.rebuild()
+    rollups.rollup_daily_activity()
+    vocab.reload()  # cache the labels created above without waiting for the caller's transaction
+    return created
+
+
+def make_user(username, group=None, password="bench-pass-123"):
+    user = User.objects.create_user(username, f"{username}@example.com", password)
+    if group:
+        user.groups.add(Group.objects.get_or_create(name=group)[0])
+    return user
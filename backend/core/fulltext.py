@@ -0,0 +1,109 @@
+# backend/core/fulltext.py
+"""
+Full-text search of the uploaded PDFs.
+
+After an upload is hashed (core/tasks.py) a background job extracts the text
+layer of the PDF with pypdf into FileText.content, and on PostgreSQL
+into the ``search_vector`` tsvector column, indexed by filetext_search_idx
+(GIN). ``search()`` matches a query written like a web search ("quoted
+phrases", or, -excluded) against that column. Results are ranked by ts_rank,
+each with a ts_headline snippet.
+
+Scanned pages without a text layer give no text; OCR is out of scope. Without
+PostgreSQL (local SQLite) every term is matched with icontains and the snippet
+is cut around the first match, which is enough for development.
+"""
+
+import logging
+import re
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank, SearchVector
+from django.db import connection
+from django.db.models import F, Value
+
+from .models import FileText
+
+try:
+    from pypdf import PdfReader
+    from pypdf.errors import PyPdfError
+except ImportError:  # optional: uploads are simply not indexed
+    PdfReader = None
+
+logger = logging.getLogger(__name__)
+
+MAX_CHARS = 500_000  # a tsvector can't exceed 1 MB
+SEARCH_LIMIT = 50
+SNIPPET_CHARS = 200
+HEADLINE_OPTIONS = {"max_words": 35, "min_words": 15, "max_fragments": 2, "fragment_delimiter": " … "}
+
+
+def is_pdf(record_file):
+    return record_file.type == "application/pdf" or record_file.uploaded_file.name.lower().endswith(".pdf")
+
+
+def extract(stream):
+    """(text, pages) of a PDF: its text layer, page by page, cut at MAX_CHARS."""
+    reader = PdfReader(stream)
+    parts, length = [], 0
+    for page in reader.pages:
+        text = (page.extract_text() or "").replace("\x00", "")  # PostgreSQL text can't hold NUL
+        parts.append(text)
+        length += len(text)
+        if length >= MAX_CHARS:
+            break
+    return "\n".join(parts)[:MAX_CHARS], len(reader.pages)
+
+
+def index(record_file):
+    """Extract and store the text of ``record_file``. Returns the FileText, or None when it has none."""
+    if not is_pdf(record_file) or PdfReader is None:
+        FileText.objects.filter(file=record_file).delete()
+        return None
+    try:
+        with record_file.uploaded_file.open("rb") as stream:
+            content, pages = extract(stream)
+    except PyPdfError as exc:  # a damaged PDF: retrying won't help
+        logger.warning("Could not read the text of file %s: %s", record_file.pk, exc)
+        content, pages = "", 0
+    return store(record_file, content, pages)
+
+
+def store(record_file, content, pages):
+    """Save the text of ``record_file`` and, on PostgreSQL, its search vector."""
+    text, _ = FileText.objects.update_or_create(file=record_file, defaults={"content": content, "pages": pages})
+    if connection.vendor == "postgresql":
+        FileText.objects.filter(pk=text.pk).update(
+            search_vector=SearchVector("content", config=settings.FULLTEXT_CONFIG))
+    return text
+
+
+def _snippet(content, terms):
+    lowered = content.lower()
+    start = min((i for i in (lowered.find(term.lower()) for term in terms) if i >= 0), default=0)
+    start = max(0, start - SNIPPET_CHARS // 4)
+    return " ".join(content[start:start + SNIPPET_CHARS].split())
+
+
+def search(query, limit=SEARCH_LIMIT):
+    """The FileTexts matching ``query``, best first, with their file and record, ``rank`` and ``snippet``."""
+    texts = FileText.objects.select_related("file__record").defer("search_vector")
+    if connection.vendor == "postgresql":
+        tsquery = SearchQuery(query, config=settings.FULLTEXT_CONFIG, search_type="websearch")
+        # ts_headline is expensive: PostgreSQL evaluates it after the LIMIT, on the rows returned only
+        return list(
+            texts.defer("content").filter(search_vector=tsquery)
+            .annotate(rank=SearchRank(F("search_vector"), tsquery),
+                      snippet=SearchHeadline("content", tsquery, config=settings.FULLTEXT_CONFIG,
+                                             **HEADLINE_OPTIONS))
+            .order_by("-rank", "pk")[:limit]
+        )
+    terms = re.findall(r"\w+", query)
+    if not terms:
+        return []
+    for term in terms:
+        texts = texts.filter(content__icontains=term)
+    results = list(texts.annotate(rank=Value(0.0)).order_by("pk")[:limit])
+    for text in results:
+        text.snippet = _snippet(text.content, terms)
+    return results
@@ -0,0 +1,50 @@
+# backend/core/history.py
+"""
+Field-level change history of records.
+
+Edits save only the columns whose value actually changed
+(``save(update_fields=...)``) instead of rewriting the whole row, and store
+those changes as one RecordHistory row, {field: [old, new]}, with the lookup
+fields by label. A record's timeline is one range scan of
+recordhistory_record_time_idx.
+"""
+
+from django.db import transaction
+
+from . import vocab
+from .models import Record, RecordHistory
+
+
+def diff(instance, validated_data):
+    """{field name: (attname, old, new)} for the values of ``validated_data`` that differ from ``instance``."""
+    changes = {}
+    for name, value in validated_data.items():
+        field = Record._meta.get_field(name)  # LabelField data is keyed by attname (kebele_id)
+        old = getattr(instance, field.attname)
+        if old != value:
+            changes[field.name] = (field.attname, old, value)
+    return changes
+
+
+def _display(name, value):
+    return vocab.vocabulary(name).label(value) if name in vocab.VOCABULARIES else value
+
+
+def save_changes(instance, validated_data, user=None):
+    """
+    Apply ``validated_data`` to ``instance``, writing only the changed columns and
+    their history. Returns the names of the changed fields (empty: nothing written).
+    """
+    changes = diff(instance, validated_data)
+    if not changes:
+        return []
+    for attname, old, new in changes.values():
+        setattr(instance, attname, new)
+    with transaction.atomic(savepoint=False):  # part of the caller's transaction when there is one
+        instance.save(update_fields=[*changes, 'updated_at'])
+        RecordHistory.objects.create(
+            record=instance,
+            user=user,
+            changes={name: [_display(name, old), _display(name, new)] for name, (_, old, new) in changes.items()},
+        )
+    return list(changes)
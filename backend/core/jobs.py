@@ -0,0 +1,156 @@
+# backend/core/jobs.py
+"""
+Background jobs kept in the database, for work that shouldn't hold up a request
+(hashing uploads, imports, exports, cleanups).
+
+``enqueue(func, *args, **kwargs)`` writes a Job row in the caller's
+transaction, so a rolled-back request leaves no job behind. ``manage.py
+runworker`` claims due jobs with SELECT ... FOR UPDATE SKIP LOCKED: any number
+of workers can poll the same table without taking each other's jobs, and no
+broker is needed. A job that raises is retried after an exponential backoff
+until it has used ``max_attempts``. It is then left FAILED for an admin to look
+at and retry (``api/jobs/<pk>/retry/``).
+
+Tasks are plain module-level functions whose arguments and result serialize to
+JSON. They run at least once: a worker killed mid-job leaves it RUNNING until
+``requeue_stale()``, which every worker thread runs each REQUEUE_INTERVAL, hands
+it to another, so tasks must be safe to run again.
+"""
+
+import logging
+import os
+import random
+import socket
+import threading
+import time
+import traceback
+from datetime import timedelta
+
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 5
+BACKOFF_BASE = 10  # seconds before the first retry, doubled for each one after
+BACKOFF_MAX = 3600
+STALE_AFTER = timedelta(minutes=30)  # a job running this long lost its worker
+POLL_INTERVAL = 1.0
+REQUEUE_INTERVAL = 60.0  # seconds between two looks for stale jobs
+
+
+def task_name(func):
+    return func if isinstance(func, str) else f"{func.__module__}.{func.__qualname__}"
+
+
+def enqueue(func, *args, run_at=None, max_attempts=MAX_ATTEMPTS, user=None, **kwargs):
+    """Queue ``func(*args, **kwargs)``; ``func`` is a function or its dotted path."""
+    return Job.objects.create(
+        task=task_name(func), args=list(args), kwargs=kwargs, run_at=run_at or timezone.now(),
+        max_attempts=max_attempts, created_by=getattr(user, 'username', None),
+    )
+
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+
+def claim(worker, limit=1):
+    """Mark up to ``limit`` due jobs as RUNNING for ``worker`` and return them."""
+    now = timezone.now()
+    with transaction.atomic():
+        jobs = list(
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(status=Job.QUEUED, run_at__lte=now).order_by('run_at')[:limit]
+        )
+        for job in jobs:
+            job.status, job.started_at, job.worker = Job.RUNNING, now, worker
+            job.attempts += 1
+        Job.objects.bulk_update(jobs, ['status', 'started_at', 'worker', 'attempts'])
+    return jobs
+
+
+def backoff(attempts):
+    """Seconds before retrying a job that failed ``attempts`` times, with jitter."""
+    delay = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (attempts - 1))
+    return delay * random.uniform(0.5, 1.0)
+
+
+def run(job):
+    """Run a claimed job and record the outcome. Returns True when it succeeded."""
+    try:
+        result = import_string(job.task)(*job.args, **job.kwargs)
+    except Exception:
+        job.last_error = traceback.format_exc()
+        job.finished_at = timezone.now()
+        if job.attempts >= job.max_attempts:
+            job.status = Job.FAILED
+            logger.error("Job %s (%s) failed for good:\n%s", job.pk, job.task, job.last_error)
+        else:
+            job.status = Job.QUEUED
+            job.run_at = job.finished_at + timedelta(seconds=backoff(job.attempts))
+            logger.warning("Job %s (%s) failed, retrying at %s", job.pk, job.task, job.run_at)
+        job.save(update_fields=['status', 'run_at', 'finished_at', 'last_error'])
+        return False
+    job.status, job.result, job.finished_at = Job.DONE, result, timezone.now()
+    job.save(update_fields=['status', 'result', 'finished_at'])
+    return True
+
+
+def requeue_stale(timeout=STALE_AFTER):
+    """Queue again the jobs RUNNING for longer than ``timeout`` (their worker died)."""
+    return (Job.objects.filter(status=Job.RUNNING, started_at__lt=timezone.now() - timeout)
+            .update(status=Job.QUEUED, run_at=timezone.now(), worker=''))
+
+
+def run_pending(worker=None, limit=None):
+    """Run the due jobs one at a time until none is left (or ``limit`` ran). Returns the count."""
+    worker = worker or worker_name()
+    count = 0
+    while limit is None or count < limit:
+        jobs = claim(worker)
+        if not jobs:
+            return count
+        run(jobs[0])
+        count += 1
+    return count
+
+
+def _loop(stop, poll_interval):
+    worker = worker_name()
+    next_requeue = 0.0
+    try:
+        while not stop.is_set():
+            close_old_connections()
+            try:
+                if time.monotonic() >= next_requeue:
+                    requeued = requeue_stale()
+                    if requeued:
+                        logger.warning("Requeued %d stale jobs", requeued)
+                    next_requeue = time.monotonic() + REQUEUE_INTERVAL
+                if run_pending(worker):
+                    continue
+            except Exception:
+                # The database went away, most likely: the broken connection is
+                # replaced on the next round, and a job left RUNNING is requeued
+                logger.exception("Worker %s failed, retrying in %s s", worker, poll_interval)
+            stop.wait(poll_interval)
+    finally:
+        connection.close()  # this thread's connection
+
+
+def work(concurrency=1, poll_interval=POLL_INTERVAL, stop=None):
+    """Run jobs in ``concurrency`` threads until ``stop`` (a threading.Event) is set."""
+    stop = stop or threading.Event()
+    if concurrency <= 1:
+        _loop(stop, poll_interval)
+        return
+    threads = [threading.Thread(target=_loop, args=(stop, poll_interval), name=f"worker-{i}")
+               for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
@@ -0,0 +1,169 @@
+# backend/core/live.py
+"""
+Server-Sent Events feeds for the ASGI server.
+
+A Feed has one producer task per process, whatever the number of open
+streams. The producer polls the cache generations of the feed's models (see
+core/cache.py), which bump on every write in any process. When they change it
+recomputes the payload once and pushes only the keys that changed to each
+subscriber's queue. The producer starts with the first subscriber and stops
+after the last one leaves.
+
+EventSource can't send an Authorization header, so a stream is opened with a
+ticket (see issue_ticket): signed, single-use and valid for a few seconds, so
+what ends up in access logs can't be replayed. The stream closes when the
+token the ticket was issued for expires.
+"""
+
+import asyncio
+import json
+import logging
+import secrets
+import time
+
+from django.conf import settings
+from django.core import signing
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .cache import aget_generations, get_cache
+from .routers import RoutingState, set_routing_state
+
+logger = logging.getLogger(__name__)
+
+QUEUE_SIZE = 16
+TICKET_SALT = "core.live.ticket"
+
+
+def issue_ticket(user, expires_at=None):
+    """
+    A ticket opening one stream as ``user`` within LIVE_TICKET_SECONDS. The
+    stream ends at ``expires_at`` (a timestamp, the expiry of the credentials
+    the ticket was issued for), or never when None.
+    """
+    claims = {"user": user.pk, "exp": expires_at, "nonce": secrets.token_urlsafe(12)}
+    return signing.dumps(claims, salt=TICKET_SALT)
+
+
+async def aredeem_ticket(ticket):
+    """
+    (user pk, expires_at) of ``ticket``, or None when it is forged, stale or
+    already used. Single use holds across processes when the response cache
+    is shared (Redis), as the cache generations of the feeds already require.
+    """
+    try:
+        claims = signing.loads(ticket, salt=TICKET_SALT, max_age=settings.LIVE_TICKET_SECONDS)
+    except signing.BadSignature:  # includes SignatureExpired
+        return None
+    if not await get_cache().aadd(f"live-ticket:{claims['nonce']}", 1, settings.LIVE_TICKET_SECONDS + 1):
+        return None
+    return claims["user"], claims["exp"]
+
+
+def delta(old, new):
+    """The part of ``new`` that differs from ``old``: changed keys, one level deep in dicts."""
+    if old is None:
+        return new
+    changed = {}
+    for key, value in new.items():
+        if isinstance(value, dict) and isinstance(old.get(key), dict):
+            inner = {k: v for k, v in value.items() if old[key].get(k) != v}
+            if inner:
+                changed[key] = inner
+        elif old.get(key) != value:
+            changed[key] = value
+    return changed
+
+
+def format_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n"
+
+
+class Feed:
+    def __init__(self, compute, models):
+        self.compute = compute  # async () -> dict
+        self.models = models    # the payload changes when one of these does
+        self.snapshot = None
+        self._subscribers = set()
+        self._task = None
+        self._loop = None
+
+    def subscribe(self):
+        """A queue receiving (event, data): the current snapshot, then the deltas."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:  # a new event loop (tests): start over
+            self._loop, self._task, self.snapshot = loop, None, None
+            self._subscribers = set()
+        queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self._subscribers.add(queue)
+        if self.snapshot is not None:
+            queue.put_nowait(("snapshot", self.snapshot))
+        if self._task is None:
+            self._task = loop.create_task(self._run())
+        return queue
+
+    def unsubscribe(self, queue):
+        self._subscribers.discard(queue)
+
+    def _publish(self, event, data):
+        for queue in self._subscribers:
+            try:
+                queue.put_nowait((event, data))
+            except asyncio.QueueFull:
+                # A stalled client: replace its backlog with the full snapshot
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(("snapshot", self.snapshot))
+
+    async def _run(self):
+        # Aggregates may lag a little; keep them off the primary
+        set_routing_state(RoutingState(use_replica=True))
+        generations = None
+        try:
+            while self._subscribers:
+                current = await aget_generations(self.models)
+                if current != generations:
+                    try:
+                        snapshot = await self.compute()
+                    except Exception:
+                        logger.exception("Live feed update failed")
+                        await asyncio.sleep(settings.LIVE_POLL_SECONDS)
+                        continue
+                    generations = current
+                    changed = delta(self.snapshot, snapshot)
+                    event = "delta" if self.snapshot is not None else "snapshot"
+                    self.snapshot = snapshot
+                    if changed:
+                        self._publish(event, changed)
+                await asyncio.sleep(settings.LIVE_POLL_SECONDS)
+        finally:
+            if self._task is asyncio.current_task():
+                self._task, self.snapshot = None, None
+
+    async def stream(self, queue, visible=None, expires_at=None):
+        """
+        The text/event-stream body for one subscriber. ``visible`` filters the
+        payload keys the subscriber may see. At ``expires_at`` (a timestamp)
+        the stream sends an "expired" event and ends.
+        """
+        try:
+            while True:
+                timeout = settings.LIVE_HEARTBEAT_SECONDS
+                if expires_at is not None:
+                    left = expires_at - time.time()
+                    if left <= 0:
+                        yield format_event("expired", {})
+                        return
+                    timeout = min(timeout, left)
+                try:
+                    event, data = await asyncio.wait_for(queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    if expires_at is not None and expires_at <= time.time():
+                        continue
+                    yield ": keep-alive\n\n"  # keeps proxies from closing an idle stream
+                    continue
+                if visible is not None:
+                    data = {key: value for key, value in data.items() if key in visible}
+                if data:
+                    yield format_event(event, data)
+        finally:
+            self.unsubscribe(queue)
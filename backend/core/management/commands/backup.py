@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core import backup
+
+
+class Command(BaseCommand):
+    help = (
+        "Back up the database and the uploaded files to BACKUP_ROOT. Only files "
+        "whose hash isn't in the store yet are copied."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--root", help="Backup store (default: BACKUP_ROOT).")
+        parser.add_argument("--workers", type=int, default=4, help="Files copied at the same time.")
+        parser.add_argument("--verify", action="store_true", help="Verify the snapshot once written.")
+
+    def handle(self, *args, **options):
+        manifest = backup.backup(options["root"], workers=options["workers"])
+        stats = manifest["stats"]
+        self.stdout.write(
+            f"Snapshot {manifest['name']}: {stats['files']} files, {stats['reused']} already stored, "
+            f"{stats['copied']} copied ({stats['copied_bytes']} bytes)."
+        )
+        if manifest["missing"]:
+            self.stderr.write(f"{len(manifest['missing'])} files could not be read: {manifest['missing']}")
+        if options["verify"]:
+            problems = backup.verify(options["root"], manifest["name"], workers=options["workers"])
+            for name, problem in problems:
+                self.stderr.write(f"{problem}: {name}")
+            if problems:
+                raise CommandError(f"{len(problems)} problems found.")
+        self.stdout.write(self.style.SUCCESS("Backup complete."))
@@ -0,0 +1,114 @@
+import json
+import shutil
+import tempfile
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.test import Client
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+from core.benchmarks import SCENARIOS, BenchmarkContext, percentile, run_scenario
+from core.factories import seed
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a throwaway test database and measure the latency distribution and SQL "
+        "query count of every endpoint. Fails when a query budget is exceeded or when "
+        "p95 latency regresses against a baseline by more than --threshold."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--records", type=int, default=10_000, help="Records to seed (e.g. 10000, 100000, 1000000).")
+        parser.add_argument("--files-per-record", type=int, default=2)
+        parser.add_argument("--audit-logs-per-record", type=int, default=1)
+        parser.add_argument("--repeat", type=int, default=20, help="Measured requests per scenario.")
+        parser.add_argument("--only", nargs="*", default=None, help="Scenario names or tags (e.g. report) to run.")
+        parser.add_argument("--baseline", type=Path, default=None, help="JSON file with the baseline results.")
+        parser.add_argument("--write-baseline", action="store_true", help="Store this run as the baseline.")
+        parser.add_argument("--threshold", type=float, default=0.25, help="Allowed p95 regression (0.25 = 25%%).")
+
+    def handle(self, *args, **options):
+        scenarios = [
+            s for s in SCENARIOS
+            if not options["only"] or s.name in options["only"] or set(s.tags) & set(options["only"])
+        ]
+        if not scenarios:
+            raise CommandError("No scenario matches --only.")
+
+        media_root = tempfile.mkdtemp(prefix="fmsystem-bench-media-")
+        runner = DiscoverRunner(verbosity=0, interactive=False)
+        setup_test_environment()
+        old_config = runner.setup_databases()
+        try:
+            # Repeats measure the endpoints, not the per-user token buckets
+            with override_settings(MEDIA_ROOT=media_root, THROTTLE_BUCKETS={}):
+                self.stdout.write(f"Seeding {options['records']} records...")
+                seed(options["records"], options["files_per_record"], options["audit_logs_per_record"])
+                results = self.measure(scenarios, options["repeat"])
+        finally:
+            runner.teardown_databases(old_config)
+            teardown_test_environment()
+            shutil.rmtree(media_root, ignore_errors=True)
+
+        failures = [
+            f"{name}: {result['queries']} queries, budget is {result['budget']}"
+            for name, result in results.items() if result["queries"] > result["budget"]
+        ]
+        if options["baseline"] and options["baseline"].exists() and not options["write_baseline"]:
+            failures += self.compare(results, options)
+        if options["baseline"] and options["write_baseline"]:
+            options["baseline"].write_text(json.dumps({"records": options["records"], "scenarios": results}, indent=2))
+            self.stdout.write(f"Baseline written to {options['baseline']}")
+
+        if failures:
+            raise CommandError("Benchmark regressions:\n  " + "\n  ".join(failures))
+        self.stdout.write(self.style.SUCCESS("All scenarios within budget."))
+
+    def measure(self, scenarios, repeat):
+        ctx = BenchmarkContext()
+        client = Client()
+        aliases = list(connections)
+        results = {}
+        self.stdout.write(f"{'scenario':36} {'status':>6} {'queries':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+        for scenario in scenarios:
+            samples, queries, status = [], 0, None
+            for attempt in range(repeat + 1):
+                # Roll every request back so repeats measure the same data
+                with transaction.atomic():
+                    response, count, seconds = run_scenario(client, scenario, ctx, aliases)
+                    transaction.set_rollback(True)
+                if not attempt:
+                    continue  # warm-up
+                samples.append(seconds * 1000)
+                queries = max(queries, count)
+                status = response.status_code
+            results[scenario.name] = {
+                "status": status,
+                "queries": queries,
+                "budget": scenario.budget,
+                "p50": percentile(samples, 0.50),
+                "p95": percentile(samples, 0.95),
+                "p99": percentile(samples, 0.99),
+            }
+            r = results[scenario.name]
+            self.stdout.write(
+                f"{scenario.name:36} {status:>6} {queries:>7} {r['p50']:>9.2f} {r['p95']:>9.2f} {r['p99']:>9.2f}"
+            )
+        return results
+
+    def compare(self, results, options):
+        baseline = json.loads(options["baseline"].read_text())
+        if baseline.get("records") != options["records"]:
+            self.stderr.write(
+                f"Baseline was recorded with {baseline.get('records')} records, this run used {options['records']}."
+            )
+        failures = []
+        limit = 1 + options["threshold"]
+        for name, result in results.items():
+            before = baseline["scenarios"].get(name)
+            if before and result["p95"] > before["p95"] * limit:
+                failures.append(f"{name}: p95 {result['p95']:.2f} ms vs baseline {before['p95']:.2f} ms")
+        return failures
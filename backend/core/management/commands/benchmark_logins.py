@@ -0,0 +1,90 @@
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.test import Client
+from django.test.runner import DiscoverRunner
+from django.test.utils import CaptureQueriesContext, override_settings, setup_test_environment, teardown_test_environment
+
+from core.benchmarks import PASSWORD, percentile
+from core.factories import make_user
+
+FAST_HASHERS = ["django.contrib.auth.hashers.MD5PasswordHasher"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure JWT logins per second on a throwaway test database: many users "
+        "logging in at shift start. Reports throughput, latency and SQL queries per login."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=200, help="Distinct users logging in.")
+        parser.add_argument("--logins", type=int, default=1000, help="Measured logins, spread over the users.")
+        parser.add_argument("--threads", type=int, default=1, help="Concurrent clients (use PostgreSQL for >1).")
+        parser.add_argument("--path", default="/api/accounts/login/")
+        parser.add_argument(
+            "--fast-hashers", action="store_true",
+            help="Use a cheap password hasher to measure everything but the password check.",
+        )
+
+    def handle(self, *args, **options):
+        runner = DiscoverRunner(verbosity=0, interactive=False)
+        setup_test_environment()
+        old_config = runner.setup_databases()
+        hashers = FAST_HASHERS if options["fast_hashers"] else None
+        try:
+            with override_settings(**({"PASSWORD_HASHERS": hashers} if hashers else {})):
+                usernames = [f"login-bench-{n}" for n in range(options["users"])]
+                for n, username in enumerate(usernames):
+                    make_user(username, ("Editors", "Viewers")[n % 2], PASSWORD)
+                self.measure(usernames, options)
+        finally:
+            runner.teardown_databases(old_config)
+            teardown_test_environment()
+
+    def login(self, client, username, path):
+        started = time.perf_counter()
+        response = client.post(path, {"username": username, "password": PASSWORD}, content_type="application/json")
+        if response.status_code != 200:
+            raise RuntimeError(f"Login of {username} failed with {response.status_code}")
+        return time.perf_counter() - started
+
+    def measure(self, usernames, options):
+        path = options["path"]
+        client = Client()
+        with CaptureQueriesContext(connection) as queries:
+            self.login(client, usernames[0], path)  # warm-up, and the query count
+        per_thread = options["logins"] // options["threads"]
+        samples, errors = [], []
+
+        def worker(offset):
+            thread_client = Client()
+            try:
+                for n in range(per_thread):
+                    samples.append(self.login(thread_client, usernames[(offset + n) % len(usernames)], path))
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connections.close_all()  # this thread's connections
+
+        threads = [threading.Thread(target=worker, args=(i * per_thread,)) for i in range(options["threads"])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        if errors:
+            raise errors[0]
+
+        milliseconds = [sample * 1000 for sample in samples]
+        self.stdout.write(
+            f"{len(samples)} logins in {elapsed:.2f} s with {options['threads']} thread(s): "
+            f"{len(samples) / elapsed:.1f} logins/s"
+        )
+        self.stdout.write(
+            f"p50 {percentile(milliseconds, 0.50):.2f} ms, p95 {percentile(milliseconds, 0.95):.2f} ms, "
+            f"p99 {percentile(milliseconds, 0.99):.2f} ms, {len(queries)} queries per login"
+        )
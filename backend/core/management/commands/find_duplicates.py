@@ -0,0 +1,29 @@
+import os
+
+from django.core.management.base import BaseCommand
+
+from core import dedup
+
+
+class Command(BaseCommand):
+    help = (
+        "Find records that probably describe the same owner or archive folder and "
+        "replace the open DuplicateCluster rows with them for review."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                            help="Processes comparing the blocks (1: no process pool).")
+        parser.add_argument("--threshold", type=float, default=dedup.THRESHOLD,
+                            help="Lowest score of a candidate pair, between 0 and 1.")
+        parser.add_argument("--dry-run", action="store_true", help="List the clusters without saving them.")
+
+    def handle(self, *args, **options):
+        scanned, clusters = dedup.find(workers=options["workers"], threshold=options["threshold"])
+        if options["dry_run"]:
+            for pks, score, reasons in clusters:
+                self.stdout.write(f"{score:.2f} {', '.join(reasons)}: {' '.join(map(str, pks))}")
+            self.stdout.write(self.style.SUCCESS(f"Scanned {scanned} records. Found {len(clusters)} clusters."))
+            return
+        saved = dedup.save(clusters)
+        self.stdout.write(self.style.SUCCESS(f"Scanned {scanned} records. Saved {saved} clusters for review."))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from core import jobs
+from core.models import RecordFile
+from core.tasks import extract_file_text
+
+
+class Command(BaseCommand):
+    help = (
+        "Queue text extraction for the uploaded PDFs that have none yet (files "
+        "uploaded before the full-text search existed). runworker does the work."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--all", action="store_true", help="Extract again the files already indexed.")
+
+    def handle(self, *args, **options):
+        files = RecordFile.objects.filter(Q(type="application/pdf") | Q(uploaded_file__iendswith=".pdf"))
+        if not options["all"]:
+            files = files.filter(text__isnull=True)
+        queued = 0
+        for file_id in files.values_list("pk", flat=True).iterator():
+            jobs.enqueue(extract_file_text, file_id)
+            queued += 1
+        self.stdout.write(self.style.SUCCESS(f"Queued {queued} files."))
@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core import blobs
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete the stored files queued in the BlobDeletion outbox (deleted or "
+        "replaced RecordFiles). Run it from cron, or as a worker with --loop."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=blobs.BATCH_SIZE)
+        parser.add_argument("--loop", action="store_true", help="Keep polling the outbox.")
+        parser.add_argument("--interval", type=float, default=5.0, help="Seconds between polls with --loop.")
+
+    def handle(self, *args, **options):
+        while True:
+            deleted = blobs.process_deletions(batch_size=options["batch_size"])
+            if deleted or not options["loop"]:
+                self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} files."))
+            if not options["loop"]:
+                return
+            time.sleep(options["interval"])
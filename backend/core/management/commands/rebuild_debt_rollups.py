@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from core import rollups
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the DebtRollup table from the records. Record signals keep it "
+        "current afterwards; run this after migrating and after bulk loads that bypass them."
+    )
+
+    def handle(self, *args, **options):
+        count = rollups.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} debt rollups."))
@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core import backup
+
+
+class Command(BaseCommand):
+    help = (
+        "Restore a backup snapshot: copy its files back into the storage and "
+        "replace the database with its dump."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("snapshot", nargs="?", help="Snapshot name (default: the latest).")
+        parser.add_argument("--root", help="Backup store (default: BACKUP_ROOT).")
+        parser.add_argument("--workers", type=int, default=4, help="Files copied at the same time.")
+        parser.add_argument("--files-only", action="store_true", help="Leave the database alone.")
+        parser.add_argument("--overwrite", action="store_true", help="Replace the files already in the storage.")
+        parser.add_argument("--noinput", "--no-input", action="store_false", dest="interactive",
+                            help="Don't ask before replacing the database.")
+
+    def handle(self, *args, **options):
+        try:
+            name = backup.snapshot_name(options["root"] or settings.BACKUP_ROOT, options["snapshot"])
+        except backup.BackupError as exc:
+            raise CommandError(exc)
+        if not options["files_only"]:
+            if options["interactive"] and input(
+                    f"This replaces all the data in the database with snapshot {name}. Type 'yes' to continue: ") != "yes":
+                raise CommandError("Restore cancelled.")
+            backup.restore_database(options["root"], name)
+            self.stdout.write(f"Database restored from {name}.")
+        restored = backup.restore_files(options["root"], name, workers=options["workers"],
+                                        overwrite=options["overwrite"])
+        self.stdout.write(self.style.SUCCESS(f"Restored {restored} files from {name}."))
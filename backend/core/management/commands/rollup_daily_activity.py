@@ -0,0 +1,25 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import rollups
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill the DailyActivity table for the days since the last run (that day "
+        "included, it may have been partial). Schedule it, e.g. hourly from cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--since", help="Recompute from this date (YYYY-MM-DD) instead.")
+
+    def handle(self, *args, **options):
+        since = None
+        if options["since"]:
+            try:
+                since = datetime.date.fromisoformat(options["since"])
+            except ValueError:
+                raise CommandError("--since must be a date (YYYY-MM-DD).")
+        days = rollups.rollup_daily_activity(since)
+        self.stdout.write(self.style.SUCCESS(f"Rolled up {days} days of activity."))
@@ -0,0 +1,32 @@
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+
+from core import jobs
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the background jobs queued in the database (core/jobs.py). Start as "
+        "many workers as needed; they never take each other's jobs."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=1, help="Jobs run at the same time (threads).")
+        parser.add_argument("--poll", type=float, default=jobs.POLL_INTERVAL, help="Seconds between polls when idle.")
+        parser.add_argument("--once", action="store_true", help="Run the jobs due now, then exit.")
+
+    def handle(self, *args, **options):
+        if options["once"]:
+            jobs.requeue_stale()
+            ran = jobs.run_pending()
+            self.stdout.write(self.style.SUCCESS(f"Ran {ran} jobs."))
+            return
+        stop = threading.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            # Let the running jobs finish, then exit
+            signal.signal(signum, lambda *_: stop.set())
+        self.stdout.write(f"Worker started with {options['concurrency']} threads.")
+        jobs.work(options["concurrency"], options["poll"], stop)
+        self.stdout.write(self.style.SUCCESS("Worker stopped."))
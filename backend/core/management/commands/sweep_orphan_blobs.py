@@ -0,0 +1,29 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+
+from core import blobs
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete the files of the upload directory that no RecordFile references "
+        "(failed uploads, files deleted before the outbox existed)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="List the orphans without deleting them.")
+        parser.add_argument(
+            "--min-age", type=int, default=int(blobs.SWEEP_MIN_AGE.total_seconds() // 60),
+            help="Leave files younger than this many minutes alone (uploads in flight).",
+        )
+
+    def handle(self, *args, **options):
+        scanned, orphans = blobs.sweep_orphans(
+            min_age=datetime.timedelta(minutes=options["min_age"]), dry_run=options["dry_run"],
+        )
+        if options["dry_run"]:
+            for path in orphans:
+                self.stdout.write(path)
+        verb = "Found" if options["dry_run"] else "Deleted"
+        self.stdout.write(self.style.SUCCESS(f"Scanned {scanned} files. {verb} {len(orphans)} orphans."))
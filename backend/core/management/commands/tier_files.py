@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core import tiering
+
+
+class Command(BaseCommand):
+    help = (
+        "Compress the uploaded files nobody has read for --days days, and store "
+        "plain again the compressed ones that are being read. Run it nightly."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=settings.TIER_COLD_AFTER_DAYS,
+                            help="Days without a read after which a file is compressed.")
+        parser.add_argument("--min-saving", type=float, default=tiering.MIN_SAVING,
+                            help="Smallest saving (a fraction) worth keeping a file compressed.")
+        parser.add_argument("--dry-run", action="store_true", help="Count the files without moving them.")
+
+    def handle(self, *args, **options):
+        stats = tiering.tier(days=options["days"], min_saving=options["min_saving"], dry_run=options["dry_run"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Compressed {stats['compressed']} files ({stats['bytes_saved']} bytes saved), "
+            f"left {stats['kept_plain']} plain, decompressed {stats['decompressed']}, "
+            f"{stats['missing']} missing."
+        ))
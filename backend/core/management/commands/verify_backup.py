@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core import backup
+
+
+class Command(BaseCommand):
+    help = "Check that the dump and every file of a backup snapshot are there and intact."
+
+    def add_arguments(self, parser):
+        parser.add_argument("snapshot", nargs="?", help="Snapshot name (default: the latest).")
+        parser.add_argument("--root", help="Backup store (default: BACKUP_ROOT).")
+        parser.add_argument("--workers", type=int, default=4, help="Files hashed at the same time.")
+
+    def handle(self, *args, **options):
+        try:
+            problems = backup.verify(options["root"], options["snapshot"], workers=options["workers"])
+        except backup.BackupError as exc:
+            raise CommandError(exc)
+        for name, problem in problems:
+            self.stderr.write(f"{problem}: {name}")
+        if problems:
+            raise CommandError(f"{len(problems)} problems found.")
+        self.stdout.write(self.style.SUCCESS("Snapshot verified."))
@@ -0,0 +1,173 @@
+# backend/core/metrics.py
+"""
+In-process request metrics, rendered in the Prometheus text format on /metrics.
+
+RequestMetricsMiddleware (core/middleware.py) feeds the registry with the total
+and SQL time of every sampled request, labelled by URL name. Each worker process
+keeps its own registry; scrape every worker (or run a single one) to see them all.
+
+Other modules add gauges with ``register_collector``: a collector is a callable
+returning an iterable of ``(name, type, help, [(labels, value), ...])``.
+"""
+
+import bisect
+import functools
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.db import connections
+
+# Upper bounds in seconds; the +Inf bucket is implicit
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Cumulative-bucket histogram, as Prometheus expects it."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def samples(self):
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            cumulative += count
+            yield ("+Inf" if bound == float("inf") else repr(bound)), cumulative
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._durations = {}     # (view, method) -> Histogram
+        self._sql_durations = {}  # (view, method) -> Histogram
+        self._sql_queries = {}   # (view, method) -> int
+        self._requests = {}      # (view, method, status) -> int
+        self._collectors = []
+
+    def observe(self, view, method, status, seconds, sql_seconds, sql_queries):
+        key = (view, method)
+        with self._lock:
+            self._durations.setdefault(key, Histogram()).observe(seconds)
+            self._sql_durations.setdefault(key, Histogram()).observe(sql_seconds)
+            self._sql_queries[key] = self._sql_queries.get(key, 0) + sql_queries
+            status_key = (view, method, str(status))
+            self._requests[status_key] = self._requests.get(status_key, 0) + 1
+
+    def register_collector(self, collector):
+        if collector not in self._collectors:
+            self._collectors.append(collector)
+        return collector
+
+    def reset(self):
+        with self._lock:
+            self._durations.clear()
+            self._sql_durations.clear()
+            self._sql_queries.clear()
+            self._requests.clear()
+
+    def render(self):
+        lines = []
+        with self._lock:
+            _histogram(lines, "http_request_duration_seconds",
+                       "Time spent handling the request.", self._durations)
+            _histogram(lines, "http_request_sql_duration_seconds",
+                       "Time spent in SQL queries while handling the request.", self._sql_durations)
+            _counter(lines, "http_request_sql_queries_total", "SQL queries run by requests.",
+                     {_labels(view=v, method=m): n for (v, m), n in self._sql_queries.items()})
+            _counter(lines, "http_requests_total", "Requests handled.",
+                     {_labels(view=v, method=m, status=s): n for (v, m, s), n in self._requests.items()})
+        for collector in list(self._collectors):
+            for name, kind, help_text, samples in collector():
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                lines.extend(f"{name}{_labels(**labels)} {value}" for labels, value in samples)
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(**labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _histogram(lines, name, help_text, histograms):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} histogram")
+    for (view, method), histogram in sorted(histograms.items()):
+        for bound, count in histogram.samples():
+            lines.append(f"{name}_bucket{_labels(view=view, method=method, le=bound)} {count}")
+        lines.append(f"{name}_sum{_labels(view=view, method=method)} {histogram.sum}")
+        lines.append(f"{name}_count{_labels(view=view, method=method)} {sum(histogram.counts)}")
+
+
+def _counter(lines, name, help_text, values):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} counter")
+    lines.extend(f"{name}{labels} {value}" for labels, value in sorted(values.items()))
+
+
+class QueryTimer:
+    """``connection.execute_wrapper`` hook that adds up the time and number of queries."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - start
+            self.count += 1
+
+    def install(self, stack: ExitStack):
+        """Wrap every configured connection for the lifetime of ``stack``."""
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(self))
+        return self
+
+
+# Hooks of the current async request. Concurrent async requests run their queries on
+# the same connection (that of the thread-sensitive executor), so a hook installed on
+# it would see them all; instead one permanent wrapper calls the hooks of the context
+# the query runs in, which sync_to_async carries into the executor.
+_context_hooks = ContextVar('query_hooks', default=())
+
+
+def _run_context_hooks(execute, sql, params, many, context):
+    for hook in _context_hooks.get():
+        execute = functools.partial(hook, execute)
+    return execute(sql, params, many, context)
+
+
+def wrap_connections():
+    """Add the context hooks wrapper to the connections of the calling thread (once)."""
+    for connection in connections.all():
+        if _run_context_hooks not in connection.execute_wrappers:
+            connection.execute_wrappers.insert(0, _run_context_hooks)
+
+
+@contextmanager
+def context_hook(hook):
+    """Run ``hook`` on the queries of the current context only; see ``wrap_connections``."""
+    token = _context_hooks.set(_context_hooks.get() + (hook,))
+    try:
+        yield hook
+    finally:
+        _context_hooks.reset(token)
+
+
+registry = MetricsRegistry()
+register_collector = registry.register_collector
@@ -0,0 +1,252 @@
+# backend/core/middleware.py
+
+import hashlib
+import random
+import re
+import threading
+import time
+from contextlib import ExitStack
+
+import jwt
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+from django.db import connections
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.text import compress_string
+
+from . import deferred
+from .metrics import QueryTimer, context_hook, registry, wrap_connections
+from .profiling import QueryRecorder, StackSampler, format_profile, format_samples, save_profile, start_cprofile
+from .routers import REPLICA_ALIAS, RoutingState, is_replica_view, set_routing_state, get_routing_state
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def _client_key(request):
+    """
+    Identify the client that issued a request: the JWT user, else the session, else the IP.
+    The token is only decoded, not verified; a forged one can do no more than pin reads to the primary.
+    """
+    header = request.META.get('HTTP_AUTHORIZATION', '')
+    if header.startswith('Bearer '):
+        try:
+            claims = jwt.decode(header[7:], options={'verify_signature': False})
+            return f"user:{claims.get('user_id')}"
+        except jwt.PyJWTError:
+            pass
+    session = request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    if session:
+        return "session:" + hashlib.sha1(session.encode()).hexdigest()
+    return f"ip:{request.META.get('REMOTE_ADDR', '')}"
+
+
+class ReplicaRoutingMiddleware(MiddlewareMixin):
+    """
+    Sends the reads of replica-safe views to the replica, unless the client
+    wrote something in the last REPLICA_PIN_SECONDS (read-your-own-writes).
+
+    The pins are kept in the REPLICA_PIN_CACHE_ALIAS cache, which every worker
+    process must share: a client's next request may reach another worker. A
+    process-local cache is refused as soon as the replica is a separate database.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.pins = caches[settings.REPLICA_PIN_CACHE_ALIAS]
+        if isinstance(self.pins, (LocMemCache, DummyCache)) and _separate_replica():
+            raise ImproperlyConfigured(
+                f"REPLICA_PIN_CACHE_ALIAS ({settings.REPLICA_PIN_CACHE_ALIAS!r}) must name a cache shared "
+                "by all the workers (redis, or file on a single host) when the replica is a separate database"
+            )
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        use_replica = (
+            request.method in SAFE_METHODS
+            and is_replica_view(view_func)
+            and not self.pins.get("db-pin:" + _client_key(request))
+        )
+        set_routing_state(RoutingState(use_replica=use_replica))
+
+    def process_response(self, request, response):
+        state = get_routing_state()
+        if state and state.wrote:
+            self.pins.set("db-pin:" + _client_key(request), True, settings.REPLICA_PIN_SECONDS)
+        set_routing_state(None)
+        return response
+
+
+def _separate_replica():
+    """Whether the replica alias points at another database than the primary (not a test mirror)."""
+    if REPLICA_ALIAS not in settings.DATABASES:
+        return False
+    primary, replica = connections['default'].settings_dict, connections[REPLICA_ALIAS].settings_dict
+    keys = ('ENGINE', 'HOST', 'PORT', 'NAME')
+    return any(primary.get(key) != replica.get(key) for key in keys)
+
+
+def _accepts(header, coding):
+    match = re.search(rf'\b{coding}\b(?:\s*;\s*q=([0-9.]+))?', header)
+    return bool(match) and float(match.group(1) or 1) > 0
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Brotli (with the brotli package installed) or gzip, as the client's
+    Accept-Encoding allows, for responses of COMPRESS_MIN_LENGTH bytes or more.
+    Same rules as Django's GZipMiddleware, except that streaming responses (file
+    downloads, Server-Sent Events) are passed through untouched.
+    """
+
+    def process_response(self, request, response):
+        if response.streaming or response.has_header('Content-Encoding'):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if len(response.content) < settings.COMPRESS_MIN_LENGTH:
+            return response
+
+        accept = request.META.get('HTTP_ACCEPT_ENCODING', '')
+        if brotli is not None and _accepts(accept, 'br'):
+            coding, compressed = 'br', brotli.compress(response.content, quality=settings.BROTLI_QUALITY)
+        elif _accepts(accept, 'gzip'):
+            coding, compressed = 'gzip', compress_string(response.content)
+        else:
+            return response
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response.headers['Content-Length'] = str(len(compressed))
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = coding
+        return response
+
+
+class DeferredCallsMiddleware(MiddlewareMixin):
+    """Runs the calls deferred during the request (core/deferred.py) once the response is sent."""
+
+    def process_response(self, request, response):
+        deferred.attach(request, response)
+        return response
+
+
+class RequestMetricsMiddleware:
+    """
+    Times a sample of requests (METRICS_SAMPLE_RATE) and the SQL they run, adds a
+    Server-Timing header and feeds the per-URL-name histograms served on /metrics.
+    Unsampled requests pass straight through.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'METRICS_SAMPLE_RATE', 1.0)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def _sampled(self):
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self._sampled():
+            return self.get_response(request)
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            timer = QueryTimer().install(stack)
+            response = self.get_response(request)
+        return self._record(request, response, timer, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        if not self._sampled():
+            return await self.get_response(request)
+        start = time.perf_counter()
+        # Other async requests share the executor's connections: count only
+        # the queries run on behalf of this one.
+        await sync_to_async(wrap_connections)()
+        with context_hook(QueryTimer()) as timer:
+            response = await self.get_response(request)
+        return self._record(request, response, timer, time.perf_counter() - start)
+
+    def _record(self, request, response, timer, seconds):
+        match = getattr(request, 'resolver_match', None)
+        view = (match.url_name or match.route) if match else 'unresolved'
+        registry.observe(view, request.method, response.status_code, seconds, timer.seconds, timer.count)
+        response['Server-Timing'] = (
+            f'total;dur={seconds * 1000:.1f}, '
+            f'sql;dur={timer.seconds * 1000:.1f};desc="{timer.count} queries"'
+        )
+        return response
+
+
+class RequestProfilingMiddleware:
+    """
+    Opt-in (PROFILING_ENABLED) profiling of sampled and slow requests, stored as
+    RequestProfile rows browsable in the admin. See core/profiling.py.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'PROFILING_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = settings.PROFILE_SAMPLE_RATE
+        self.slow_seconds = settings.PROFILE_SLOW_REQUEST_MS / 1000
+        self.sampler = StackSampler(settings.PROFILE_STACK_INTERVAL_MS / 1000)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        profiler = start_cprofile() if random.random() < self.sample_rate else None
+        thread_id = threading.get_ident()
+        samples = None if profiler else self.sampler.watch(thread_id)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                recorder = QueryRecorder().install(stack)
+                response = self.get_response(request)
+        finally:
+            seconds = time.perf_counter() - start
+            if profiler:
+                profiler.disable()
+            else:
+                self.sampler.unwatch(thread_id)
+        if profiler:
+            save_profile(request, response, 'sampled', seconds, recorder, format_profile(profiler))
+        elif seconds >= self.slow_seconds:
+            save_profile(request, response, 'slow', seconds, recorder,
+                         format_samples(samples, self.sampler.interval))
+        return response
+
+    async def __acall__(self, request):
+        # Async requests are neither run under cProfile nor stack-sampled: the
+        # event loop and the executor thread interleave concurrent requests, whose
+        # stacks can't be told apart. Only their own queries are kept.
+        sampled = random.random() < self.sample_rate
+        await sync_to_async(wrap_connections)()
+        start = time.perf_counter()
+        with context_hook(QueryRecorder()) as recorder:
+            response = await self.get_response(request)
+        seconds = time.perf_counter() - start
+        if sampled or seconds >= self.slow_seconds:
+            await sync_to_async(save_profile)(
+                request, response, 'sampled' if sampled else 'slow', seconds, recorder,
+                'Not profiled: async request',
+            )
+        return response
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.2 on 2026-10-19 17:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_remove_auditlog_ip_auditlog_details_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('reason', models.CharField(choices=[('sampled', 'Sampled'), ('slow', 'Slow')], max_length=16)),
+                ('method', models.CharField(max_length=10)),
+                ('path', models.CharField(max_length=2048)),
+                ('view_name', models.CharField(blank=True, max_length=255)),
+                ('status_code', models.PositiveSmallIntegerField(null=True)),
+                ('duration_ms', models.FloatField()),
+                ('sql_count', models.PositiveIntegerField(default=0)),
+                ('sql_ms', models.FloatField(default=0)),
+                ('profile', models.TextField(blank=True)),
+                ('queries', models.JSONField(blank=True, default=list)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.2 on 2026-10-19 17:47
+
+from django.db import migrations, models
+
+from core.operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('core', '0016_requestprofile'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='auditlog',
+            index=models.Index(fields=['-timestamp'], name='auditlog_timestamp_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='auditlog',
+            index=models.Index(fields=['action', 'timestamp'], name='auditlog_action_time_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='record',
+            index=models.Index(fields=['kebele'], name='record_kebele_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='record',
+            index=models.Index(fields=['ServiceOfEstate'], name='record_service_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='record',
+            index=models.Index(fields=['proofOfPossession'], name='record_proof_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='record',
+            index=models.Index(fields=['possessionStatus'], name='record_possession_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='record',
+            index=models.Index(fields=['-created_at'], name='record_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='recordfile',
+            index=models.Index(fields=['uploaded_at'], name='recordfile_uploaded_idx'),
+        ),
+    ]
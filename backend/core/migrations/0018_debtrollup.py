@@ -0,0 +1,32 @@
+# Generated by Django 5.2.2 on 2026-10-19 17:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_record_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DebtRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kebele', models.CharField(max_length=255)),
+                ('ServiceOfEstate', models.CharField(max_length=255)),
+                ('placeLevel', models.CharField(max_length=255)),
+                ('record_count', models.PositiveIntegerField(default=0)),
+                ('records_in_debt', models.PositiveIntegerField(default=0)),
+                ('unpaidTaxDebt', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('unpaidPropTaxDebt', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('unpaidLeaseDebt', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('histogram', models.JSONField(default=list)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('kebele', 'ServiceOfEstate', 'placeLevel'), name='debtrollup_group_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,106 @@
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+# Record column -> lookup model
+LOOKUPS = {
+    'kebele': 'Kebele',
+    'ServiceOfEstate': 'EstateService',
+    'placeLevel': 'PlaceLevel',
+    'possessionStatus': 'PossessionStatus',
+    'proofOfPossession': 'PossessionProof',
+    'DebtRestriction': 'DebtRestrictionType',
+}
+ROLLUP_FIELDS = ('kebele', 'ServiceOfEstate', 'placeLevel')
+
+
+def _models(apps):
+    return [(apps.get_model('core', 'Record'), list(LOOKUPS)),
+            (apps.get_model('core', 'DebtRollup'), list(ROLLUP_FIELDS))]
+
+
+def encode(apps, schema_editor):
+    """Fill the lookup tables with the distinct labels and point every row at its key."""
+    for field, model_name in LOOKUPS.items():
+        Lookup = apps.get_model('core', model_name)
+        labels = set()
+        for model, fields in _models(apps):
+            if field in fields:
+                labels.update(model.objects.values_list(field, flat=True).distinct())
+        Lookup.objects.bulk_create([Lookup(name=label) for label in sorted(labels)])
+        key = Subquery(Lookup.objects.filter(name=OuterRef(field)).values('pk')[:1])
+        for model, fields in _models(apps):
+            if field in fields:
+                model.objects.update(**{f'{field}_key': key})
+
+
+def decode(apps, schema_editor):
+    for field, model_name in LOOKUPS.items():
+        Lookup = apps.get_model('core', model_name)
+        label = Subquery(Lookup.objects.filter(pk=OuterRef(f'{field}_key')).values('name')[:1])
+        for model, fields in _models(apps):
+            if field in fields:
+                model.objects.update(**{field: label})
+
+
+def _lookup_model(name):
+    return migrations.CreateModel(
+        name=name,
+        fields=[
+            ('id', models.SmallAutoField(primary_key=True, serialize=False)),
+            ('name', models.CharField(max_length=255, unique=True)),
+        ],
+        options={
+            'ordering': ['name'],
+            'abstract': False,
+            **({'verbose_name_plural': 'possession statuses'} if name == 'PossessionStatus' else {}),
+        },
+    )
+
+
+def _foreign_key(model_name, null, rollup=False):
+    return models.ForeignKey(
+        null=null,
+        on_delete=django.db.models.deletion.CASCADE if rollup else django.db.models.deletion.PROTECT,
+        related_name='+' if rollup else None,
+        to=f'core.{model_name.lower()}',
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_dailyactivity'),
+    ]
+
+    operations = [
+        *[_lookup_model(name) for name in LOOKUPS.values()],
+        # The foreign keys get their own indexes
+        migrations.RemoveIndex(model_name='record', name='record_kebele_idx'),
+        migrations.RemoveIndex(model_name='record', name='record_service_idx'),
+        migrations.RemoveIndex(model_name='record', name='record_proof_idx'),
+        migrations.RemoveIndex(model_name='record', name='record_possession_idx'),
+        migrations.RemoveConstraint(model_name='debtrollup', name='debtrollup_group_uniq'),
+        *[migrations.AddField('record', f'{field}_key', _foreign_key(model_name, null=True))
+          for field, model_name in LOOKUPS.items()],
+        *[migrations.AddField('debtrollup', f'{field}_key', _foreign_key(LOOKUPS[field], null=True, rollup=True))
+          for field in ROLLUP_FIELDS],
+        # Nullable while converting, so that unapplying can re-add them before decode() fills them
+        *[migrations.AlterField('record', field, models.CharField(max_length=255, null=True)) for field in LOOKUPS],
+        *[migrations.AlterField('debtrollup', field, models.CharField(max_length=255, null=True))
+          for field in ROLLUP_FIELDS],
+        migrations.RunPython(encode, decode),
+        *[migrations.RemoveField('record', field) for field in LOOKUPS],
+        *[migrations.RemoveField('debtrollup', field) for field in ROLLUP_FIELDS],
+        *[migrations.RenameField('record', f'{field}_key', field) for field in LOOKUPS],
+        *[migrations.RenameField('debtrollup', f'{field}_key', field) for field in ROLLUP_FIELDS],
+        *[migrations.AlterField('record', field, _foreign_key(model_name, null=False))
+          for field, model_name in LOOKUPS.items()],
+        *[migrations.AlterField('debtrollup', field, _foreign_key(LOOKUPS[field], null=False, rollup=True))
+          for field in ROLLUP_FIELDS],
+        migrations.AddConstraint(
+            model_name='debtrollup',
+            constraint=models.UniqueConstraint(fields=('kebele', 'ServiceOfEstate', 'placeLevel'),
+                                               name='debtrollup_group_uniq'),
+        ),
+    ]
@@ -0,0 +1,50 @@
+import re
+
+from django.db import migrations, models
+
+LOCATION_FIELDS = {
+    'Row': 'location_row',
+    'ShelfNumber': 'location_shelf',
+    'FolderNumber': 'location_folder',
+    'sortingNumber': 'location_position',
+}
+BATCH_SIZE = 2000
+INTEGER_MAX = 2**31 - 1  # widened to bigint by 0031, which fills in the longer numbers
+
+
+def _number(value):
+    match = re.search(r'\d+', value or '')
+    if not match:
+        return None
+    number = int(match.group())
+    return number if number <= INTEGER_MAX else None
+
+
+def fill_locations(apps, schema_editor):
+    Record = apps.get_model('core', 'Record')
+    batch = []
+    for record in Record.objects.only('pk', *LOCATION_FIELDS).iterator(chunk_size=BATCH_SIZE):
+        for field, normalized in LOCATION_FIELDS.items():
+            setattr(record, normalized, _number(getattr(record, field)))
+        batch.append(record)
+        if len(batch) == BATCH_SIZE:
+            Record.objects.bulk_update(batch, list(LOCATION_FIELDS.values()))
+            batch = []
+    if batch:
+        Record.objects.bulk_update(batch, list(LOCATION_FIELDS.values()))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_lookup_tables'),
+    ]
+
+    operations = [
+        *[migrations.AddField(
+            model_name='record',
+            name=normalized,
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ) for normalized in LOCATION_FIELDS.values()],
+        migrations.RunPython(fill_locations, migrations.RunPython.noop),
+    ]
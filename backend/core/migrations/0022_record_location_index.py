@@ -0,0 +1,22 @@
+from django.db import migrations, models
+
+from core.operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('core', '0021_record_location'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='record',
+            index=models.Index(
+                fields=['location_row', 'location_shelf', 'location_folder', 'location_position'],
+                name='record_location_idx',
+            ),
+        ),
+    ]
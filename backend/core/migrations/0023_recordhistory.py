@@ -0,0 +1,29 @@
+# Generated by Django 5.2.2 on 2026-10-19 18:00
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0022_record_location_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecordHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('changed_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.CharField(blank=True, max_length=255, null=True)),
+                ('changes', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('record', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='history', to='core.record')),
+            ],
+            options={
+                'verbose_name_plural': 'record history',
+                'indexes': [models.Index(fields=['record', '-changed_at'], name='recordhistory_record_time_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+from django.db import migrations, models
+
+from core.operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('core', '0024_blobdeletion'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='recordfile',
+            index=models.Index(fields=['uploaded_file'], name='recordfile_path_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.2 on 2026-10-19 18:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0025_recordfile_path_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DuplicateCluster',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reasons', models.JSONField(default=list)),
+                ('score', models.FloatField()),
+                ('size', models.PositiveIntegerField()),
+                ('status', models.CharField(choices=[('open', 'Open'), ('confirmed', 'Confirmed'), ('dismissed', 'Dismissed')], default='open', max_length=16)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('reviewed_by', models.CharField(blank=True, max_length=255, null=True)),
+                ('records', models.ManyToManyField(related_name='duplicate_clusters', to='core.record')),
+            ],
+            options={
+                'ordering': ['-score', 'pk'],
+                'indexes': [models.Index(fields=['status', '-score'], name='duplicatecluster_review_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.2 on 2026-10-19 18:31
+
+import django.contrib.postgres.search
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0027_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FileText',
+            fields=[
+                ('file', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='text', serialize=False, to='core.recordfile')),
+                ('content', models.TextField(blank=True)),
+                ('pages', models.PositiveIntegerField(default=0)),
+                ('search_vector', django.contrib.postgres.search.SearchVectorField(editable=False, null=True)),
+                ('extracted_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,21 @@
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+from core.operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('core', '0028_filetext'),
+    ]
+
+    operations = [
+        # A GIN index: PostgreSQL only, skipped on SQLite
+        AddIndexConcurrently(
+            model_name='filetext',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='filetext_search_idx'),
+        ),
+    ]
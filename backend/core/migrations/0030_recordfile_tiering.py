@@ -0,0 +1,23 @@
+# Generated by Django 5.2.2 on 2026-10-19 18:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0029_filetext_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recordfile',
+            name='last_accessed',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='recordfile',
+            name='tiered_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
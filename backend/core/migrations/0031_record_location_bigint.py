@@ -0,0 +1,55 @@
+import re
+
+from django.db import migrations, models
+from django.db.models import Q
+
+LOCATION_FIELDS = {
+    'Row': 'location_row',
+    'ShelfNumber': 'location_shelf',
+    'FolderNumber': 'location_folder',
+    'sortingNumber': 'location_position',
+}
+LOCATION_MAX = 2**63 - 1
+BATCH_SIZE = 2000
+
+
+def _number(value):
+    match = re.search(r'\d+', value or '')
+    if not match:
+        return None
+    number = int(match.group())
+    return number if number <= LOCATION_MAX else None
+
+
+def fill_long_locations(apps, schema_editor):
+    # 0021 left NULL the numbers too long for an integer column
+    Record = apps.get_model('core', 'Record')
+    long_runs = Q()
+    for field, normalized in LOCATION_FIELDS.items():
+        long_runs |= Q(**{f'{normalized}__isnull': True, f'{field}__regex': r'[0-9]{10}'})
+    batch = []
+    for record in Record.objects.filter(long_runs).only('pk', *LOCATION_FIELDS).iterator(chunk_size=BATCH_SIZE):
+        for field, normalized in LOCATION_FIELDS.items():
+            setattr(record, normalized, _number(getattr(record, field)))
+        batch.append(record)
+        if len(batch) == BATCH_SIZE:
+            Record.objects.bulk_update(batch, list(LOCATION_FIELDS.values()))
+            batch = []
+    if batch:
+        Record.objects.bulk_update(batch, list(LOCATION_FIELDS.values()))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0030_recordfile_tiering'),
+    ]
+
+    operations = [
+        *[migrations.AlterField(
+            model_name='record',
+            name=normalized,
+            field=models.PositiveBigIntegerField(blank=True, editable=False, null=True),
+        ) for normalized in LOCATION_FIELDS.values()],
+        migrations.RunPython(fill_long_locations, migrations.RunPython.noop),
+    ]
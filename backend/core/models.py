@@ -1,18 +1,89 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+from django.utils import timezone
 import hashlib
+import re
+
+# Free-text shelf location column of Record -> its normalized integer column,
+# outermost first (the order of the archive and of record_location_idx)
+LOCATION_FIELDS = {
+    'Row': 'location_row',
+    'ShelfNumber': 'location_shelf',
+    'FolderNumber': 'location_folder',
+    'sortingNumber': 'location_position',
+}
+LOCATION_MAX = 2**63 - 1  # bigint: date-like codes such as "20240115001" don't fit an integer
+
+
+def location_number(value):
+    """
+    The first run of digits in a location column ("R-03" -> 3); None if there is
+    none, or if it is too long for the column.
+    """
+    match = re.search(r'\d+', value or '')
+    if not match:
+        return None
+    number = int(match.group())
+    return number if number <= LOCATION_MAX else None
+
+
+class Lookup(models.Model):
+    """
+    A vocabulary of a categorical Record column (kebele, ServiceOfEstate, ...).
+    Records reference it by a small-integer key; the API reads and writes the
+    labels through the in-process cache of core/vocab.py.
+    """
+    id = models.SmallAutoField(primary_key=True)
+    name = models.CharField(max_length=255, unique=True)
+
+    class Meta:
+        abstract = True
+        ordering = ["name"]
+
+    def __str__(self):
+        return self.name
+
+
+class Kebele(Lookup):
+    pass
+
+
+class EstateService(Lookup):
+    pass
+
+
+class PlaceLevel(Lookup):
+    pass
+
+
+class PossessionStatus(Lookup):
+    class Meta(Lookup.Meta):
+        verbose_name_plural = "possession statuses"
+
+
+class PossessionProof(Lookup):
+    pass
+
+
+class DebtRestrictionType(Lookup):
+    pass
+
+
 class Record(models.Model):
     PropertyOwnerName = models.CharField(max_length=255)
     ExistingArchiveCode = models.CharField(max_length=255, db_index=True)  # searchable
     UPIN = models.CharField(max_length=255, unique=True, db_index=True)  # searchable
     PhoneNumber = models.CharField(max_length=255, null=True, blank=True)
     NationalId = models.CharField(max_length=255, null=True, blank=True)
-    ServiceOfEstate = models.CharField(max_length=255)
-    placeLevel = models.CharField(max_length=255)
-    possessionStatus = models.CharField(max_length=255)
+    ServiceOfEstate = models.ForeignKey(EstateService, on_delete=models.PROTECT)
+    placeLevel = models.ForeignKey(PlaceLevel, on_delete=models.PROTECT)
+    possessionStatus = models.ForeignKey(PossessionStatus, on_delete=models.PROTECT)
     spaceSize = models.CharField(max_length=255)
-    kebele = models.CharField(max_length=255)
-    proofOfPossession = models.CharField(max_length=255)
-    DebtRestriction = models.CharField(max_length=255)
+    kebele = models.ForeignKey(Kebele, on_delete=models.PROTECT)
+    proofOfPossession = models.ForeignKey(PossessionProof, on_delete=models.PROTECT)
+    DebtRestriction = models.ForeignKey(DebtRestrictionType, on_delete=models.PROTECT)
     LastTaxPaymtDate = models.DateField(null=True, blank=True)
     unpaidTaxDebt = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
     InvoiceNumber = models.CharField(max_length=255, null=True, blank=True)
@@ -33,10 +104,34 @@ class Record(models.Model):
     sortingNumber = models.CharField(max_length=255, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)  # optional: tracking
     updated_at = models.DateTimeField(auto_now=True)      # optional: tracking
+    # Normalized copies of the location columns, kept in sync by save()
+    location_row = models.PositiveBigIntegerField(null=True, blank=True, editable=False)
+    location_shelf = models.PositiveBigIntegerField(null=True, blank=True, editable=False)
+    location_folder = models.PositiveBigIntegerField(null=True, blank=True, editable=False)
+    location_position = models.PositiveBigIntegerField(null=True, blank=True, editable=False)
+
+    class Meta:
+        # Added with CREATE INDEX CONCURRENTLY (core/operations.py). The lookup
+        # foreign keys (search-by-*, stats) are indexed by Django itself.
+        indexes = [
+            models.Index(fields=['-created_at'], name='record_created_idx'),  # recent records
+            models.Index(fields=list(LOCATION_FIELDS.values()), name='record_location_idx'),  # shelf listings
+        ]
 
     def __str__(self):
         return f"{self.UPIN} - {self.PropertyOwnerName}"
 
+    def refresh_location(self):
+        for field, normalized in LOCATION_FIELDS.items():
+            setattr(self, normalized, location_number(getattr(self, field)))
+
+    def save(self, *args, update_fields=None, **kwargs):
+        # Bulk inserts and queryset updates bypass this; see core/factories.py
+        self.refresh_location()
+        if update_fields is not None and not set(LOCATION_FIELDS).isdisjoint(update_fields):
+            update_fields = {*update_fields, *LOCATION_FIELDS.values()}
+        super().save(*args, update_fields=update_fields, **kwargs)
+
 
 class RecordFile(models.Model):
     record = models.ForeignKey(Record, related_name='files', on_delete=models.CASCADE)
@@ -46,6 +141,16 @@ class RecordFile(models.Model):
     category = models.CharField(max_length=32, blank=True)       # Add this 
     type = models.CharField(max_length=50, blank=True)  # Add this field
     file_hash = models.CharField(max_length=64, blank=True, null=True)  # Remove unique constraint temporarily
+    # Storage tiering (core/tiering.py): last day the file was served, and when it
+    # was last considered for the compressed tier
+    last_accessed = models.DateField(null=True, blank=True, editable=False)
+    tiered_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['uploaded_at'], name='recordfile_uploaded_idx'),  # dashboard metrics
+            models.Index(fields=['uploaded_file'], name='recordfile_path_idx'),  # blob sweeper (core/blobs.py)
+        ]
 
     # def save(self, *args, **kwargs):
     #     if not self.file_hash:
@@ -69,6 +174,121 @@ class RecordFile(models.Model):
 # # Run the script
 # backfill_file_hash()
 
+class FileText(models.Model):
+    """
+    The text layer of an uploaded PDF, extracted by a background job
+    (core/fulltext.py). Kept out of RecordFile so that file listings don't read it.
+    """
+    file = models.OneToOneField(RecordFile, primary_key=True, related_name='text', on_delete=models.CASCADE)
+    content = models.TextField(blank=True)
+    pages = models.PositiveIntegerField(default=0)
+    # to_tsvector(FULLTEXT_CONFIG, content), written on PostgreSQL only
+    search_vector = SearchVectorField(null=True, editable=False)
+    extracted_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        # PostgreSQL only; added by AddIndexConcurrently (skipped elsewhere)
+        indexes = [GinIndex(fields=['search_vector'], name='filetext_search_idx')]
+
+    def __str__(self):
+        return f"Text of file {self.file_id}"
+
+
+class BlobDeletion(models.Model):
+    """
+    Outbox of stored files to delete, written in the transaction that drops their
+    last reference and emptied by ``process_blob_deletions`` (core/blobs.py).
+    """
+    path = models.CharField(max_length=255)
+    queued_at = models.DateTimeField(auto_now_add=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+
+    def __str__(self):
+        return self.path
+
+
+class Job(models.Model):
+    """
+    A unit of background work: ``task`` (the dotted path of a function) called
+    with ``args`` and ``kwargs`` by ``manage.py runworker`` (core/jobs.py).
+    """
+    QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+    STATUS_CHOICES = [(QUEUED, "Queued"), (RUNNING, "Running"), (DONE, "Done"), (FAILED, "Failed")]
+
+    task = models.CharField(max_length=255)
+    args = models.JSONField(default=list, encoder=DjangoJSONEncoder)
+    kwargs = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=QUEUED)
+    run_at = models.DateTimeField(default=timezone.now)  # not before; pushed back after a failure
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    created_at = models.DateTimeField(auto_now_add=True)
+    created_by = models.CharField(max_length=255, blank=True, null=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    worker = models.CharField(max_length=255, blank=True)
+    last_error = models.TextField(blank=True)
+    result = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+
+    class Meta:
+        indexes = [
+            # Only the rows a worker looks at: small however long the history
+            models.Index(fields=['run_at'], condition=models.Q(status='queued'), name='job_ready_idx'),
+            models.Index(fields=['started_at'], condition=models.Q(status='running'), name='job_running_idx'),
+            models.Index(fields=['status', '-id'], name='job_status_idx'),  # job list, newest first
+        ]
+
+    def __str__(self):
+        return f"{self.task} #{self.pk}: {self.status}"
+
+
+class RecordHistory(models.Model):
+    """
+    One edit of a record: only the fields that changed, as {field: [old, new]}
+    (lookup fields by label). Written by core/history.py.
+    """
+    record = models.ForeignKey(Record, related_name='history', on_delete=models.CASCADE,
+                               db_index=False)  # covered by recordhistory_record_time_idx
+    changed_at = models.DateTimeField(auto_now_add=True)
+    user = models.CharField(max_length=255, blank=True, null=True)
+    changes = models.JSONField(encoder=DjangoJSONEncoder)
+
+    class Meta:
+        verbose_name_plural = "record history"
+        indexes = [
+            models.Index(fields=['record', '-changed_at'], name='recordhistory_record_time_idx'),  # timeline
+        ]
+
+    def __str__(self):
+        return f"{self.record_id} @ {self.changed_at:%Y-%m-%d %H:%M}: {', '.join(self.changes)}"
+
+
+class DuplicateCluster(models.Model):
+    """
+    Records that probably describe the same owner or archive folder, found by
+    ``manage.py find_duplicates`` (core/dedup.py) and waiting for review.
+    """
+    OPEN, CONFIRMED, DISMISSED = "open", "confirmed", "dismissed"
+    STATUS_CHOICES = [(OPEN, "Open"), (CONFIRMED, "Confirmed"), (DISMISSED, "Dismissed")]
+
+    records = models.ManyToManyField(Record, related_name='duplicate_clusters')
+    # Fields the records matched on, such as ["NationalId", "PropertyOwnerName"]
+    reasons = models.JSONField(default=list)
+    score = models.FloatField()  # weakest match between two records of the cluster
+    size = models.PositiveIntegerField()
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=OPEN)
+    created_at = models.DateTimeField(auto_now_add=True)
+    reviewed_by = models.CharField(max_length=255, blank=True, null=True)
+
+    class Meta:
+        ordering = ['-score', 'pk']
+        indexes = [models.Index(fields=['status', '-score'], name='duplicatecluster_review_idx')]
+
+    def __str__(self):
+        return f"{self.size} records ({', '.join(self.reasons)}): {self.status}"
+
+
 class AuditLog(models.Model):
     ACTION_CHOICES = [
         ("LOGIN", "Login"),
@@ -87,5 +307,86 @@ class AuditLog(models.Model):
     timestamp = models.DateTimeField(auto_now_add=True)
     role = models.CharField(max_length=64, blank=True, null=True)  # Add this line
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['-timestamp'], name='auditlog_timestamp_idx'),  # audit log list
+            models.Index(fields=['action', 'timestamp'], name='auditlog_action_time_idx'),  # dashboard metrics
+        ]
+
+    def __str__(self):
+        return f"{self.timestamp} - {self.user} - {self.action}"
+
+class RequestProfile(models.Model):
+    """
+    A profiled request: sampled ones carry a cProfile report, slow ones a stack
+    sample; both keep their SQL with EXPLAIN plans of the slow statements.
+    Capped at PROFILE_MAX_ROWS rows (see core/profiling.py).
+    """
+    REASON_CHOICES = [
+        ("sampled", "Sampled"),
+        ("slow", "Slow"),
+    ]
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    reason = models.CharField(max_length=16, choices=REASON_CHOICES)
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=2048)
+    view_name = models.CharField(max_length=255, blank=True)
+    status_code = models.PositiveSmallIntegerField(null=True)
+    duration_ms = models.FloatField()
+    sql_count = models.PositiveIntegerField(default=0)
+    sql_ms = models.FloatField(default=0)
+    profile = models.TextField(blank=True)
+    queries = models.JSONField(default=list, blank=True)  # [{"sql", "params", "ms", "explain"}]
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"{self.created_at} - {self.method} {self.path} ({self.duration_ms:.0f} ms)"
+
+
+class DebtRollup(models.Model):
+    """
+    Outstanding debt of the records sharing a kebele, ServiceOfEstate and placeLevel.
+    Kept up to date by the Record signals (core/rollups.py); rebuilt from scratch
+    with ``manage.py rebuild_debt_rollups`` after bulk loads.
+    """
+    kebele = models.ForeignKey(Kebele, on_delete=models.CASCADE, related_name='+')
+    ServiceOfEstate = models.ForeignKey(EstateService, on_delete=models.CASCADE, related_name='+')
+    placeLevel = models.ForeignKey(PlaceLevel, on_delete=models.CASCADE, related_name='+')
+    record_count = models.PositiveIntegerField(default=0)
+    records_in_debt = models.PositiveIntegerField(default=0)
+    unpaidTaxDebt = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    unpaidPropTaxDebt = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    unpaidLeaseDebt = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    # Record counts per total-debt bucket (rollups.DEBT_BUCKETS), for approximate percentiles
+    histogram = models.JSONField(default=list)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kebele', 'ServiceOfEstate', 'placeLevel'], name='debtrollup_group_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.kebele_id} / {self.ServiceOfEstate_id} / {self.placeLevel_id}: {self.record_count} records"
+
+
+class DailyActivity(models.Model):
+    """
+    Per-day activity totals, filled by ``manage.py rollup_daily_activity``
+    (core/rollups.py); the activity time series is read from here only.
+    """
+    date = models.DateField(unique=True)
+    records_created = models.PositiveIntegerField(default=0)
+    files_uploaded = models.PositiveIntegerField(default=0)
+    logins = models.PositiveIntegerField(default=0)
+    # Usernames that logged in that day, so weeks and months count distinct users
+    active_users = models.JSONField(default=list)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["date"]
+
     def __str__(self):
-        return f"{self.timestamp} - {self.user} - {self.action}"
\ No newline at end of file
+        return f"{self.date}: {self.records_created} records, {self.files_uploaded} files, {len(self.active_users)} users"
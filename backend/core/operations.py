@@ -0,0 +1,55 @@
+# backend/core/operations.py
+"""
+Migration operations that can be applied to a live database.
+
+AddIndexConcurrently builds its index with CREATE INDEX CONCURRENTLY on
+PostgreSQL, so writes to the table are not blocked while it runs; migrations
+using it must set ``atomic = False``. On other backends (the SQLite used for
+local development) it is a plain AddIndex, and indexes of the PostgreSQL-only
+classes (GIN, GiST, ...) are skipped there.
+"""
+
+from django.db import NotSupportedError
+from django.db.migrations.operations import AddIndex
+
+
+def _postgres_only(index):
+    return index.__class__.__module__.startswith("django.contrib.postgres")
+
+
+class AddIndexConcurrently(AddIndex):
+    atomic = False
+
+    def describe(self):
+        return "Concurrently " + super().describe()
+
+    def _applies(self, schema_editor):
+        return schema_editor.connection.vendor == "postgresql" or not _postgres_only(self.index)
+
+    def _concurrently(self, schema_editor):
+        if schema_editor.connection.vendor != "postgresql":
+            return False
+        if schema_editor.connection.in_atomic_block:
+            raise NotSupportedError(
+                "The AddIndexConcurrently operation cannot be executed inside a transaction "
+                "(set atomic = False on the migration)."
+            )
+        return True
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if not self._applies(schema_editor) or not self.allow_migrate_model(schema_editor.connection.alias, model):
+            return
+        if self._concurrently(schema_editor):
+            schema_editor.add_index(model, self.index, concurrently=True)
+        else:
+            schema_editor.add_index(model, self.index)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        model = from_state.apps.get_model(app_label, self.model_name)
+        if not self._applies(schema_editor) or not self.allow_migrate_model(schema_editor.connection.alias, model):
+            return
+        if self._concurrently(schema_editor):
+            schema_editor.remove_index(model, self.index, concurrently=True)
+        else:
+            schema_editor.remove_index(model, self.index)
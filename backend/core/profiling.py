@@ -0,0 +1,195 @@
+# backend/core/profiling.py
+"""
+Opt-in request profiling, used by RequestProfilingMiddleware (core/middleware.py).
+
+With PROFILING_ENABLED on, a fraction of requests (PROFILE_SAMPLE_RATE) runs under
+cProfile. Every other request is watched by a per-process stack sampler thread, which
+is cheap enough to leave on, and is kept only if it took PROFILE_SLOW_REQUEST_MS or
+more. Async requests, which share their threads, keep their SQL only. Kept requests
+are stored as RequestProfile rows with their SQL, and the EXPLAIN plan of every
+SELECT that took PROFILE_SLOW_QUERY_MS or more. Statements on the credential tables
+(SENSITIVE_TABLES) are kept without their parameters or plan.
+"""
+
+import cProfile
+import io
+import logging
+import pstats
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+MAX_QUERIES = 200      # statements kept per profile
+MAX_STACK_DEPTH = 40   # frames kept per sampled stack
+TOP_STACKS = 40        # stacks shown per profile
+
+# Users, password hashes, sessions and refresh tokens: their values stay out of profiles
+SENSITIVE_TABLES = re.compile(r'\b(?:auth_|token_blacklist_)\w+|\bdjango_session\b')
+
+
+class StackSampler:
+    """
+    A single daemon thread that, every ``interval`` seconds, records the stack
+    of each watched thread. Requests only pay for a dictionary update.
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self._watched = {}  # thread id -> Counter of collapsed stacks
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def watch(self, thread_id):
+        samples = Counter()
+        with self._lock:
+            self._watched[thread_id] = samples
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+                self._thread.start()
+        return samples
+
+    def unwatch(self, thread_id):
+        with self._lock:
+            self._watched.pop(thread_id, None)
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._watched:
+                    continue
+                frames = sys._current_frames()
+                for thread_id, samples in self._watched.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        samples[_collapse(frame)] += 1
+
+
+def _collapse(frame):
+    stack = []
+    while frame is not None and len(stack) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        stack.append(f"{code.co_filename}:{frame.f_lineno}({code.co_name})")
+        frame = frame.f_back
+    return ";".join(reversed(stack))
+
+
+def format_samples(samples, interval):
+    total = sum(samples.values())
+    if not total:
+        return ""
+    lines = [f"{total} samples every {interval * 1000:.0f} ms; most frequent stacks (root first):"]
+    for stack, count in samples.most_common(TOP_STACKS):
+        lines.append(f"\n{count:6d} ({count * 100 / total:.0f}%)")
+        lines.extend("    " + frame for frame in stack.split(";"))
+    return "\n".join(lines)
+
+
+def format_profile(profiler):
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(60)
+    return out.getvalue()
+
+
+def start_cprofile():
+    """Returns an enabled profiler, or None if another profiler is already running."""
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        return None
+    return profiler
+
+
+class QueryRecorder:
+    """``connection.execute_wrapper`` hook keeping each statement with its timing."""
+
+    def __init__(self):
+        self.queries = []
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.count += 1
+            self.seconds += elapsed
+            if len(self.queries) < MAX_QUERIES:
+                self.queries.append((context["connection"].alias, sql, params, many, elapsed))
+
+    def install(self, stack):
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(self))
+        return self
+
+
+def _explain(alias, sql, params):
+    connection = connections[alias]
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(f"{connection.ops.explain_query_prefix()} {sql}", params)
+            return "\n".join(" ".join(str(col) for col in row) for row in cursor.fetchall())
+    except DatabaseError as exc:
+        return f"EXPLAIN failed: {exc}"
+
+
+# Query parameters carrying credentials, left out of the stored path
+SECRET_PARAMS = ("ticket", "access_token")
+
+
+def logged_path(request):
+    """The full path of ``request`` without its SECRET_PARAMS."""
+    if not any(name in request.GET for name in SECRET_PARAMS):
+        return request.get_full_path()
+    query = request.GET.copy()
+    for name in SECRET_PARAMS:
+        query.pop(name, None)
+    return f"{request.path}?{query.urlencode()}" if query else request.path
+
+
+def save_profile(request, response, reason, seconds, recorder, profile_text):
+    """Store the request as a RequestProfile, then trim the table to PROFILE_MAX_ROWS."""
+    from .models import RequestProfile
+
+    slow_query = settings.PROFILE_SLOW_QUERY_MS / 1000
+    queries = []
+    for alias, sql, params, many, elapsed in recorder.queries:
+        sensitive = SENSITIVE_TABLES.search(sql) is not None  # no params, nor a plan showing them
+        explain = ""
+        if not sensitive and elapsed >= slow_query and not many and sql.lstrip()[:6].upper() == "SELECT":
+            explain = _explain(alias, sql, params)
+        queries.append({
+            "alias": alias,
+            "sql": sql,
+            "params": [str(p) for p in params] if params and not many and not sensitive else [],
+            "ms": round(elapsed * 1000, 3),
+            "explain": explain,
+        })
+
+    match = getattr(request, "resolver_match", None)
+    try:
+        profile = RequestProfile.objects.create(
+            reason=reason,
+            method=request.method,
+            path=logged_path(request)[:2048],
+            view_name=(match.view_name or match.route) if match else "",
+            status_code=getattr(response, "status_code", None),
+            duration_ms=seconds * 1000,
+            sql_count=recorder.count,
+            sql_ms=recorder.seconds * 1000,
+            profile=profile_text,
+            queries=queries,
+        )
+        RequestProfile.objects.filter(pk__lte=profile.pk - settings.PROFILE_MAX_ROWS).delete()
+    except DatabaseError:
+        logger.exception("Could not store the profile of %s %s", request.method, request.path)
@@ -0,0 +1,84 @@
+# backend/core/renderers.py
+"""
+Compact renderers for the record list endpoints.
+
+A list of records repeats every field name in every row. Clients can ask for:
+
+- columnar JSON, ``{"columns": [...], "rows": [[...], ...]}``, with
+  ``?format=columnar`` or ``Accept: application/vnd.fmsystem.columnar+json``;
+- MessagePack, with ``?format=msgpack`` or ``Accept: application/msgpack``,
+  when the ``msgpack`` package is installed.
+
+Plain JSON stays the default. ``negotiate()`` applies the same rules to the
+plain Django views of core/async_views.py.
+"""
+
+import datetime
+import decimal
+import uuid
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.settings import api_settings
+
+try:
+    import msgpack
+except ImportError:  # optional: the msgpack format is simply not offered
+    msgpack = None
+
+
+def columnar(data):
+    """
+    ``data`` with its list of objects (or the "results" of a paginated page)
+    turned into columns and rows. Anything else, such as errors, is returned as is.
+    """
+    if isinstance(data, dict) and isinstance(data.get("results"), list):
+        return {**data, "results": columnar(data["results"])}
+    if isinstance(data, list) and all(isinstance(row, dict) for row in data):
+        columns = list(data[0]) if data else []
+        return {"columns": columns, "rows": [[row.get(column) for column in columns] for row in data]}
+    return data
+
+
+class ColumnarJSONRenderer(JSONRenderer):
+    media_type = "application/vnd.fmsystem.columnar+json"
+    format = "columnar"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return super().render(columnar(data), accepted_media_type, renderer_context)
+
+
+def _encode(value):
+    if isinstance(value, (datetime.date, datetime.time)):  # datetime is a date
+        return value.isoformat()
+    if isinstance(value, (decimal.Decimal, uuid.UUID)):
+        return str(value)
+    raise TypeError(f"Cannot encode {type(value).__name__} as MessagePack")
+
+
+class MessagePackRenderer(BaseRenderer):
+    media_type = "application/msgpack"
+    format = "msgpack"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return msgpack.packb(data, default=_encode)
+
+
+COMPACT_RENDERERS = [ColumnarJSONRenderer, *([MessagePackRenderer] if msgpack is not None else [])]
+RECORD_LIST_RENDERERS = [*api_settings.DEFAULT_RENDERER_CLASSES, *COMPACT_RENDERERS]
+
+
+def negotiate(request):
+    """
+    The renderer (an instance) for a plain Django request: ``?format=`` first,
+    then the Accept header; JSON when neither names a compact format.
+    """
+    wanted = request.GET.get(api_settings.URL_FORMAT_OVERRIDE)
+    accept = request.headers.get("Accept", "")
+    for renderer in COMPACT_RENDERERS:
+        if wanted == renderer.format or (not wanted and renderer.media_type in accept):
+            return renderer()
+    return JSONRenderer()
@@ -0,0 +1,250 @@
+# backend/core/rollups.py
+"""
+Pre-aggregated tables behind the analytics endpoints.
+
+DebtRollup: debt totals per (kebele, ServiceOfEstate, placeLevel). Each row holds
+the record count, the sum of each unpaid debt and a histogram of the records' total
+debt. Record signals move a record's contribution between rows as it is created,
+edited or deleted, so the debt analytics endpoint never scans the records.
+``rebuild()`` recomputes every row from the records.
+
+DailyActivity: records created, files uploaded and logins per day, filled by
+``rollup_daily_activity()`` for the days since its previous run.
+"""
+
+import bisect
+import datetime
+import operator
+from decimal import Decimal
+from functools import reduce
+
+from django.db import transaction
+from django.db.models import Case, Count, DecimalField, IntegerField, Max, Min, Q, Sum, Value, When
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from . import vocab
+from .cache import bump_generation
+from .models import AuditLog, DailyActivity, DebtRollup, Record, RecordFile
+
+GROUP_FIELDS = ("kebele", "ServiceOfEstate", "placeLevel")
+GROUP_KEYS = tuple(f"{name}_id" for name in GROUP_FIELDS)  # lookup keys (core/vocab.py)
+DEBT_FIELDS = ("unpaidTaxDebt", "unpaidPropTaxDebt", "unpaidLeaseDebt")
+TRACKED_FIELDS = GROUP_FIELDS + DEBT_FIELDS
+SNAPSHOT_FIELDS = GROUP_KEYS + DEBT_FIELDS
+
+# Upper bounds (inclusive) of the total-debt buckets; the last bucket is open-ended
+DEBT_BUCKETS = (0, 100, 250, 500, 1000, 2500, 5000, 10000, 25000, 50000, 100000, 250000, 500000, 1000000)
+ZERO = Decimal("0")
+
+
+def snapshot(record):
+    """The fields of ``record`` a rollup depends on."""
+    return {name: getattr(record, name) for name in SNAPSHOT_FIELDS}
+
+
+def _total(values):
+    return sum((Decimal(values[name] or 0) for name in DEBT_FIELDS), ZERO)
+
+
+def bucket_of(total):
+    return bisect.bisect_left(DEBT_BUCKETS, total)
+
+
+def _apply(group, changes):
+    """Apply ``changes``, a list of (snapshot, +1 or -1), to the rollup row of ``group``."""
+    rollup, _ = DebtRollup.objects.select_for_update().get_or_create(**dict(zip(GROUP_KEYS, group)))
+    histogram = rollup.histogram or [0] * (len(DEBT_BUCKETS) + 1)
+    for values, sign in changes:
+        total = _total(values)
+        rollup.record_count += sign
+        rollup.records_in_debt += sign if total > 0 else 0
+        for name in DEBT_FIELDS:
+            setattr(rollup, name, getattr(rollup, name) + sign * Decimal(values[name] or 0))
+        histogram[bucket_of(total)] += sign
+    rollup.histogram = histogram
+    if rollup.record_count <= 0:
+        rollup.delete()
+    else:
+        rollup.save()
+
+
+def record_changed(old, new):
+    """Move a record's contribution from the ``old`` snapshot to the ``new`` one (either may be None)."""
+    if old == new:
+        return
+    groups = {}
+    for values, sign in ((old, -1), (new, +1)):
+        if values is not None:
+            groups.setdefault(tuple(values[name] for name in GROUP_KEYS), []).append((values, sign))
+    # Part of the caller's transaction when there is one
+    with transaction.atomic(savepoint=False):
+        for group, changes in groups.items():
+            _apply(group, changes)
+
+
+def rebuild():
+    """Recompute every rollup from the records. Returns the number of rows."""
+    debt = reduce(operator.add, [Coalesce(name, Value(ZERO), output_field=DecimalField()) for name in DEBT_FIELDS])
+    bucket = Case(
+        *[When(total__lte=bound, then=Value(i)) for i, bound in enumerate(DEBT_BUCKETS)],
+        default=Value(len(DEBT_BUCKETS)),
+        output_field=IntegerField(),
+    )
+    records = Record.objects.annotate(total=debt)
+    rows = {}
+    for row in records.values(*GROUP_KEYS).annotate(
+        record_count=Count("id"),
+        records_in_debt=Count("id", filter=Q(total__gt=0)),
+        **{name: Coalesce(Sum(name), Value(ZERO), output_field=DecimalField()) for name in DEBT_FIELDS},
+    ).order_by():
+        key = tuple(row[name] for name in GROUP_KEYS)
+        rows[key] = DebtRollup(histogram=[0] * (len(DEBT_BUCKETS) + 1), **row)
+    for row in records.annotate(bucket=bucket).values(*GROUP_KEYS, "bucket").annotate(n=Count("id")).order_by():
+        rows[tuple(row[name] for name in GROUP_KEYS)].histogram[row["bucket"]] = row["n"]
+
+    with transaction.atomic():
+        DebtRollup.objects.all().delete()
+        DebtRollup.objects.bulk_create(rows.values(), batch_size=1000)
+        transaction.on_commit(lambda: bump_generation(DebtRollup))
+    return len(rows)
+
+
+def percentile(histogram, fraction):
+    """Approximate percentile of the total debt, interpolating inside the bucket."""
+    count = sum(histogram)
+    if not count:
+        return None
+    rank = fraction * count
+    seen = 0
+    for i, n in enumerate(histogram):
+        if n and seen + n >= rank:
+            low = DEBT_BUCKETS[i - 1] if i else 0
+            high = DEBT_BUCKETS[i] if i < len(DEBT_BUCKETS) else DEBT_BUCKETS[-1] * 2
+            return round(low + (high - low) * (rank - seen) / n, 2)
+        seen += n
+    return DEBT_BUCKETS[-1]
+
+
+def summarize(rollups, group_by):
+    """
+    Combine rollup rows by ``group_by`` (one of GROUP_FIELDS). Returns the
+    city-wide totals and one entry per value of ``group_by``, largest debt first.
+    """
+    def empty():
+        return {"record_count": 0, "records_in_debt": 0, **{name: ZERO for name in DEBT_FIELDS},
+                "histogram": [0] * (len(DEBT_BUCKETS) + 1)}
+
+    def add(acc, rollup):
+        acc["record_count"] += rollup.record_count
+        acc["records_in_debt"] += rollup.records_in_debt
+        for name in DEBT_FIELDS:
+            acc[name] += getattr(rollup, name)
+        acc["histogram"] = [a + b for a, b in zip(acc["histogram"], rollup.histogram)]
+
+    def finish(acc):
+        histogram = acc.pop("histogram")
+        acc["totalDebt"] = sum((acc[name] for name in DEBT_FIELDS), ZERO)
+        acc["p50"] = percentile(histogram, 0.50)
+        acc["p90"] = percentile(histogram, 0.90)
+        acc["p99"] = percentile(histogram, 0.99)
+        return acc
+
+    total, groups = empty(), {}
+    for rollup in rollups:
+        add(total, rollup)
+        add(groups.setdefault(getattr(rollup, f"{group_by}_id"), empty()), rollup)
+    labels = vocab.vocabulary(group_by)
+    labels.warm(groups)
+    rows = [{group_by: labels.label(key), **finish(acc)} for key, acc in groups.items()]
+    rows.sort(key=lambda row: row["totalDebt"], reverse=True)
+    return {"total": finish(total), "groupBy": group_by, "groups": rows}
+
+
+def _activity_start():
+    """First day to (re)compute: the last rolled-up day, which may have been partial."""
+    last = DailyActivity.objects.aggregate(last=Max("date"))["last"]
+    if last:
+        return last
+    firsts = [
+        Record.objects.aggregate(first=Min("created_at"))["first"],
+        RecordFile.objects.aggregate(first=Min("uploaded_at"))["first"],
+        AuditLog.objects.aggregate(first=Min("timestamp"))["first"],
+    ]
+    firsts = [timezone.localdate(first) for first in firsts if first]
+    return min(firsts) if firsts else None
+
+
+def _per_day(queryset, field, since):
+    return dict(
+        queryset.filter(**{f"{field}__gte": since})
+        .annotate(day=TruncDate(field)).values("day").annotate(n=Count("id")).values_list("day", "n").order_by()
+    )
+
+
+def rollup_daily_activity(since=None):
+    """
+    Compute the DailyActivity rows from ``since`` (default: the last rolled-up
+    day) through today, with one grouped query per source. Returns the number of days.
+    """
+    start = since or _activity_start()
+    if start is None:
+        return 0
+    today = timezone.localdate()
+    since_time = timezone.make_aware(datetime.datetime.combine(start, datetime.time.min))
+    login_logs = AuditLog.objects.filter(action="LOGIN")
+    records = _per_day(Record.objects, "created_at", since_time)
+    files = _per_day(RecordFile.objects, "uploaded_at", since_time)
+    logins = _per_day(login_logs, "timestamp", since_time)
+    users = {}
+    for day, user in (
+        login_logs.filter(timestamp__gte=since_time, user__isnull=False)
+        .annotate(day=TruncDate("timestamp")).values_list("day", "user").distinct().order_by()
+    ):
+        users.setdefault(day, []).append(user)
+
+    days = [start + datetime.timedelta(days=n) for n in range((today - start).days + 1)]
+    rows = [
+        DailyActivity(
+            date=day,
+            records_created=records.get(day, 0),
+            files_uploaded=files.get(day, 0),
+            logins=logins.get(day, 0),
+            active_users=sorted(users.get(day, [])),
+        )
+        for day in days
+    ]
+    with transaction.atomic():
+        DailyActivity.objects.filter(date__gte=start).delete()
+        DailyActivity.objects.bulk_create(rows, batch_size=1000)
+        transaction.on_commit(lambda: bump_generation(DailyActivity))
+    return len(rows)
+
+
+BUCKETS = ("day", "week", "month")
+
+
+def bucket_start(day, bucket):
+    if bucket == "week":
+        return day - datetime.timedelta(days=day.weekday())
+    if bucket == "month":
+        return day.replace(day=1)
+    return day
+
+
+def activity_series(start, end, bucket):
+    """Activity per ``bucket`` between ``start`` and ``end`` (inclusive), from DailyActivity only."""
+    periods = {}
+    for row in DailyActivity.objects.filter(date__range=(start, end)):
+        period = periods.setdefault(bucket_start(row.date, bucket), {
+            "recordsCreated": 0, "filesUploaded": 0, "logins": 0, "users": set(),
+        })
+        period["recordsCreated"] += row.records_created
+        period["filesUploaded"] += row.files_uploaded
+        period["logins"] += row.logins
+        period["users"].update(row.active_users)
+    return [
+        {"period": period.isoformat(), **{k: v for k, v in values.items() if k != "users"},
+         "activeUsers": len(values["users"])}
+        for period, values in sorted(periods.items())
+    ]
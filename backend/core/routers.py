@@ -0,0 +1,70 @@
+# backend/core/routers.py
+"""
+Primary/replica database routing.
+
+Reads go to the ``replica`` alias only while a view marked with
+``read_from_replica`` is handling a safe request (ReplicaRoutingMiddleware
+sets that up). Everything else, and every write, uses ``default``. Once a
+request writes, its client is pinned to the primary for REPLICA_PIN_SECONDS
+so it reads its own writes.
+"""
+
+from contextvars import ContextVar
+
+from django.conf import settings
+
+REPLICA_ALIAS = 'replica'
+
+_routing = ContextVar('db_routing', default=None)
+
+
+class RoutingState:
+    def __init__(self, use_replica=False):
+        self.use_replica = use_replica
+        self.wrote = False
+
+
+def get_routing_state():
+    return _routing.get()
+
+
+def set_routing_state(state):
+    _routing.set(state)
+
+
+def read_from_replica(view):
+    """
+    Mark a view (function or class) as safe to serve from the read replica.
+    Put it above ``@api_view`` on function views.
+    """
+    view.read_from_replica = True
+    return view
+
+
+def is_replica_view(view_func):
+    if getattr(view_func, 'read_from_replica', False):
+        return True
+    view_class = getattr(view_func, 'view_class', None) or getattr(view_func, 'cls', None)
+    return getattr(view_class, 'read_from_replica', False)
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _routing.get()
+        if state and state.use_replica and not state.wrote and REPLICA_ALIAS in settings.DATABASES:
+            return REPLICA_ALIAS
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        state = _routing.get()
+        if state:
+            state.wrote = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica is a physical copy of the primary
+        return db == 'default'
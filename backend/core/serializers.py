@@ -1,19 +1,98 @@
+from django.core.exceptions import FieldDoesNotExist
 from rest_framework import serializers
-from .models import Record, RecordFile, AuditLog
-import hashlib
+from .models import Record, RecordFile, AuditLog, RecordHistory, Job
+from . import history, vocab
+
+
+class LabelField(serializers.Field):
+    """
+    A lookup foreign key of Record, read and written as its label through the
+    in-process vocabulary cache (core/vocab.py). Validation leaves the label as
+    is: RecordSerializer swaps it for its key, adding unknown labels, on save.
+    """
+    default_error_messages = {
+        'blank': 'This field may not be blank.',
+        'max_length': 'Ensure this field has no more than 255 characters.',
+    }
+
+    def __init__(self, field, **kwargs):
+        self.vocabulary = vocab.vocabulary(field)
+        super().__init__(source=f'{field}_id', **kwargs)
+
+    def to_representation(self, value):
+        return self.vocabulary.label(value)
+
+    def to_internal_value(self, data):
+        label = str(data).strip()
+        if not label:
+            self.fail('blank')
+        if len(label) > 255:
+            self.fail('max_length')
+        return label
 
 class RecordFileSerializer(serializers.ModelSerializer):
     class Meta:
         model = RecordFile
-        fields = '__all__'
+        # Tiering bookkeeping (core/tiering.py), written by queryset updates that
+        # don't invalidate the cached responses
+        exclude = ['last_accessed', 'tiered_at']
+
+def requested_fields(request):
+    """The ?fields= and ?exclude= lists of ``request`` (comma-separated), as serializer kwargs."""
+    options = {}
+    for name in ('fields', 'exclude'):
+        value = request.GET.get(name) if request is not None else None
+        if value:
+            options[name] = {item.strip() for item in value.split(',') if item.strip()}
+    return options
+
 
 class RecordSerializer(serializers.ModelSerializer):
+    """
+    Takes optional ``fields`` and ``exclude`` collections of field names (see
+    ``requested_fields``); ``narrow()`` then limits the SQL to the same columns.
+    """
     files = RecordFileSerializer(many=True, read_only=True)  # Read-only for related files
+    kebele = LabelField('kebele')
+    ServiceOfEstate = LabelField('ServiceOfEstate')
+    placeLevel = LabelField('placeLevel')
+    possessionStatus = LabelField('possessionStatus')
+    proofOfPossession = LabelField('proofOfPossession')
+    DebtRestriction = LabelField('DebtRestriction')
 
     class Meta:
         model = Record
         fields = '__all__'
 
+    def __init__(self, *args, fields=None, exclude=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        for name in list(self.fields):
+            if (fields is not None and name not in fields) or (exclude and name in exclude):
+                self.fields.pop(name)
+
+    def model_columns(self):
+        """Names of the Record columns the remaining fields read."""
+        columns = {'id'}
+        for field in self.fields.values():
+            try:
+                model_field = Record._meta.get_field(field.source)
+            except FieldDoesNotExist:
+                continue
+            if model_field.concrete:
+                columns.add(model_field.name)
+        return columns
+
+    @classmethod
+    def narrow(cls, queryset, fields=None, exclude=None):
+        """``queryset`` reading only the columns (and relations) a sparse serializer needs."""
+        if fields is None and not exclude:
+            return queryset
+        serializer = cls(fields=fields, exclude=exclude)
+        queryset = queryset.only(*serializer.model_columns())
+        if 'files' not in serializer.fields:
+            queryset = queryset.prefetch_related(None)
+        return queryset
+
     def to_internal_value(self, data):
         # DO NOT copy data here; just use it as-is!
         # data = data.copy()  # REMOVE THIS LINE
@@ -38,6 +117,12 @@ class RecordSerializer(serializers.ModelSerializer):
                 raise serializers.ValidationError("LastTaxPaymtDate cannot be after EndLeasePayPeriod.")
         return data'''
 
+    def _resolve_labels(self, validated_data):
+        """Replace the labels of the LabelFields by their keys, creating the unknown ones."""
+        for field in self.fields.values():
+            if isinstance(field, LabelField) and field.source in validated_data:
+                validated_data[field.source] = field.vocabulary.key(validated_data[field.source], create=True)
+
     def create(self, validated_data):
         """
         Override the create method to handle related files.
@@ -45,21 +130,14 @@ class RecordSerializer(serializers.ModelSerializer):
         # Extract files from the context (request)
         request = self.context.get('request')
         files = request.FILES.getlist('uploaded_files') if request else []
+        self._resolve_labels(validated_data)
 
         # Create the record
         record = super().create(validated_data)
 
-        # Save related files
+        # Save related files; hashed (and duplicates dropped) by a background job
         for file in files:
-             # Generate hash for the file content
-             hasher = hashlib.sha256()
-             for chunk in file.chunks():
-                 hasher.update(chunk)
-             file_hash = hasher.hexdigest()
-
-             # Prevent duplicate files
-             if not RecordFile.objects.filter(file_hash=file_hash, record=record).exists():
-                 RecordFile.objects.create(record=record, uploaded_file=file, file_hash=file_hash)
+            RecordFile.objects.create(record=record, uploaded_file=file)
 
         return record
 
@@ -70,25 +148,30 @@ class RecordSerializer(serializers.ModelSerializer):
         # Extract files from the context (request)
         request = self.context.get('request')
         files = request.FILES.getlist('uploaded_files') if request else []
+        self._resolve_labels(validated_data)
 
-        # Update the record
-        instance = super().update(instance, validated_data)
+        # Update only the changed columns, recording them (core/history.py)
+        user = str(request.user) if request and request.user.is_authenticated else None
+        self.changed_fields = history.save_changes(instance, validated_data, user=user)
 
-        # Save new related files
+        # Save new related files; hashed (and duplicates dropped) by a background job
         for file in files:
-            # Generate hash for the file content
-            hasher = hashlib.sha256()
-            for chunk in file.chunks():
-              hasher.update(chunk)
-            file_hash = hasher.hexdigest()
-
-             # Prevent duplicate files
-            if not RecordFile.objects.filter(file_hash=file_hash, record=instance).exists():
-               RecordFile.objects.create(record=instance, uploaded_file=file, file_hash=file_hash)
+            RecordFile.objects.create(record=instance, uploaded_file=file)
 
         return instance
 
 class AuditLogSerializer(serializers.ModelSerializer):
     class Meta:
         model = AuditLog
-        fields = '__all__'
\ No newline at end of file
+        fields = '__all__'
+
+class RecordHistorySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = RecordHistory
+        fields = ['id', 'changed_at', 'user', 'changes']
+
+class JobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Job
+        fields = ['id', 'task', 'args', 'kwargs', 'status', 'run_at', 'attempts', 'max_attempts',
+                  'created_at', 'created_by', 'started_at', 'finished_at', 'worker', 'last_error', 'result']
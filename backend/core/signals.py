@@ -0,0 +1,79 @@
+# backend/core/signals.py
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import pre_delete, pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from . import blobs, jobs, rollups, vocab
+from .cache import bump_generation
+from .models import Record, RecordFile, AuditLog, DebtRollup, DailyActivity
+
+
+@receiver([post_save, post_delete], sender=Record)
+@receiver([post_save, post_delete], sender=RecordFile)
+@receiver([post_save, post_delete], sender=AuditLog)
+@receiver([post_save, post_delete], sender=DebtRollup)
+@receiver([post_save, post_delete], sender=DailyActivity)
+@receiver([post_save, post_delete], sender=get_user_model())
+def invalidate_cached_responses(sender, **kwargs):
+    # Wait for the commit so a concurrent reader can't re-cache the old rows
+    transaction.on_commit(lambda: bump_generation(sender))
+
+
+@receiver(pre_save, sender=Record)
+def remember_debt_snapshot(sender, instance, raw=False, using=None, update_fields=None, **kwargs):
+    if raw or instance._state.adding:
+        return
+    if update_fields is not None and not set(update_fields) & set(rollups.TRACKED_FIELDS):
+        instance._debt_snapshot = False  # nothing the rollups depend on changes
+        return
+    instance._debt_snapshot = (
+        sender.objects.using(using).filter(pk=instance.pk).values(*rollups.SNAPSHOT_FIELDS).first()
+    )
+
+
+@receiver(post_save, sender=Record)
+def update_debt_rollup(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    old = None if created else getattr(instance, '_debt_snapshot', None)
+    if old is not False:
+        rollups.record_changed(old, rollups.snapshot(instance))
+    instance._debt_snapshot = None
+
+
+@receiver(post_delete, sender=Record)
+def remove_from_debt_rollup(sender, instance, **kwargs):
+    rollups.record_changed(rollups.snapshot(instance), None)
+
+
+@receiver(pre_delete, sender=Record)
+def queue_record_blobs(sender, instance, **kwargs):
+    # One query for all of the record's files, rather than one per cascaded file
+    blobs.queue_deletion(instance.files.values_list('uploaded_file', flat=True))
+
+
+@receiver(post_delete, sender=RecordFile)
+def queue_file_blob(sender, instance, origin=None, **kwargs):
+    if isinstance(origin, Record) or getattr(origin, 'model', None) is Record:
+        return  # queued by queue_record_blobs
+    blobs.queue_deletion([instance.uploaded_file.name])
+
+
+@receiver(post_save, sender=RecordFile)
+def queue_file_hash(sender, instance, raw=False, **kwargs):
+    if not raw and not instance.file_hash:  # new upload, or a replaced file (ReplaceFileView)
+        jobs.enqueue('core.tasks.hash_record_file', instance.pk)
+
+
+def forget_vocabulary(sender, **kwargs):
+    # Labels renamed or removed (e.g. in the admin): reload this process's copy
+    for vocabulary in vocab.VOCABULARIES.values():
+        if vocabulary.model is sender:
+            vocabulary.clear()
+
+
+for _vocabulary in vocab.VOCABULARIES.values():
+    post_save.connect(forget_vocabulary, sender=_vocabulary.model, dispatch_uid=f"vocab-{_vocabulary.model.__name__}")
+    post_delete.connect(forget_vocabulary, sender=_vocabulary.model, dispatch_uid=f"vocab-del-{_vocabulary.model.__name__}")
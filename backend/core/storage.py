@@ -0,0 +1,164 @@
+# backend/core/storage.py
+"""
+File storage with a compressed tier for uploads nobody reads any more.
+
+TieredStorage is the FileSystemStorage of MEDIA_ROOT, except that a file may
+be kept compressed next to its name: ``uploads/deed.pdf`` stored as
+``uploads/deed.pdf~zst`` (zstd, with the ``zstandard`` package) or
+``uploads/deed.pdf~gz`` (gzip, always available). Uploaded names never contain
+"~" (get_valid_name drops it), so the suffixes can't be mistaken for part of
+one. The name in the database doesn't change. ``open()`` decompresses on the fly, so the media view,
+hashing and backups read the original bytes, and ``exists()``, ``delete()``,
+``listdir()`` and the modification times see the compressed file under the
+original name.
+
+``compress()`` and ``decompress()`` move a file between the tiers; the
+``tier_files`` command (core/tiering.py) decides which.
+"""
+
+import gzip
+import os
+import struct
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+try:
+    import zstandard
+except ImportError:  # optional: cold files are gzipped instead
+    zstandard = None
+
+ZSTD_LEVEL = 19  # compressed once, read rarely: worth the slow level
+GZIP_LEVEL = 9
+
+
+def _zstd_reader(raw):
+    return zstandard.ZstdDecompressor().stream_reader(raw, closefd=False)
+
+
+def _zstd_writer(raw):
+    return zstandard.ZstdCompressor(level=ZSTD_LEVEL, write_content_size=True).stream_writer(raw, closefd=False)
+
+
+def _zstd_size(path):
+    with open(path, "rb") as raw:
+        size = zstandard.frame_content_size(raw.read(18))  # the frame header
+    return size if size >= 0 else None
+
+
+def _gzip_size(path):
+    with open(path, "rb") as raw:
+        raw.seek(-4, os.SEEK_END)
+        return struct.unpack("<I", raw.read(4))[0]  # modulo 4 GiB
+
+
+# suffix -> (reader, writer, original size). Readers and writers wrap an open
+# file and leave it open. zstd first: preferred for new files.
+CODECS = {
+    **({"~zst": (_zstd_reader, _zstd_writer, _zstd_size)} if zstandard is not None else {}),
+    "~gz": (lambda raw: gzip.GzipFile(fileobj=raw, mode="rb"),
+            lambda raw: gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=GZIP_LEVEL),
+            _gzip_size),
+}
+DEFAULT_SUFFIX = next(iter(CODECS))
+
+
+class DecompressedFile(File):
+    """A read-only File over a decompressing stream; closing it closes the stored file."""
+
+    def __init__(self, stream, raw, name, size):
+        super().__init__(stream, name)
+        self._raw = raw
+        if size is not None:
+            self.size = size  # otherwise File would seek to the end to find it
+
+    def seekable(self):
+        return False  # only by decompressing again from the start
+
+    def close(self):
+        super().close()
+        self._raw.close()
+
+
+class TieredStorage(FileSystemStorage):
+    def _compressed(self, name):
+        """(path, suffix) of the compressed copy of ``name``, or None when it is stored plain."""
+        plain = super().path(name)
+        if os.path.exists(plain):
+            return None
+        for suffix in CODECS:
+            if os.path.exists(plain + suffix):
+                return plain + suffix, suffix
+        return None
+
+    def is_compressed(self, name):
+        return self._compressed(name) is not None
+
+    def path(self, name):
+        compressed = self._compressed(name)
+        return compressed[0] if compressed else super().path(name)
+
+    def _open(self, name, mode="rb"):
+        compressed = self._compressed(name)
+        if compressed is None:
+            return super()._open(name, mode)
+        if "r" not in mode or "+" in mode:
+            raise ValueError(f"{name} is stored compressed and can only be read")
+        path, suffix = compressed
+        reader, _, original_size = CODECS[suffix]
+        raw = open(path, "rb")
+        return DecompressedFile(reader(raw), raw, name, original_size(path))
+
+    def size(self, name):
+        compressed = self._compressed(name)
+        if compressed is None:
+            return super().size(name)
+        path, suffix = compressed
+        return CODECS[suffix][2](path)
+
+    def listdir(self, path):
+        directories, files = super().listdir(path)
+        names = set()
+        for filename in files:
+            base, tilde, suffix = filename.rpartition("~")
+            names.add(base if tilde and tilde + suffix in CODECS else filename)
+        return directories, sorted(names)
+
+    def compress(self, name, suffix=DEFAULT_SUFFIX, min_saving=0.0):
+        """
+        Replace the plain file ``name`` with a compressed copy, unless that saves
+        less than ``min_saving`` (a fraction). Returns (bytes before, bytes after),
+        bytes after being None when the file was left plain.
+        """
+        plain = super().path(name)
+        target, partial = plain + suffix, plain + "~partial"
+        writer = CODECS[suffix][1]
+        with open(plain, "rb") as source, open(partial, "wb") as raw:
+            with writer(raw) as out:
+                while chunk := source.read(1024 * 1024):
+                    out.write(chunk)
+        stat = os.stat(plain)
+        if os.path.getsize(partial) > stat.st_size * (1 - min_saving):  # already compressed (JPEG, most PDFs)
+            os.remove(partial)
+            return stat.st_size, None
+        os.replace(partial, target)
+        os.utime(target, ns=(stat.st_atime_ns, stat.st_mtime_ns))  # keeps its age for the orphan sweeper
+        os.remove(plain)  # readers that already opened it keep reading
+        return stat.st_size, os.path.getsize(target)
+
+    def decompress(self, name):
+        """Store ``name`` plain again (it is being read). Returns its size."""
+        compressed = self._compressed(name)
+        if compressed is None:
+            return super().size(name)
+        path, suffix = compressed
+        plain = super().path(name)
+        partial = plain + "~partial"
+        with self._open(name) as source, open(partial, "wb") as out:
+            for chunk in source.chunks():
+                out.write(chunk)
+        stat = os.stat(path)
+        os.replace(partial, plain)  # found before the compressed copy from now on
+        os.utime(plain, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        os.remove(path)
+        return os.path.getsize(plain)
@@ -0,0 +1,42 @@
+# backend/core/tasks.py
+"""Functions run by the background workers (core/jobs.py)."""
+
+import hashlib
+
+from . import fulltext, jobs
+from .models import RecordFile
+
+
+def hash_record_file(file_id):
+    """
+    Store the SHA-256 of an uploaded file. An upload identical to an earlier file
+    of the same record (content, name, category and type) is removed again.
+    """
+    record_file = RecordFile.objects.filter(pk=file_id).first()
+    if record_file is None:
+        return None  # deleted since it was queued
+    hasher = hashlib.sha256()
+    with record_file.uploaded_file.open('rb') as content:
+        for chunk in content.chunks():
+            hasher.update(chunk)
+    file_hash = hasher.hexdigest()
+    duplicate = RecordFile.objects.filter(
+        record_id=record_file.record_id, file_hash=file_hash, display_name=record_file.display_name,
+        category=record_file.category, type=record_file.type, pk__lt=record_file.pk,
+    ).exists()
+    if duplicate:
+        record_file.delete()  # queues its blob for deletion
+        return {'file_hash': file_hash, 'duplicate': True}
+    record_file.file_hash = file_hash
+    record_file.save(update_fields=['file_hash'])
+    jobs.enqueue(extract_file_text, record_file.pk)
+    return {'file_hash': file_hash, 'duplicate': False}
+
+
+def extract_file_text(file_id):
+    """Index the text of an uploaded PDF for the full-text search (core/fulltext.py)."""
+    record_file = RecordFile.objects.filter(pk=file_id).first()
+    if record_file is None:
+        return None
+    text = fulltext.index(record_file)
+    return {'pages': text.pages, 'characters': len(text.content)} if text else {'indexed': False}
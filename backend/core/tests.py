@@ -1,3 +1,896 @@
-from django.test import TestCase
+import asyncio
+import datetime
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+import unittest
+from unittest import mock
+import tempfile
+import threading
+import time
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DatabaseError, connection, transaction
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import TestCase, TransactionTestCase, Client, override_settings
+from django.test.client import BOUNDARY, MULTIPART_CONTENT, encode_multipart
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+
+from . import middleware, urls as core_urls
+from .cache import bump_generation
+from .benchmarks import CORE_SCENARIOS, BenchmarkContext, routes_of, run_scenario
+from .factories import build_record, make_user, seed
+from .metrics import QueryTimer, context_hook, registry, wrap_connections
+from . import backup, blobs, dedup, fulltext, jobs, live, rollups, throttling, tiering, vocab
+from .models import LOCATION_FIELDS, AuditLog, BlobDeletion, DuplicateCluster, FileText, Job, RecordHistory, DailyActivity, DebtRollup, Kebele, Record, RecordFile, RequestProfile
+from .renderers import msgpack
+from .routers import is_replica_view
+from .serializers import RecordFileSerializer, RecordSerializer
+
+MEDIA_ROOT = tempfile.mkdtemp(prefix="fmsystem-test-media-")
+
+# Keep the budget tests quick; the benchmark command covers large volumes
+TEST_RECORDS = int(os.environ.get("BENCH_RECORDS", 40))
+
+FAST_HASHERS = ["django.contrib.auth.hashers.MD5PasswordHasher"]
+
+
+def run_budget_scenarios(test, scenarios):
+    """
+    Run each scenario in its own rolled-back transaction and check its status
+    code and query budget.
+    """
+    client = Client()
+    for scenario in scenarios:
+        # Budgets are about queries: no 429s from the per-user token buckets
+        with test.subTest(scenario=scenario.name), override_settings(THROTTLE_BUCKETS={}), transaction.atomic():
+            response, queries, _ = run_scenario(client, scenario, test.ctx)
+            test.assertIn(response.status_code, scenario.status, response.content[:300])
+            test.assertLessEqual(
+                queries, scenario.budget,
+                f"{scenario.name} ran {queries} queries, budget is {scenario.budget}",
+            )
+            transaction.set_rollback(True)
+
+
+class TempMediaRecordTestCase(TestCase):
+    """Uploads go to a temporary MEDIA_ROOT, attached to ``self.record`` by ``upload()``."""
+
+    def setUp(self):
+        super().setUp()
+        media = override_settings(MEDIA_ROOT=self.temp_dir("fmsystem-test-media-"))
+        media.enable()
+        self.addCleanup(media.disable)
+        vocab.clear()  # keys cached by another test class were rolled back
+        self.record = build_record(1)
+        self.record.save()
+
+    def temp_dir(self, prefix):
+        directory = tempfile.mkdtemp(prefix=prefix)
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        return directory
+
+    def upload(self, content=b"%PDF-1.4 scan", name="scan.pdf", **fields):
+        return RecordFile.objects.create(record=self.record, uploaded_file=ContentFile(content, name=name), **fields)
+
+
+# The replica mirrors "default" in tests but is a separate connection, so it
+# can't see rows created inside a TestCase transaction: route everything to default.
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, PASSWORD_HASHERS=FAST_HASHERS, DATABASE_ROUTERS=[])
+class EndpointQueryBudgetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed(TEST_RECORDS)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.ctx = BenchmarkContext()
+
+    def test_every_route_has_a_scenario(self):
+        covered = {scenario.route for scenario in CORE_SCENARIOS}
+        self.assertEqual(routes_of(core_urls.urlpatterns) - covered, set())
+
+    def test_query_budgets(self):
+        run_budget_scenarios(self, CORE_SCENARIOS)
+
+
+class ReplicaPinTests(TestCase):
+    def test_process_local_pins_are_refused_with_a_separate_replica(self):
+        self.assertFalse(middleware._separate_replica())  # the test mirror
+        middleware.ReplicaRoutingMiddleware(lambda request: None)
+        with mock.patch.object(middleware, "_separate_replica", return_value=True):
+            with self.assertRaises(ImproperlyConfigured):
+                middleware.ReplicaRoutingMiddleware(lambda request: None)
+
+
+class ReplicaViewTests(TestCase):
+    def test_report_views_are_routed_to_the_replica(self):
+        routes = {"debt-analytics": {}, "activity-timeseries": {}, "shelf-contents": {}, "record-history": {"pk": 1},
+                  "file-search": {}}
+        for name, kwargs in routes.items():
+            with self.subTest(name):
+                self.assertTrue(is_replica_view(resolve(reverse(name, kwargs=kwargs)).func))
+
+
+@override_settings(DATABASE_ROUTERS=[], THROTTLE_BUCKETS={})
+class RequestMetricsTests(TestCase):
+    def setUp(self):
+        registry.reset()
+
+    def test_requests_are_timed_and_exported(self):
+        seed(3)
+        ctx = BenchmarkContext()
+        response = self.client.get("/api/records/recent/", **ctx.headers("admin"))
+        self.assertRegex(response["Server-Timing"], r'^total;dur=[\d.]+, sql;dur=[\d.]+;desc="\d+ queries"$')
+
+        body = self.client.get("/metrics").content.decode()
+        self.assertIn('http_request_duration_seconds_count{view="recent-records",method="GET"} 1', body)
+        self.assertIn('http_requests_total{view="recent-records",method="GET",status="200"} 1', body)
+        self.assertRegex(body, r'http_request_sql_queries_total\{view="recent-records",method="GET"\} [1-9]')
+
+    async def test_concurrent_async_requests_count_their_own_queries(self):
+        async def request(queries):
+            await sync_to_async(wrap_connections)()
+            with context_hook(QueryTimer()) as timer:
+                for _ in range(queries):
+                    await Kebele.objects.acount()
+                    await asyncio.sleep(0)
+            return timer.count
+
+        self.assertEqual(await asyncio.gather(request(2), request(5)), [2, 5])
+
+    @override_settings(METRICS_ALLOWED_IPS=["10.0.0.1"])
+    def test_metrics_is_restricted_to_allowed_ips(self):
+        self.assertEqual(self.client.get("/metrics").status_code, 403)
+
+
+@override_settings(
+    DATABASE_ROUTERS=[], THROTTLE_BUCKETS={}, PROFILING_ENABLED=True, PROFILE_SAMPLE_RATE=0,
+    PROFILE_SLOW_REQUEST_MS=0, PROFILE_SLOW_QUERY_MS=0, PROFILE_MAX_ROWS=2,
+)
+class RequestProfilingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed(3)
+
+    def setUp(self):
+        self.ctx = BenchmarkContext()
+        self.headers = self.ctx.headers("admin")
+
+    def test_slow_requests_are_kept_with_explain_plans(self):
+        for kebele in ("nowhere", "elsewhere", self.ctx.values["kebele"]):
+            self.client.get(f"/api/records/search-by-kebele/?kebele={kebele}", **self.headers)
+
+        self.assertEqual(RequestProfile.objects.count(), 2)  # capped
+        profile = RequestProfile.objects.latest("pk")
+        self.assertEqual((profile.reason, profile.view_name), ("slow", "search-by-kebele"))
+        self.assertIn(f"?kebele={self.ctx.values['kebele']}", profile.path)
+        selects = [q for q in profile.queries if "core_record" in q["sql"]]
+        self.assertTrue(selects and all(q["explain"] for q in selects))
+        users = [q for q in profile.queries if '"auth_user"' in q["sql"]]  # the JWT's user
+        self.assertTrue(users and not any(q["params"] or q["explain"] for q in users))
+
+    def test_credentials_are_left_out_of_the_path(self):
+        self.client.get("/api/records/search-by-kebele/?ticket=secret&kebele=x&access_token=secret", **self.headers)
+        self.assertEqual(RequestProfile.objects.get().path, "/api/records/search-by-kebele/?kebele=x")
+
+    @override_settings(PROFILE_SAMPLE_RATE=1)
+    def test_sampled_requests_run_under_cprofile(self):
+        self.client.get("/api/records/recent/", **self.headers)
+        profile = RequestProfile.objects.get()
+        self.assertEqual(profile.reason, "sampled")
+        self.assertIn("cumulative", profile.profile)
+
+    async def test_async_requests_keep_their_queries_only(self):
+        await self.async_client.get(
+            f"/api/async/records/search-by-kebele/?kebele={self.ctx.values['kebele']}",
+            headers={"Authorization": f"Bearer {self.ctx.tokens['admin']}"},
+        )
+        profile = await RequestProfile.objects.aget()
+        self.assertEqual(profile.profile, "Not profiled: async request")
+        self.assertTrue(any("core_record" in q["sql"] for q in profile.queries))
+
+
+# Endpoints whose queries must be served from an index, and the tables checked
+INDEXED_SCENARIOS = (
+    "record-search", "search-by-service", "search-by-kebele", "search-by-proof", "search-by-possession",
+    "recent-records", "proof-of-possession-stats", "service-of-estate-stats", "record-files",
+    "check-upin", "audit-logs", "dashboard-metrics", "shelf-contents", "next-location", "next-location-folder",
+)
+PLANNED_TABLES = ("core_record", "core_recordfile", "core_auditlog")
+
+
+def sequential_scans(sql):
+    """Tables of PLANNED_TABLES that ``sql`` reads with a full scan."""
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            # Seed volumes are tiny; make the planner pick an index whenever one exists
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            cursor.execute("EXPLAIN " + sql)
+            plan = [row[0] for row in cursor.fetchall()]
+            pattern = r"Seq Scan on (\w+)"
+        else:
+            cursor.execute("EXPLAIN QUERY PLAN " + sql)
+            plan = [row[-1] for row in cursor.fetchall()]
+            pattern = r"^SCAN (?:TABLE )?(\w+)$"
+    return {m.group(1) for line in plan for m in [re.search(pattern, line.strip())] if m} & set(PLANNED_TABLES)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, PASSWORD_HASHERS=FAST_HASHERS, DATABASE_ROUTERS=[], THROTTLE_BUCKETS={})
+class QueryPlanTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed(TEST_RECORDS)
+
+    def test_endpoints_do_not_scan_whole_tables(self):
+        ctx = BenchmarkContext()
+        client = Client()
+        scenarios = [s for s in CORE_SCENARIOS if s.name in INDEXED_SCENARIOS]
+        self.assertEqual(len(scenarios), len(INDEXED_SCENARIOS))
+        for scenario in scenarios:
+            with self.subTest(scenario=scenario.name), CaptureQueriesContext(connection) as queries:
+                run_scenario(client, scenario, ctx)
+            for query in queries:
+                if query["sql"].startswith("SELECT"):
+                    with self.subTest(scenario=scenario.name, sql=query["sql"]):
+                        self.assertEqual(sequential_scans(query["sql"]), set())
+
+
+class DebtRollupTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed(30)
+
+    def rollup_rows(self):
+        return sorted(
+            DebtRollup.objects.values_list(*rollups.GROUP_FIELDS, "record_count", "records_in_debt",
+                                           *rollups.DEBT_FIELDS, "histogram")
+        )
+
+    def test_signals_keep_rollups_equal_to_a_rebuild(self):
+        record = Record.objects.first()
+        record.kebele_id, record.unpaidLeaseDebt = vocab.vocabulary("kebele").key("99", create=True), 1234
+        record.save()
+        Record.objects.last().delete()
+        Record.objects.filter(pk=Record.objects.order_by("pk")[1].pk).get().save(update_fields=["PhoneNumber"])
+        build_record(1000).save()
+
+        incremental = self.rollup_rows()
+        rollups.rebuild()
+        self.assertEqual(incremental, self.rollup_rows())
+        self.assertIn(vocab.vocabulary("kebele").key("99"), [row[0] for row in incremental])
+
+    def test_summary_percentiles(self):
+        summary = rollups.summarize(DebtRollup.objects.all(), "kebele")
+        self.assertEqual(summary["total"]["record_count"], 30)
+        self.assertEqual(sum(group["record_count"] for group in summary["groups"]), 30)
+        self.assertLessEqual(summary["total"]["p50"], summary["total"]["p90"])
+        self.assertLessEqual(summary["total"]["p90"], summary["total"]["p99"])
+
+
+class DailyActivityTests(TestCase):
+    def test_rollup_counts_per_day_and_bucket(self):
+        seed(4, files_per_record=1, audit_logs_per_record=0)
+        today = timezone.localdate()
+        ten_days_ago = timezone.now() - datetime.timedelta(days=10)
+        Record.objects.filter(pk__in=Record.objects.order_by("pk")[:2].values("pk")).update(created_at=ten_days_ago)
+        for user, when in (("ann", ten_days_ago), ("ann", timezone.now()), ("bob", timezone.now())):
+            AuditLog.objects.filter(pk=AuditLog.objects.create(user=user, action="LOGIN").pk).update(timestamp=when)
+
+        DailyActivity.objects.all().delete()
+        self.assertEqual(rollups.rollup_daily_activity(), 11)
+        rows = {row.date: row for row in DailyActivity.objects.all()}
+        self.assertEqual(rows[today].records_created, 2)
+        self.assertEqual(rows[today].files_uploaded, RecordFile.objects.count())
+        self.assertEqual(rows[today].active_users, ["ann", "bob"])
+        self.assertEqual(rows[today - datetime.timedelta(days=10)].records_created, 2)
+
+        # Only the last day is recomputed on the next run
+        self.assertEqual(rollups.rollup_daily_activity(), 1)
+
+        month = rollups.activity_series(today - datetime.timedelta(days=40), today, "month")
+        self.assertEqual(sum(p["recordsCreated"] for p in month), 4)
+        self.assertLessEqual(max(p["activeUsers"] for p in month), 2)  # ann is counted once per month
+
+
+@override_settings(DATABASE_ROUTERS=[], THROTTLE_BUCKETS={})
+class VocabularyTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed(5)
+
+    def test_labels_round_trip_without_queries(self):
+        ctx = BenchmarkContext()
+        record = Record.objects.prefetch_related("files").first()
+        with self.assertNumQueries(0):
+            data = RecordSerializer(record).data
+        self.assertEqual(data["kebele"], Kebele.objects.get(pk=record.kebele_id).name)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.put(
+                f"/api/records/upin/{record.UPIN}", encode_multipart(BOUNDARY, {"kebele": "New Kebele"}),
+                content_type=MULTIPART_CONTENT, **ctx.headers("admin"),
+            )
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()["kebele"], "New Kebele")
+        self.assertEqual(Record.objects.get(pk=record.pk).kebele.name, "New Kebele")
+        self.assertIn("New Kebele", self.client.get("/api/vocabularies/", **ctx.headers("clerk")).json()["kebele"])
+
+    def test_invalid_records_add_no_labels(self):
+        record = Record.objects.first()
+        serializer = RecordSerializer(record, data={"kebele": "Typo Kebele", "LastTaxPaymtDate": "1800-01-01"},
+                                      partial=True)
+        self.assertFalse(serializer.is_valid())
+        self.assertFalse(Kebele.objects.filter(name="Typo Kebele").exists())
+
+    def test_labels_rolled_back_are_not_cached(self):
+        kebeles = vocab.vocabulary("kebele")
+        with transaction.atomic():
+            pk = kebeles.key("Rolled Back", create=True)
+            self.assertEqual(kebeles.label(pk), "Rolled Back")
+            transaction.set_rollback(True)
+        self.assertIsNone(kebeles.key("Rolled Back"))
+        self.assertNotIn("Rolled Back", kebeles.labels())
+
+    def test_search_by_unknown_label_is_empty(self):
+        response = self.client.get("/api/records/search-by-kebele/?kebele=nowhere",
+                                   **BenchmarkContext().headers("admin"))
+        self.assertEqual(response.json(), [])
+
+
+@override_settings(DATABASE_ROUTERS=[], THROTTLE_BUCKETS={})
+class ArchiveLocationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed(5)
+
+    def setUp(self):
+        self.ctx = BenchmarkContext()
+        self.headers = self.ctx.headers("admin")
+
+    def file(self, n, row, shelf, folder, position):
+        record = build_record(n)
+        record.Row, record.ShelfNumber, record.FolderNumber, record.sortingNumber = row, shelf, folder, position
+        record.save()
+        return record
+
+    def test_save_normalizes_the_location(self):
+        record = self.file(100, "R-07", " 3 ", "F12a", "none")
+        self.assertEqual([getattr(record, f) for f in LOCATION_FIELDS.values()], [7, 3, 12, None])
+        record.sortingNumber = "0042"
+        record.save(update_fields=["sortingNumber"])
+        record.refresh_from_db()
+        self.assertEqual(record.location_position, 42)
+
+    def test_long_digit_runs_fit_or_are_left_null(self):
+        record = self.file(101, "20240115001", "1", "9" * 25, "1")
+        record.refresh_from_db()
+        self.assertEqual((record.location_row, record.location_folder), (20240115001, None))
+        response = self.client.get("/api/archive/shelves/?row=20240115001", **self.headers).json()
+        self.assertEqual([r["id"] for r in response["records"]], [record.pk])
+        self.assertEqual(self.client.get(f"/api/archive/shelves/?row={'9' * 25}", **self.headers).status_code, 400)
+
+    def test_shelf_listing_and_next_location(self):
+        for n, location in enumerate([("900", "2", "11", "10"), ("900", "1", "5", "2"), ("900", "2", "11", "9"),
+                                      ("901", "1", "1", "1"), ("902", "1", "1", "1")]):
+            self.file(200 + n, *location)
+        response = self.client.get("/api/archive/shelves/?row=900-901", **self.headers).json()
+        self.assertEqual([(r["ShelfNumber"], r["sortingNumber"]) for r in response["records"]],
+                         [("1", "2"), ("2", "9"), ("2", "10"), ("1", "1")])
+        response = self.client.get("/api/archive/shelves/?row=900&shelf=2&limit=1", **self.headers).json()
+        self.assertEqual((len(response["records"]), response["truncated"]), (1, True))
+
+        next_in_folder = self.client.get("/api/archive/next-location/?row=900&shelf=2&folder=11", **self.headers)
+        self.assertEqual(next_in_folder.json(), {"row": 900, "shelf": 2, "folder": 11, "position": 11})
+        next_folder = self.client.get("/api/archive/next-location/?row=900&shelf=2", **self.headers)
+        self.assertEqual(next_folder.json(), {"row": 900, "shelf": 2, "folder": 12, "position": 1})
+        self.assertEqual(self.client.get("/api/archive/shelves/?row=x", **self.headers).status_code, 400)
+        for limit in ("0", "-3"):
+            self.assertEqual(self.client.get(f"/api/archive/shelves/?row=900&limit={limit}", **self.headers)
+                             .status_code, 400)
+
+
+@override_settings(DATABASE_ROUTERS=[])
+class RecordHistoryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed(3)
+
+    def setUp(self):
+        self.ctx = BenchmarkContext()
+        self.headers = self.ctx.headers("admin")
+        self.record = Record.objects.order_by("pk").first()
+
+    def test_edits_write_only_changed_fields_and_their_history(self):
+        kebele = self.ctx.values["kebele"]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.put(
+                f"/api/records/{self.record.UPIN}/",
+                {"PropertyOwnerName": "Renamed", "kebele": "Kebele 99", "spaceSize": self.record.spaceSize},
+                content_type="application/json", **self.headers,
+            )
+        self.assertEqual(response.status_code, 200, response.content)
+        update = next(q["sql"] for q in queries if q["sql"].startswith('UPDATE "core_record"'))
+        self.assertNotIn('"spaceSize"', update)
+        self.assertNotIn('"UPIN"', update)
+
+        # Nothing changed: no write, no history
+        self.client.put(f"/api/records/{self.record.UPIN}/", {"PropertyOwnerName": "Renamed"},
+                        content_type="application/json", **self.headers)
+
+        history = self.client.get(f"/api/records/{self.record.pk}/history/", **self.headers).json()
+        self.assertEqual(len(history), 1)
+        self.assertEqual(history[0]["changes"], {
+            "PropertyOwnerName": [self.record.PropertyOwnerName, "Renamed"],
+            "kebele": [kebele, "Kebele 99"],
+        })
+        self.assertEqual(history[0]["user"], "bench-admin")
+        self.assertIn("kebele, PropertyOwnerName", AuditLog.objects.filter(details__startswith="Updated record").order_by("pk").first().details)
+        self.assertEqual(RecordHistory.objects.count(), 1)
+
+
+class BlobCleanupTests(TempMediaRecordTestCase):
+    def setUp(self):
+        super().setUp()
+        self.files = [self.upload(b"%PDF", f"{i}.pdf") for i in range(3)]
+
+    def test_deletes_are_queued_and_processed_outside_the_request(self):
+        paths = [f.uploaded_file.name for f in self.files]
+        self.files[0].delete()
+        self.record.delete()
+        self.assertTrue(all(default_storage.exists(path) for path in paths))
+        self.assertCountEqual(BlobDeletion.objects.values_list("path", flat=True), paths)
+
+        self.assertEqual(blobs.process_deletions(), 3)
+        self.assertFalse(any(default_storage.exists(path) for path in paths))
+        self.assertFalse(BlobDeletion.objects.exists())
+
+    def test_sweeper_removes_old_unreferenced_files_only(self):
+        orphan = default_storage.save("uploads/orphan.pdf", ContentFile(b"%PDF"))
+        old = time.time() - 2 * 3600
+        for path in (orphan, self.files[0].uploaded_file.name):
+            os.utime(default_storage.path(path), (old, old))
+        fresh = default_storage.save("uploads/fresh.pdf", ContentFile(b"%PDF"))
+
+        scanned, orphans = blobs.sweep_orphans()
+        self.assertEqual((scanned, orphans), (5, [orphan]))
+        self.assertFalse(default_storage.exists(orphan))
+        self.assertTrue(default_storage.exists(fresh))
+        self.assertTrue(all(default_storage.exists(f.uploaded_file.name) for f in self.files))
+
+
+@override_settings(DATABASE_ROUTERS=[])
+class DuplicateDetectionTests(TestCase):
+    def setUp(self):
+        vocab.clear()
+        people = [
+            ("Abebe Kebede", "12-345-678", "+251 911 234 567", "AR-000120"),
+            ("Kebede Abebe", "12345678", None, "AR 120"),     # same owner, names swapped
+            ("ሀይለ ገብረስላሴ", None, "0922 000 111", "AR-000500"),
+            ("ኃይሌ ገብረሥላሴ", None, "922000111", "AR-500"),   # other spelling, same phone and folder
+            ("Abebe Kebede", "99999999", "0933000000", "AR-000777"),  # namesake, nothing else in common
+        ]
+        self.records = []
+        for n, (name, nid, phone, code) in enumerate(people):
+            record = build_record(n)
+            record.PropertyOwnerName, record.NationalId, record.PhoneNumber, record.ExistingArchiveCode = name, nid, phone, code
+            record.save()
+            self.records.append(record.pk)
+
+    def test_keys_normalize_spelling_and_formatting(self):
+        self.assertEqual(dedup.phonetic(dedup.simplify("Abbebe  KEBEDE")), dedup.phonetic(dedup.simplify("Kebede Abebe")))
+        self.assertEqual(dedup.phonetic(dedup.simplify("ኃይሌ")), dedup.phonetic(dedup.simplify("ሀይለ")))
+        self.assertEqual(dedup.phone("+251 911 234 567"), dedup.phone("0911234567"))
+        self.assertEqual(dedup.archive_code("ar-000120"), dedup.archive_code("AR 120"))
+
+    def test_finds_clusters_and_keeps_reviewed_ones(self):
+        scanned, clusters = dedup.find()
+        self.assertEqual(scanned, 5)
+        self.assertCountEqual([pks for pks, _, _ in clusters], [self.records[0:2], self.records[2:4]])
+        owner = next(reasons for pks, _, reasons in clusters if pks == self.records[0:2])
+        self.assertEqual(owner, ["ExistingArchiveCode", "NationalId", "PropertyOwnerName"])
+
+        self.assertEqual(dedup.save(clusters), 2)
+        cluster = DuplicateCluster.objects.get(records=self.records[0])
+        self.assertEqual(cluster.size, 2)
+        DuplicateCluster.objects.filter(pk=cluster.pk).update(status=DuplicateCluster.DISMISSED)
+        self.assertEqual(dedup.save(dedup.find()[1]), 1)  # the dismissed cluster isn't proposed again
+        self.assertEqual(DuplicateCluster.objects.count(), 2)
+
+    def test_workers_find_the_same_clusters(self):
+        self.assertEqual(dedup.find(workers=2)[1], dedup.find()[1])
+
+
+@override_settings(DATABASE_ROUTERS=[], LIVE_POLL_SECONDS=0.01, LIVE_HEARTBEAT_SECONDS=5)
+class LiveDashboardTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed(3)
+
+    def setUp(self):
+        self.ctx = BenchmarkContext()
+
+    def test_delta_keeps_changed_keys_only(self):
+        old = {"dashboard": {"totalRecords": 3, "filesUploaded": 6}, "amountPaid": [1]}
+        new = {"dashboard": {"totalRecords": 4, "filesUploaded": 6}, "amountPaid": [1]}
+        self.assertEqual(live.delta(old, new), {"dashboard": {"totalRecords": 4}})
+        self.assertEqual(live.delta(None, new), new)
+
+    async def test_stream_starts_with_a_snapshot_for_the_role(self):
+        for user, has_dashboard in (("admin", True), ("clerk", False)):
+            response = await self.async_client.get(
+                "/api/async/live/dashboard/", headers={"Authorization": f"Bearer {self.ctx.tokens[user]}"},
+            )
+            self.assertEqual(response["Content-Type"], "text/event-stream")
+            events = aiter(response.streaming_content)
+            first = (await anext(events)).decode()
+            self.assertTrue(first.startswith("event: snapshot\n"), first)
+            self.assertIn('"serviceOfEstate"', first)
+            self.assertEqual('"totalRecords": 3' in first, has_dashboard)
+            if has_dashboard:
+                await Record.objects.filter(pk=(await Record.objects.afirst()).pk).aupdate(FirstAmount="0")
+                bump_generation(Record)
+                update = (await anext(events)).decode()
+                self.assertTrue(update.startswith("event: delta\n"), update)
+                self.assertNotIn('"dashboard"', update)
+                self.assertIn('"amountPaid"', update)
+            await events.aclose()
+
+    async def test_a_ticket_opens_one_stream(self):
+        response = await self.async_client.post(
+            "/api/live/ticket/", headers={"Authorization": f"Bearer {self.ctx.tokens['clerk']}"},
+        )
+        url = f"/api/async/live/dashboard/?ticket={response.json()['ticket']}"
+        response = await self.async_client.get(url)
+        events = aiter(response.streaming_content)
+        self.assertTrue((await anext(events)).decode().startswith("event: snapshot\n"))
+        await events.aclose()
+        self.assertEqual((await self.async_client.get(url)).status_code, 401)  # used
+        self.assertEqual((await self.async_client.get(url + "x")).status_code, 401)  # forged
+
+    async def test_stream_ends_when_the_token_expires(self):
+        ticket = live.issue_ticket(self.ctx.clerk, time.time() + 0.2)
+        response = await self.async_client.get(f"/api/async/live/dashboard/?ticket={ticket}")
+        events = [chunk.decode() async for chunk in response.streaming_content]
+        self.assertTrue(events[0].startswith("event: snapshot\n"))
+        self.assertTrue(events[-1].startswith("event: expired\n"), events)
+
+
+@override_settings(DATABASE_ROUTERS=[], THROTTLE_BUCKETS={})
+class CompactRenderingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed(4)
+
+    def setUp(self):
+        self.ctx = BenchmarkContext()
+        self.headers = self.ctx.headers("admin")
+        self.url = f"/api/records/search-by-kebele/?kebele={self.ctx.values['kebele']}"
+
+    def test_columnar_json_by_format_or_accept_header(self):
+        rows = self.client.get(self.url, **self.headers).json()
+        for extra, url in (({}, self.url + "&format=columnar"),
+                           ({"HTTP_ACCEPT": "application/vnd.fmsystem.columnar+json"}, self.url)):
+            response = self.client.get(url, **self.headers, **extra)
+            self.assertEqual(response["Content-Type"], "application/vnd.fmsystem.columnar+json")
+            table = json.loads(response.content)
+            self.assertEqual(table["columns"], list(rows[0]))
+            self.assertEqual([dict(zip(table["columns"], row)) for row in table["rows"]], rows)
+
+        upin = self.ctx.values["upin"]
+        table = self.client.get(f"/api/async/records/search/?UPIN={upin}&format=columnar", **self.headers).json()
+        self.assertEqual(table["rows"][0][table["columns"].index("UPIN")], upin)
+
+    @unittest.skipIf(msgpack is None, "msgpack is not installed")
+    def test_messagepack(self):
+        response = self.client.get(self.url + "&format=msgpack", **self.headers)
+        self.assertEqual(response["Content-Type"], "application/msgpack")
+        self.assertEqual(msgpack.unpackb(response.content), self.client.get(self.url, **self.headers).json())
+
+    def test_json_is_compressed_when_accepted(self):
+        plain = self.client.get(self.url, **self.headers)
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING="gzip;q=1.0, identity", **self.headers)
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", response["Vary"])
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+        refused = self.client.get(self.url, HTTP_ACCEPT_ENCODING="gzip;q=0", **self.headers)
+        self.assertFalse(refused.has_header("Content-Encoding"))
+
+
+@override_settings(DATABASE_ROUTERS=[], THROTTLE_BUCKETS={})
+class SparseFieldsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed(4)
+
+    def setUp(self):
+        self.ctx = BenchmarkContext()
+        self.headers = self.ctx.headers("admin")
+
+    def test_fields_narrow_the_output_and_the_sql(self):
+        url = f"/api/records/search-by-kebele/?kebele={self.ctx.values['kebele']}&fields=UPIN,placeLevel"
+        with CaptureQueriesContext(connection) as queries:
+            rows = self.client.get(url, **self.headers).json()
+        self.assertTrue(rows)
+        self.assertEqual({key for row in rows for key in row}, {"UPIN", "placeLevel"})
+        select = next(q["sql"] for q in queries if 'FROM "core_record"' in q["sql"])
+        self.assertNotIn('"PropertyOwnerName"', select)
+        self.assertNotIn("core_recordfile", " ".join(q["sql"] for q in queries))
+
+        for url in ("/records/?exclude=files,NationalId", "/api/records/recent/?exclude=files,NationalId",
+                    f"/api/async/records/search/?UPIN={self.ctx.values['upin']}&exclude=files,NationalId"):
+            rows = self.client.get(url, **self.headers).json()
+            rows = rows.get("results", rows) if isinstance(rows, dict) else rows
+            with self.subTest(url=url):
+                self.assertTrue(rows)
+                self.assertIn("kebele", rows[0])
+                self.assertFalse({"files", "NationalId"} & set(rows[0]))
+
+
+@override_settings(DATABASE_ROUTERS=[], THROTTLE_BUCKETS={"report": (2, 0.5), "lookup": (3, 1.0)})
+class ThrottlingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed(3)
+
+    def setUp(self):
+        self.ctx = BenchmarkContext()
+        self.url = f"/api/records/search-by-kebele/?kebele={self.ctx.values['kebele']}"
+
+    def test_bucket_refills_at_its_rate(self):
+        buckets = throttling.LocalBuckets()
+        self.assertEqual([buckets.take("k", 2, 1.0, now=0) for _ in range(3)], [0, 0, 1.0])
+        self.assertEqual(buckets.take("k", 2, 1.0, now=1.5), 0)
+        self.assertEqual(buckets.take("k", 2, 1.0, now=1.5), 0.5)
+
+    def test_reports_are_throttled_per_user_with_retry_after(self):
+        for _ in range(2):
+            self.assertEqual(self.client.get(self.url, **self.ctx.headers("clerk")).status_code, 200)
+        response = self.client.get(self.url, **self.ctx.headers("clerk"))
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], "2")
+        # Async reports share the bucket; other users and other scopes are unaffected
+        self.assertEqual(self.client.get("/api/async" + self.url[4:], **self.ctx.headers("clerk")).status_code, 429)
+        self.assertEqual(self.client.get(self.url, **self.ctx.headers("admin")).status_code, 200)
+        upin = self.client.get(f"/api/records/check-upin/{self.ctx.values['upin']}/", **self.ctx.headers("clerk"))
+        self.assertEqual(upin.status_code, 200)
+
+
+def failing_task(message):
+    raise RuntimeError(message)
+
+
+worker_stop = threading.Event()
+
+
+def stop_worker():
+    worker_stop.set()
+
+
+@override_settings(DATABASE_ROUTERS=[], THROTTLE_BUCKETS={})
+class JobQueueTests(TempMediaRecordTestCase):
+    def test_uploads_are_hashed_by_the_worker(self):
+        first, second, other = self.upload(), self.upload(), self.upload(b"%PDF-1.4 other")
+        self.assertEqual(Job.objects.filter(status=Job.QUEUED).count(), 3)
+        self.assertIsNone(RecordFile.objects.get(pk=first.pk).file_hash)
+
+        self.assertEqual(jobs.run_pending(), 5)  # three hashes, then text extraction of the two kept
+        self.assertEqual(RecordFile.objects.get(pk=first.pk).file_hash,
+                         hashlib.sha256(b"%PDF-1.4 scan").hexdigest())
+        self.assertFalse(RecordFile.objects.filter(pk=second.pk).exists())  # same upload twice
+        self.assertTrue(RecordFile.objects.filter(pk=other.pk).exists())
+        self.assertEqual(Job.objects.filter(status=Job.DONE).count(), 5)
+        self.assertEqual(Job.objects.get(args=[second.pk]).result["duplicate"], True)
+
+    def test_claimed_jobs_are_skipped_by_other_workers(self):
+        jobs.enqueue(failing_task, "a")
+        jobs.enqueue(failing_task, "b", run_at=timezone.now() + datetime.timedelta(hours=1))
+        self.assertEqual(len(jobs.claim("w1", limit=5)), 1)  # the other one isn't due
+        self.assertEqual(jobs.claim("w2", limit=5), [])
+
+    def test_failed_jobs_are_retried_with_backoff_then_given_up(self):
+        job = jobs.enqueue(failing_task, "boom", max_attempts=2)
+        with self.assertLogs("core.jobs", "WARNING"):
+            self.assertEqual(jobs.run_pending(), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.QUEUED, 1))
+        self.assertGreater(job.run_at, timezone.now())
+        self.assertIn("RuntimeError: boom", job.last_error)
+
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        with self.assertLogs("core.jobs", "ERROR"):
+            self.assertEqual(jobs.run_pending(), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+        self.assertEqual(jobs.run_pending(), 0)
+
+    def test_stale_jobs_are_requeued(self):
+        job = jobs.enqueue(failing_task, "lost")
+        jobs.claim("dead-worker")
+        Job.objects.filter(pk=job.pk).update(started_at=timezone.now() - jobs.STALE_AFTER * 2)
+        self.assertEqual(jobs.requeue_stale(), 1)
+        self.assertEqual(len(jobs.claim("w1")), 1)
+
+    def test_job_endpoints(self):
+        admin, clerk = make_user("job-admin", "Administrators"), make_user("job-clerk")
+        job = jobs.enqueue(failing_task, "x", user=admin)
+        Job.objects.filter(pk=job.pk).update(status=Job.FAILED, attempts=5)
+        clerk_auth = {"HTTP_AUTHORIZATION": f"Bearer {AccessToken.for_user(clerk)}"}
+        admin_auth = {"HTTP_AUTHORIZATION": f"Bearer {AccessToken.for_user(admin)}"}
+        self.assertEqual(self.client.get("/api/jobs/", **clerk_auth).status_code, 403)
+        self.assertEqual(self.client.get(f"/api/jobs/{job.pk}/", **clerk_auth).status_code, 404)  # not theirs
+        self.assertEqual(self.client.get(f"/api/jobs/{job.pk}/", **admin_auth).json()["status"], Job.FAILED)
+        response = self.client.post(f"/api/jobs/{job.pk}/retry/", **admin_auth)
+        self.assertEqual((response.json()["status"], response.json()["attempts"]), (Job.QUEUED, 0))
+        self.assertEqual(self.client.post(f"/api/jobs/{job.pk}/retry/", **admin_auth).status_code, 409)
+
+
+@override_settings(DATABASE_ROUTERS=[])
+class JobWorkerLoopTests(TransactionTestCase):
+    def test_the_loop_survives_errors_and_requeues_stale_jobs(self):
+        job = jobs.enqueue(stop_worker)
+        jobs.claim("dead-worker")
+        Job.objects.filter(pk=job.pk).update(started_at=timezone.now() - jobs.STALE_AFTER * 2)
+        claim, calls = jobs.claim, []
+
+        def flaky_claim(worker, limit=1):
+            calls.append(worker)
+            if len(calls) == 1:
+                raise DatabaseError("connection lost")
+            return claim(worker, limit)
+
+        worker_stop.clear()
+        with mock.patch.object(jobs, "claim", flaky_claim), self.assertLogs("core.jobs", "ERROR"):
+            jobs.work(poll_interval=0, stop=worker_stop)
+        self.assertEqual(Job.objects.get(pk=job.pk).status, Job.DONE)
+
+
+def text_pdf(text):
+    """A one-page PDF whose text layer is ``text``."""
+    content = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode()
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R "
+        b"/Resources << /Font << /F1 5 0 R >> >> >>",
+        b"<< /Length %d >>\nstream\n%s\nendstream" % (len(content), content),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    pdf, offsets = b"%PDF-1.4\n", []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(pdf))
+        pdf += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(pdf)
+    pdf += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    pdf += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    pdf += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return pdf
+
+
+@override_settings(DATABASE_ROUTERS=[], THROTTLE_BUCKETS={})
+class FileSearchTests(TempMediaRecordTestCase):
+    @unittest.skipIf(fulltext.PdfReader is None, "pypdf is not installed")
+    def test_uploaded_pdfs_are_indexed_by_the_worker(self):
+        record_file = self.upload(text_pdf("Lease invoice 4471 for plot 12"))
+        jobs.run_pending()  # hash, then extract
+        text = FileText.objects.get(file=record_file)
+        self.assertEqual(text.pages, 1)
+        self.assertIn("invoice 4471", text.content)
+
+    def test_search_returns_matching_files_with_their_record(self):
+        matching, other = self.upload(b"%PDF"), self.upload(b"%PDF", "other.pdf")
+        fulltext.store(matching, "Receipt of the lease payment. Invoice 4471 for plot 12 of Kebele 03.", 2)
+        fulltext.store(other, "Invoice 9000 for plot 7", 1)
+        headers = {"HTTP_AUTHORIZATION": f"Bearer {AccessToken.for_user(make_user('searcher'))}"}
+
+        response = self.client.get("/api/files/search/?q=invoice 4471", **headers)
+        results = response.json()["results"]
+        self.assertEqual([result["file"]["id"] for result in results], [matching.pk])
+        self.assertEqual(results[0]["record"]["UPIN"], self.record.UPIN)
+        self.assertIn("4471", results[0]["snippet"])
+        self.assertEqual(self.client.get("/api/files/search/", **headers).status_code, 400)
+
+    def test_text_of_a_file_replaced_by_another_type_is_dropped(self):
+        record_file = self.upload(b"%PDF")
+        fulltext.store(record_file, "old text", 1)
+        record_file.uploaded_file = ContentFile(b"PNG", name="photo.png")
+        record_file.type = "image/png"
+        record_file.file_hash = None
+        record_file.save()
+        jobs.run_pending()
+        self.assertFalse(FileText.objects.filter(file=record_file).exists())
+
+
+@override_settings(DATABASE_ROUTERS=[])
+class BackupTests(TempMediaRecordTestCase):
+    def setUp(self):
+        super().setUp()
+        self.root = self.temp_dir("fmsystem-backup-")
+        self.files = [self.upload(content, file_hash=hashlib.sha256(content).hexdigest())
+                      for content in (b"deed", b"deed", b"invoice")]
+
+    def test_only_new_files_are_copied(self):
+        first = backup.backup(self.root)
+        self.assertEqual((first["stats"]["copied"], first["stats"]["reused"]), (2, 0))  # the same deed twice
+        self.assertEqual({entry["id"]: entry["hash"] for entry in first["files"]},
+                         {f.pk: f.file_hash for f in self.files})
+
+        self.upload(b"receipt")  # not hashed by the worker yet
+        second = backup.backup(self.root)
+        self.assertEqual((second["stats"]["copied"], second["stats"]["reused"]), (1, 3))
+        self.assertEqual(second["files"][-1]["hash"], hashlib.sha256(b"receipt").hexdigest())
+        self.assertEqual(backup.snapshots(self.root), [first["name"], second["name"]])
+        self.assertEqual(backup.verify(self.root), [])
+
+    def test_verify_finds_damaged_blobs(self):
+        backup.backup(self.root)
+        with open(backup.blob_path(self.root, self.files[2].file_hash), "wb") as blob:
+            blob.write(b"bit rot")
+        self.assertEqual(backup.verify(self.root), [(self.files[2].file_hash, "corrupt")])
+
+    def test_restore_files(self):
+        backup.backup(self.root)
+        for record_file in self.files:
+            default_storage.delete(record_file.uploaded_file.name)
+        self.assertEqual(backup.restore_files(self.root), 3)
+        with default_storage.open(self.files[2].uploaded_file.name) as restored:
+            self.assertEqual(restored.read(), b"invoice")
+        self.assertEqual(backup.restore_files(self.root), 0)  # already there
+
+
+@override_settings(DATABASE_ROUTERS=[], SERVE_MEDIA=True)
+class StorageTieringTests(TempMediaRecordTestCase):
+    def setUp(self):
+        super().setUp()
+        tiering._touched.clear()
+        self.content = b"%PDF-1.4 " + b"owner name, plot 12, invoice 4471 " * 500
+        self.file = self.upload(self.content, "deed.pdf", file_hash="x")
+        RecordFile.objects.filter(pk=self.file.pk).update(uploaded_at=timezone.now() - datetime.timedelta(days=90))
+        self.name = self.file.uploaded_file.name
+
+    def test_cold_files_are_compressed_and_read_transparently(self):
+        incompressible = self.upload(os.urandom(8192), "photo.jpg", file_hash="y")
+        RecordFile.objects.filter(pk=incompressible.pk).update(uploaded_at=self.file.uploaded_at - datetime.timedelta(days=90))
+
+        stats = tiering.tier(days=30)
+        self.assertEqual((stats["compressed"], stats["kept_plain"]), (1, 1))
+        self.assertTrue(default_storage.is_compressed(self.name))
+        self.assertFalse(default_storage.is_compressed(incompressible.uploaded_file.name))
+        self.assertEqual(default_storage.listdir("uploads")[1], sorted([self.name[8:], incompressible.uploaded_file.name[8:]]))
+        self.assertEqual(default_storage.size(self.name), len(self.content))
+        with default_storage.open(self.name) as stored:
+            self.assertEqual(stored.read(), self.content)
+        self.assertEqual(tiering.tier(days=30)["compressed"], 0)  # not tried again
+
+        response = self.client.get(f"/media/{self.name}")
+        self.assertEqual(response["Content-Length"], str(len(self.content)))
+        self.assertEqual(b"".join(response.streaming_content), self.content)  # the client ran the deferred touch
+        self.assertEqual(RecordFile.objects.get(pk=self.file.pk).last_accessed, timezone.localdate())
+
+        self.assertEqual(tiering.tier(days=30)["decompressed"], 1)  # read again: back to plain
+        self.assertFalse(default_storage.is_compressed(self.name))
+        self.assertEqual(RecordFile.objects.get(pk=self.file.pk).tiered_at, None)
+
+    @override_settings(SERVE_MEDIA=False)
+    def test_uploads_are_not_served_outside_debug_without_serve_media(self):
+        self.assertEqual(self.client.get(f"/media/{self.name}").status_code, 404)
+
+    def test_reads_are_written_once_a_day(self):
+        with CaptureQueriesContext(connection) as queries:
+            for _ in range(3):
+                tiering.touch(self.name)
+        self.assertEqual(len(queries), 1)
+        self.assertFalse({"last_accessed", "tiered_at"} & set(RecordFileSerializer(self.file).data))
+        self.assertEqual(self.client.get("/media/uploads/missing.pdf").status_code, 404)
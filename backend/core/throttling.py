@@ -0,0 +1,137 @@
+# backend/core/throttling.py
+"""
+Per-user token buckets for the endpoints that can tie up a worker.
+
+Each scope of THROTTLE_BUCKETS has one bucket per user (per IP for anonymous
+clients) holding up to ``capacity`` tokens, refilled at ``rate`` tokens per
+second. A request takes a token. With the bucket empty it is answered 429, with
+Retry-After set to the seconds until the next token. A user can burst
+``capacity`` requests, then gets ``rate`` per second. Scopes:
+
+- lookup: cheap single-record lookups (check_upin, record search);
+- report: full-table serializations (search-by-*, record lists);
+- upload: file uploads and record creation.
+
+Buckets are kept in the process by default, so each worker has its own. Set
+THROTTLE_CACHE_ALIAS to a cache shared by the workers (Redis) for one bucket
+per user across all of them. Updates of the shared buckets aren't atomic, so
+concurrent requests can take a few extra tokens.
+"""
+
+import math
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from rest_framework.throttling import BaseThrottle
+
+MAX_LOCAL_BUCKETS = 10_000
+
+
+class LocalBuckets:
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def take(self, key, capacity, rate, now):
+        with self._lock:
+            if len(self._buckets) >= MAX_LOCAL_BUCKETS:
+                self._prune(now)
+            tokens, wait = _refill(self._buckets.get(key), capacity, rate, now)
+            self._buckets[key] = (tokens, now, capacity / rate)
+            return wait
+
+    def _prune(self, now):
+        # A bucket left alone until it is full again is the same as no bucket
+        self._buckets = {key: state for key, state in self._buckets.items() if now - state[1] < state[2]}
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class CacheBuckets:
+    def __init__(self, alias):
+        self.cache = caches[alias]
+
+    def take(self, key, capacity, rate, now):
+        tokens, wait = _refill(self.cache.get(key), capacity, rate, now)
+        self.cache.set(key, (tokens, now), timeout=math.ceil(capacity / rate))
+        return wait
+
+    def clear(self):
+        pass
+
+
+def _refill(state, capacity, rate, now):
+    """(tokens left, seconds to wait): 0 seconds when a token was taken."""
+    tokens = capacity if state is None else min(capacity, state[0] + (now - state[1]) * rate)
+    if tokens >= 1:
+        return tokens - 1, 0
+    return tokens, (1 - tokens) / rate
+
+
+local_buckets = LocalBuckets()
+
+
+@receiver(setting_changed)
+def _reset_buckets(setting, **kwargs):
+    if setting == 'THROTTLE_BUCKETS':  # new capacities: start full (override_settings in tests)
+        local_buckets.clear()
+
+
+def _store():
+    alias = getattr(settings, 'THROTTLE_CACHE_ALIAS', None)
+    return CacheBuckets(alias) if alias else local_buckets
+
+
+def check(scope, ident):
+    """Take a token from ``ident``'s bucket of ``scope``: 0, or the seconds until one is available."""
+    bucket = settings.THROTTLE_BUCKETS.get(scope)
+    if not bucket:
+        return 0
+    capacity, rate = bucket
+    return _store().take(f"throttle:{scope}:{ident}", capacity, rate, time.time())
+
+
+async def acheck(scope, ident):
+    if getattr(settings, 'THROTTLE_CACHE_ALIAS', None):
+        return await sync_to_async(check)(scope, ident)
+    return check(scope, ident)  # in memory: nothing to wait for
+
+
+def client_ident(request, fallback):
+    user = getattr(request, 'user', None)
+    return f"user:{user.pk}" if user is not None and user.is_authenticated else f"ip:{fallback}"
+
+
+class TokenBucketThrottle(BaseThrottle):
+    scope = None
+    methods = None  # only these methods take tokens; all when None
+
+    def allow_request(self, request, view):
+        if self.methods is not None and request.method not in self.methods:
+            return True
+        self.wait_seconds = check(self.scope, client_ident(request, self.get_ident(request)))
+        return not self.wait_seconds
+
+    def wait(self):
+        return math.ceil(self.wait_seconds)  # Retry-After is whole seconds
+
+
+class LookupThrottle(TokenBucketThrottle):
+    scope = 'lookup'
+
+
+class ReportThrottle(TokenBucketThrottle):
+    scope = 'report'
+    methods = ('GET', 'HEAD')
+
+
+class UploadThrottle(TokenBucketThrottle):
+    scope = 'upload'
+    methods = ('POST', 'PUT', 'PATCH')
@@ -0,0 +1,115 @@
+# backend/core/tiering.py
+"""
+Moves uploaded files between the plain and the compressed tier of
+TieredStorage (core/storage.py).
+
+The media view calls ``touch()`` after serving a file. It stores the day in
+RecordFile.last_accessed with at most one UPDATE per file and day in each
+process (the days already written are remembered), after the response is
+sent. ``tier()``, run nightly by ``manage.py tier_files``:
+
+- compresses the files neither read nor uploaded in the last ``days`` days.
+  A file whose compressed copy would save less than MIN_SAVING (JPEGs and most
+  scanned PDFs are compressed already) stays plain. Either way tiered_at is set
+  so it isn't tried again;
+- stores plain again the compressed files that have been read since, so that
+  files in use are served without decompressing.
+"""
+
+import datetime
+import logging
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.storage import default_storage
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import RecordFile
+
+logger = logging.getLogger(__name__)
+
+COLD_AFTER_DAYS = 60
+MIN_SAVING = 0.1
+MIN_SIZE = 4096  # smaller files aren't worth it
+BATCH_SIZE = 500
+MAX_TOUCHED = 10_000
+
+_touched = {}  # name -> the day its last_accessed was written by this process
+
+
+def touch(name):
+    """Record that the file stored as ``name`` was read today."""
+    today = timezone.localdate()
+    if _touched.get(name) == today:
+        return
+    if len(_touched) >= MAX_TOUCHED:
+        _touched.clear()
+    RecordFile.objects.filter(uploaded_file=name).exclude(last_accessed=today).update(last_accessed=today)
+    _touched[name] = today
+
+
+def cold_files(days, now=None):
+    """The files not yet tiered that nobody has read or uploaded for ``days`` days."""
+    now = now or timezone.now()
+    cutoff = now - datetime.timedelta(days=days)
+    return RecordFile.objects.filter(
+        Q(last_accessed__lt=cutoff.date()) | Q(last_accessed__isnull=True, uploaded_at__lt=cutoff),
+        tiered_at__isnull=True,
+    )
+
+
+def warm_files(days, now=None):
+    """The tiered files read again in the last ``days`` days."""
+    now = now or timezone.now()
+    return RecordFile.objects.filter(tiered_at__isnull=False,
+                                     last_accessed__gte=(now - datetime.timedelta(days=days)).date())
+
+
+def _batches(queryset, batch_size):
+    last = 0
+    while True:
+        batch = list(queryset.filter(pk__gt=last).order_by("pk").values_list("pk", "uploaded_file")[:batch_size])
+        if not batch:
+            return
+        yield batch
+        last = batch[-1][0]
+
+
+def tier(days=COLD_AFTER_DAYS, storage=default_storage, min_saving=MIN_SAVING, batch_size=BATCH_SIZE,
+         dry_run=False):
+    """Compress the cold files and decompress the warm ones. Returns counts and bytes saved."""
+    if not hasattr(storage, "compress"):
+        raise ImproperlyConfigured("The default storage isn't a core.storage.TieredStorage")
+    stats = {"compressed": 0, "kept_plain": 0, "decompressed": 0, "missing": 0, "bytes_saved": 0}
+    now = timezone.now()
+    for batch in _batches(cold_files(days, now), batch_size):
+        done = []
+        for pk, name in batch:
+            try:
+                if storage.is_compressed(name) or storage.size(name) < MIN_SIZE:
+                    stats["kept_plain"] += 1
+                elif dry_run:
+                    stats["compressed"] += 1
+                    continue
+                else:
+                    before, after = storage.compress(name, min_saving=min_saving)
+                    if after is None:
+                        stats["kept_plain"] += 1
+                    else:
+                        stats["compressed"] += 1
+                        stats["bytes_saved"] += before - after
+            except FileNotFoundError:
+                stats["missing"] += 1
+                logger.warning("Cannot tier %s: the file is missing", name)
+            done.append(pk)
+        if not dry_run:
+            RecordFile.objects.filter(pk__in=done).update(tiered_at=now)
+    for batch in _batches(warm_files(days, now), batch_size):
+        for pk, name in batch:
+            if storage.is_compressed(name):
+                stats["decompressed"] += 1
+                if not dry_run:
+                    storage.decompress(name)
+        if not dry_run:
+            RecordFile.objects.filter(pk__in=[pk for pk, _ in batch]).update(tiered_at=None)
+    return stats
@@ -22,7 +22,10 @@ from .views import AuditLogListView
 
 from rest_framework.routers import DefaultRouter
 from .views import RecordViewSet, upload_record_files, dashboard_metrics
-from .views import RecordViewSet
+from .views import RecordViewSet, metrics, debt_analytics, activity_timeseries, vocabularies
+from .views import shelf_contents, next_location, record_history
+from .views import job_list, job_detail, job_retry, file_search, live_ticket
+from . import async_views
 
 # Initialize the router for viewsets
 router = DefaultRouter()
@@ -34,6 +37,7 @@ urlpatterns = [
     path('api/records/search/', RecordSearchView.as_view(), name='record-search'),  # GET search by UPIN or File Code
     path('api/records/upin/<str:upin>', RecordUpdateByUPIN.as_view(), name='record-update-by-upin'),  # PUT/DELETE individual record by UPIN
     path('api/records/<int:pk>', RecordDetailView.as_view(), name='record-detail'),  # PUT/DELETE individual record by ID
+    path('api/records/<int:pk>/history/', record_history, name='record-history'),  # Field-level change history
     path('api/records/search-by-service/', search_records_by_service, name='search-by-service'),  # Search by Service of Estate
     path('api/records/search-by-kebele/', search_records_by_kebele, name='search-by-kebele'),  # Search by Kebele
     path('api/records/search-by-proof/', search_records_by_proof, name='search-by-proof'),  # Search by Proof of Possession
@@ -48,6 +52,9 @@ urlpatterns = [
     path("api/files/<int:fileId>/replace/", ReplaceFileView.as_view(), name="replace_file"),
     path("api/files/<int:fileId>/delete/", DeleteFileView.as_view(), name="delete-file"),
 
+    # Full-text search of the uploaded PDFs
+    path("api/files/search/", file_search, name="file-search"),
+
     # File upload using upin
     path("api/files/<str:upin>/upload/", UploadFileView.as_view(), name="upload-file"),
 
@@ -58,9 +65,42 @@ urlpatterns = [
     path('api/audit-logs/', AuditLogListView.as_view(), name='audit-logs'),
 
     #grapg3 path
-    path("api/statistics/amount-paid", amount_paid_statistics, name='service-of-estate-stats'),  # Service of Estate Stats
+    path("api/statistics/amount-paid", amount_paid_statistics, name='amount-paid-stats'),  # Amount Paid Stats
    
     path('api/dashboard-metrics/', dashboard_metrics, name='dashboard-metrics'),
+
+    # Labels of the categorical record fields (dropdowns)
+    path('api/vocabularies/', vocabularies, name='vocabularies'),
+
+    # Archive shelves: contents in filing order, and the next free position
+    path('api/archive/shelves/', shelf_contents, name='shelf-contents'),
+    path('api/archive/next-location/', next_location, name='next-location'),
+
+    # Debt analytics, served from the DebtRollup table
+    path('api/analytics/debt/', debt_analytics, name='debt-analytics'),
+    # Activity time series, served from the DailyActivity table
+    path('api/analytics/activity/', activity_timeseries, name='activity-timeseries'),
+
+    # Background jobs (core/jobs.py)
+    path('api/jobs/', job_list, name='job-list'),
+    path('api/jobs/<int:pk>/', job_detail, name='job-detail'),
+    path('api/jobs/<int:pk>/retry/', job_retry, name='job-retry'),
+
+    # Async (ASGI) versions of the hot read endpoints
+    path('api/async/records/search/', async_views.record_search, name='async-record-search'),
+    path('api/async/records/search-by-service/', async_views.search_records_by_service, name='async-search-by-service'),
+    path('api/async/records/search-by-kebele/', async_views.search_records_by_kebele, name='async-search-by-kebele'),
+    path('api/async/records/search-by-proof/', async_views.search_records_by_proof, name='async-search-by-proof'),
+    path('api/async/records/search-by-possession/', async_views.search_records_by_possession, name='async-search-by-possession'),
+    path('api/async/statistics/proof-of-possession', async_views.proof_of_possession_stats, name='async-proof-of-possession-stats'),
+    path('api/async/statistics/service-of-estate', async_views.service_of_estate_stats, name='async-service-of-estate-stats'),
+    path('api/async/statistics/amount-paid', async_views.amount_paid_statistics, name='async-amount-paid-stats'),
+    path('api/async/dashboard-metrics/', async_views.dashboard_metrics, name='async-dashboard-metrics'),
+    path('api/async/live/dashboard/', async_views.live_dashboard, name='async-live-dashboard'),  # Server-Sent Events
+    path('api/live/ticket/', live_ticket, name='live-ticket'),  # authenticates the stream above
+
+    # Prometheus scrape endpoint
+    path('metrics', metrics, name='metrics'),
     ]
 
 # Add router URLs
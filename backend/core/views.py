@@ -1,22 +1,39 @@
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseForbidden
 from django.shortcuts import get_object_or_404
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import require_safe
 from django.contrib.auth import get_user_model
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.parsers import MultiPartParser, FormParser
-from rest_framework.decorators import api_view, parser_classes, permission_classes
+from rest_framework.decorators import api_view, parser_classes, permission_classes, renderer_classes, throttle_classes
+from django.db import transaction
 from django.db.models import Count
 from rest_framework.generics import ListAPIView
 from rest_framework import viewsets
 from rest_framework.permissions import IsAuthenticated, IsAdminUser # IMPORT THIS
 from rest_framework import generics, permissions
 
-from .models import Record, RecordFile, AuditLog
-from .serializers import RecordSerializer, RecordFileSerializer, AuditLogSerializer
-
+from .models import Record, RecordFile, AuditLog, DebtRollup, DailyActivity, RecordHistory, Job, LOCATION_FIELDS, LOCATION_MAX
+from .serializers import RecordSerializer, RecordFileSerializer, AuditLogSerializer, RecordHistorySerializer, JobSerializer, requested_fields
+from . import blobs, fulltext, live, rollups, tiering, vocab
+from .deferred import defer
+from .renderers import RECORD_LIST_RENDERERS
+from .throttling import LookupThrottle, ReportThrottle, UploadThrottle
+from .cache import cache_response
+from .routers import read_from_replica
+from .metrics import registry
+
+import logging
 import mimetypes
 import hashlib
 
+logger = logging.getLogger(__name__)
+
 from accounts.permissions import IsAdministrator, IsAdminOrEditor
 
 # Create or List Records
@@ -30,7 +47,7 @@ class RecordListCreateView(APIView):
         return Response(serializer.data)
 
     def post(self, request):
-        print("Incoming request data:", request.data)
+        logger.debug("Incoming request data: %s", request.data)
 
         files = request.FILES.getlist('files')
         # DO NOT .copy() request.data if it contains files!
@@ -61,7 +78,7 @@ class RecordListCreateView(APIView):
 
             return Response(RecordSerializer(record).data, status=status.HTTP_201_CREATED)
 
-        print("Validation errors:", serializer.errors)
+        logger.warning("Record validation failed: %s", serializer.errors)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 # Search by UPIN or File Code
@@ -102,7 +119,7 @@ class RecordDetailView(APIView):
 
             # Save new uploaded files if any
             for f in files:
-                print(f"Saving file: {f.name}")  # Debugging log
+                logger.debug("Saving file: %s", f.name)
                 RecordFile.objects.create(record=updated_record, uploaded_file=f)
 
             return Response(RecordSerializer(updated_record).data)
@@ -360,18 +377,41 @@ from .serializers import RecordSerializer, RecordFileSerializer, AuditLogSeriali
 import mimetypes
 import hashlib
 
+def _sparse_records(request, records):
+    """A many=True RecordSerializer honouring ?fields= and ?exclude=, in the output and in the SQL."""
+    options = requested_fields(request)
+    return RecordSerializer(RecordSerializer.narrow(records, **options), many=True, **options)
+
+
+class SparseRecordFieldsMixin:
+    """?fields= and ?exclude= for the GET requests of a generic view serializing records."""
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request.method == 'GET':
+            queryset = RecordSerializer.narrow(queryset, **requested_fields(self.request))
+        return queryset
+
+    def get_serializer(self, *args, **kwargs):
+        if self.request.method == 'GET':
+            kwargs.update(requested_fields(self.request))
+        return super().get_serializer(*args, **kwargs)
+
+
 # Create or List Records
 class RecordListCreateView(APIView):
     parser_classes = [MultiPartParser, FormParser]
+    renderer_classes = RECORD_LIST_RENDERERS  # + columnar JSON, MessagePack
     permission_classes = [IsAuthenticated] # ADDED: Requires authentication
+    throttle_classes = [ReportThrottle, UploadThrottle]  # GET lists every record; POST takes files
 
     def get(self, request):
-        records = Record.objects.all().order_by('-id')
-        serializer = RecordSerializer(records, many=True)
+        records = Record.objects.prefetch_related('files').order_by('-id')
+        serializer = _sparse_records(request, records)
         return Response(serializer.data)
 
     def post(self, request):
-        print("Incoming request data:", request.data)
+        logger.debug("Incoming request data: %s", request.data)
 
         files = request.FILES.getlist('files')
         # DO NOT .copy() request.data if it contains files!
@@ -405,13 +445,16 @@ class RecordListCreateView(APIView):
 
             return Response(RecordSerializer(record).data, status=status.HTTP_201_CREATED)
 
-        print("Validation errors:", serializer.errors)
+        logger.warning("Record validation failed: %s", serializer.errors)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 # Search by UPIN or File Code
 class RecordSearchView(APIView):
+    renderer_classes = RECORD_LIST_RENDERERS  # + columnar JSON, MessagePack
     permission_classes = [IsAuthenticated] # ADDED: Requires authentication
+    throttle_classes = [LookupThrottle]
 
+    @method_decorator(cache_response(Record, RecordFile))
     def get(self, request):
         upin = request.query_params.get('UPIN')
         file_code = request.query_params.get('ExistingArchiveCode')
@@ -422,10 +465,16 @@ class RecordSearchView(APIView):
             records = Record.objects.filter(ExistingArchiveCode=file_code)
         else:
             return Response({'error': 'No search parameter provided'}, status=status.HTTP_400_BAD_REQUEST)
+        records = records.prefetch_related('files')
 
-        serializer = RecordSerializer(records, many=True)
+        serializer = _sparse_records(request, records)
         return Response(serializer.data)
 
+def _changed(serializer):
+    """The changed fields of a saved RecordSerializer, for the audit log."""
+    return ', '.join(getattr(serializer, 'changed_fields', [])) or 'no changes'
+
+
 # Edit or Delete a record by PK
 class RecordDetailView(APIView):
     parser_classes = [MultiPartParser, FormParser]
@@ -444,11 +493,11 @@ class RecordDetailView(APIView):
         if serializer.is_valid():
             updated_record = serializer.save()
             # LOG THE ACTION HERE:
-            log_audit(request, "UPDATE", f"Updated record with ID {pk}")
+            log_audit(request, "UPDATE", f"Updated record with ID {pk}: {_changed(serializer)}")
 
             # Save new uploaded files if any
             for f in files:
-                print(f"Saving file: {f.name}")  # Debugging log
+                logger.debug("Saving file: %s", f.name)
                 RecordFile.objects.create(record=updated_record, uploaded_file=f)
 
             return Response(RecordSerializer(updated_record).data)
@@ -469,16 +518,21 @@ class RecordUpdateByUPIN(APIView):
 
     def put(self, request, upin):
         record = get_object_or_404(Record, UPIN=upin)
-        serializer = RecordSerializer(record, data=request.data, partial=True)
+        serializer = RecordSerializer(record, data=request.data, partial=True, context={'request': request})
         if serializer.is_valid():
             serializer.save()
+            log_audit(request, "UPDATE", f"Updated record with UPIN {upin}: {_changed(serializer)}")
             return Response(serializer.data, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
 # Search by Service of Estate
+@read_from_replica
 @api_view(['GET'])
+@renderer_classes(RECORD_LIST_RENDERERS)
+@throttle_classes([ReportThrottle])
 @parser_classes([MultiPartParser, FormParser]) # Added parser_classes for consistency, though not strictly needed for GET
+@cache_response(Record, RecordFile)
 def search_records_by_service(request):
     # For function-based views, permissions are applied via decorator
     if not request.user.is_authenticated: # Manual check for function-based view
@@ -486,62 +540,80 @@ def search_records_by_service(request):
 
     service = request.GET.get('ServiceOfEstate')
     if service:
-        records = Record.objects.filter(ServiceOfEstate=service)
-        serializer = RecordSerializer(records, many=True)
+        records = vocab.filter_by_label(Record.objects, 'ServiceOfEstate', service).prefetch_related('files')
+        serializer = _sparse_records(request, records)
         return Response(serializer.data, status=200)
     return Response({'error': 'ServiceOfEstate parameter is required'}, status=400)
 
 # Search by Kebele
+@read_from_replica
 @api_view(['GET'])
+@renderer_classes(RECORD_LIST_RENDERERS)
+@throttle_classes([ReportThrottle])
 @parser_classes([MultiPartParser, FormParser])
+@cache_response(Record, RecordFile)
 def search_records_by_kebele(request):
     if not request.user.is_authenticated:
         return Response({"detail": "Authentication credentials were not provided."}, status=status.HTTP_401_UNAUTHORIZED)
     
     kebele = request.GET.get('kebele')
     if kebele:
-       records = Record.objects.filter(kebele=kebele) 
-       serializer = RecordSerializer(records, many=True)
+       records = vocab.filter_by_label(Record.objects, 'kebele', kebele).prefetch_related('files')
+       serializer = _sparse_records(request, records)
        return Response(serializer.data, status=200)
     return Response({'error': 'kebele parameter is required'}, status=400)
 
 # Search by Proof of Possession
+@read_from_replica
 @api_view(['GET'])
+@renderer_classes(RECORD_LIST_RENDERERS)
+@throttle_classes([ReportThrottle])
 @parser_classes([MultiPartParser, FormParser])
+@cache_response(Record, RecordFile)
 def search_records_by_proof(request):
     if not request.user.is_authenticated:
         return Response({"detail": "Authentication credentials were not provided."}, status=status.HTTP_401_UNAUTHORIZED)
     
     proof = request.GET.get('proofOfPossession')
     if proof:
-      records = Record.objects.filter(proofOfPossession=proof) 
-      serializer = RecordSerializer(records, many=True)
+      records = vocab.filter_by_label(Record.objects, 'proofOfPossession', proof).prefetch_related('files')
+      serializer = _sparse_records(request, records)
       return Response(serializer.data, status=200)
     return Response({'error': 'proofOfPossession parameter is required'}, status=400)
 
 # Search by Possession Status
+@read_from_replica
 @api_view(['GET'])
+@renderer_classes(RECORD_LIST_RENDERERS)
+@throttle_classes([ReportThrottle])
 @parser_classes([MultiPartParser, FormParser])
+@cache_response(Record, RecordFile)
 def search_records_by_possession(request):
     if not request.user.is_authenticated:
         return Response({"detail": "Authentication credentials were not provided."}, status=status.HTTP_401_UNAUTHORIZED)
     
     possession = request.GET.get('possessionStatus')
     if possession:
-      records = Record.objects.filter(possessionStatus=possession) 
-      serializer = RecordSerializer(records, many=True)
+      records = vocab.filter_by_label(Record.objects, 'possessionStatus', possession).prefetch_related('files')
+      serializer = _sparse_records(request, records)
       return Response(serializer.data, status=200)
     return Response({'error': 'possessionStatus parameter is required'}, status=400)
 
-class RecentRecordsView(ListAPIView):
+@read_from_replica
+@method_decorator(cache_response(Record, RecordFile), name='get')
+class RecentRecordsView(SparseRecordFieldsMixin, ListAPIView):
+    renderer_classes = RECORD_LIST_RENDERERS  # + columnar JSON, MessagePack
     serializer_class = RecordSerializer
     permission_classes = [IsAuthenticated] # ADDED: Requires authentication
 
     def get_queryset(self):
-        return Record.objects.all().order_by('-created_at')[:4]
+        return Record.objects.prefetch_related('files').order_by('-created_at')[:4]
 
+@read_from_replica
 class ProofOfPossessionStats(APIView):
     permission_classes = [IsAuthenticated] # ADDED: Requires authentication
+
+    @method_decorator(cache_response(Record))
     def get(self, request):
         stats = (
             Record.objects
@@ -549,10 +621,13 @@ class ProofOfPossessionStats(APIView):
             .annotate(count=Count("proofOfPossession"))
             .order_by("-count")
         )
-        return Response(stats)
+        return Response(vocab.with_labels(stats, "proofOfPossession"))
 
+@read_from_replica
 class ServiceOfEstateStats(APIView):
     permission_classes = [IsAuthenticated] # ADDED: Requires authentication
+
+    @method_decorator(cache_response(Record))
     def get(self, request):
         stats = (
             Record.objects
@@ -560,9 +635,10 @@ class ServiceOfEstateStats(APIView):
             .annotate(count=Count("ServiceOfEstate"))
             .order_by("-count")
         )
-        return Response(stats)
+        return Response(vocab.with_labels(stats, "ServiceOfEstate"))
 
 @api_view(['GET'])
+@throttle_classes([LookupThrottle])
 @parser_classes([MultiPartParser, FormParser])
 def check_upin(request, upin):
     if not request.user.is_authenticated:
@@ -574,6 +650,7 @@ def check_upin(request, upin):
 # Handles uploading files after a record is created (via UPIN) AND listing files for a record
 @api_view(['GET', 'PUT'])
 @parser_classes([MultiPartParser, FormParser])
+@cache_response(Record, RecordFile)
 def upload_record_files(request, upin):
     if request.method == 'GET':
         record = get_object_or_404(Record, UPIN=upin)
@@ -584,21 +661,27 @@ def upload_record_files(request, upin):
 
     return Response({'error': 'Method not allowed'}, status=405)
 
-class RecordViewSet(viewsets.ModelViewSet):
-    queryset = Record.objects.all()
+class RecordViewSet(SparseRecordFieldsMixin, viewsets.ModelViewSet):
+    renderer_classes = RECORD_LIST_RENDERERS  # + columnar JSON, MessagePack
+    queryset = Record.objects.prefetch_related('files')
     serializer_class = RecordSerializer
     permission_classes = [IsAuthenticated] # ADDED: Requires authentication
 
+    def get_throttles(self):
+        # Only the list serializes every record
+        return [ReportThrottle()] if self.action == 'list' else []
+
     def list(self, request, *args, **kwargs):
         upin = request.query_params.get('upin')
         if upin:
-            records = Record.objects.filter(UPIN=upin)
+            records = self.get_queryset().filter(UPIN=upin)
             serializer = self.get_serializer(records, many=True)
             return Response(serializer.data)
         return super().list(request, *args, **kwargs)
 
 
 @api_view(['GET', 'PUT'])
+@throttle_classes([UploadThrottle])
 @parser_classes([MultiPartParser, FormParser])
 def upload_files(request, upin):
     """
@@ -631,27 +714,14 @@ def upload_files(request, upin):
             category = categories[idx] if idx < len(categories) else "Uncategorized"
             content_type = file.content_type or mimetypes.guess_type(file.name)[0] or "Unknown"
 
-            # Generate hash for the file content
-            hasher = hashlib.sha256()
-            for chunk in file.chunks():
-                hasher.update(chunk)
-            file_hash = hasher.hexdigest()
-
-            # Prevent duplicate files
-            if not RecordFile.objects.filter(
-                file_hash=file_hash, record=record,
+            # Hashed by a background job (core/tasks.py), which also drops duplicate uploads
+            RecordFile.objects.create(
+                record=record,
+                uploaded_file=file,
                 display_name=display_name,
-                uploaded_file__name=file.name,
                 category=category,
                 type=content_type
-            ).exists():
-                RecordFile.objects.create(
-                    record=record,
-                    uploaded_file=file,
-                    display_name=display_name,
-                    category=category,
-                    type=content_type
-                )
+            )
 
         return Response({'status': 'files uploaded successfully'}, status=status.HTTP_200_OK)
 
@@ -662,12 +732,18 @@ def upload_files(request, upin):
 #######
 class ReplaceFileView(APIView):
     permission_classes = [IsAuthenticated]
+    throttle_classes = [UploadThrottle]
     def put(self, request, fileId):
         file_obj = get_object_or_404(RecordFile, id=fileId)
         uploaded_file = request.FILES.get('uploaded_file')
         if uploaded_file:
+            old_path = file_obj.uploaded_file.name
             file_obj.uploaded_file = uploaded_file
-            file_obj.save()
+            file_obj.file_hash = None  # rehashed by a background job
+            file_obj.tiered_at = None  # stored plain
+            with transaction.atomic(savepoint=False):
+                file_obj.save()
+                blobs.queue_deletion([old_path])  # removed by process_blob_deletions
             return Response({'message': 'File replaced successfully.'}, status=200)
         return Response({'error': 'No file provided.'}, status=400)
 
@@ -685,6 +761,7 @@ class DeleteFileView(APIView):
 
 class UploadFileView(APIView):
     permission_classes = [IsAuthenticated] # ADDED: Requires authentication
+    throttle_classes = [UploadThrottle]
     def post(self, request, upin):
         record = get_object_or_404(Record, UPIN=upin)
         uploaded_file = request.FILES.get("uploaded_file")
@@ -710,13 +787,14 @@ class RecordUpdateView(APIView):
         if not record:
             return Response({"error": "Record not found."}, status=status.HTTP_404_NOT_FOUND)
 
-        serializer = RecordSerializer(record, data=request.data, partial=True)
+        serializer = RecordSerializer(record, data=request.data, partial=True, context={'request': request})
         if serializer.is_valid():
             serializer.save()
             # Get the user's role
-            role = request.user.groups.first().name if request.user.is_authenticated and request.user.groups.exists() else "User"
+            group = request.user.groups.first()
+            role = group.name if group else "User"
             # Log the update action with the role
-            log_audit(request, "UPDATE", f"Updated record with UPIN {upin}", role=role)
+            log_audit(request, "UPDATE", f"Updated record with UPIN {upin}: {_changed(serializer)}", role=role)
             return Response(serializer.data, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -763,21 +841,11 @@ def log_logout(request, username):
 
     log_audit(request, "LOGOUT", f"User {username} logged out.", username=username, role=role)
 
-class RecordUpdateView(APIView):
-    permission_classes = [IsAuthenticated] # ADDED: Requires authentication
-    def put(self, request, upin):
-        record = Record.objects.filter(UPIN=upin).first()
-        if not record:
-            return Response({"error": "Record not found."}, status=status.HTTP_404_NOT_FOUND)
-
-        serializer = RecordSerializer(record, data=request.data, partial=True)
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data, status=status.HTTP_200_OK)
-
  #graph 3
 
+@read_from_replica
 @api_view(['GET'])
+@cache_response(Record)
 def amount_paid_statistics(request):
     first_paid = Record.objects.filter(FirstAmount__gt=0).count()
     second_paid = Record.objects.filter(SecondAmount__gt=0).count()
@@ -818,11 +886,13 @@ class UserListView(APIView):
         return Response(data)
 
 
-from datetime import timedelta
+from datetime import date, timedelta
 from django.utils import timezone
 
+@read_from_replica
 @api_view(['GET'])
 @permission_classes([IsAdministrator])
+@cache_response(Record, RecordFile, AuditLog, get_user_model())
 def dashboard_metrics(request):
     total_records = Record.objects.count()
     User = get_user_model()
@@ -849,4 +919,270 @@ def dashboard_metrics(request):
         "reportsGenerated": reports_generated,
         "filesUploaded": files_uploaded,
         "recentActiveUsers": recent_users,
-    })
\ No newline at end of file
+    })
+
+def metrics(request):
+    """
+    Prometheus scrape endpoint. Plain Django view: no authentication, restricted
+    to METRICS_ALLOWED_IPS (loopback by default).
+    """
+    allowed = settings.METRICS_ALLOWED_IPS
+    if allowed and request.META.get('REMOTE_ADDR') not in allowed:
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+@read_from_replica
+@api_view(['GET'])
+@permission_classes([IsAdminOrEditor])
+@cache_response(DebtRollup)
+def debt_analytics(request):
+    """
+    Outstanding debt totals, counts and approximate percentiles, grouped by
+    ?group_by=kebele|ServiceOfEstate|placeLevel and narrowed down with those
+    same fields as filters (drill-down). Served from the DebtRollup table.
+    """
+    group_by = request.query_params.get('group_by', 'kebele')
+    if group_by not in rollups.GROUP_FIELDS:
+        return Response(
+            {'error': f"group_by must be one of {', '.join(rollups.GROUP_FIELDS)}"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    filters = {name: request.query_params[name] for name in rollups.GROUP_FIELDS if name in request.query_params}
+    rows = DebtRollup.objects.all()
+    for name, label in filters.items():
+        rows = vocab.filter_by_label(rows, name, label)
+    summary = rollups.summarize(rows, group_by)
+    summary['filters'] = filters
+    return Response(summary)
+
+
+ACTIVITY_DEFAULT_SPAN = {'day': timedelta(days=30), 'week': timedelta(weeks=12), 'month': timedelta(days=365)}
+
+
+@read_from_replica
+@api_view(['GET'])
+@permission_classes([IsAdminOrEditor])
+@cache_response(DailyActivity)
+def activity_timeseries(request):
+    """
+    Records created, files uploaded, logins and distinct active users per
+    ?bucket=day|week|month between ?start= and ?end= (YYYY-MM-DD, inclusive).
+    Served from the DailyActivity table only.
+    """
+    bucket = request.query_params.get('bucket', 'day')
+    if bucket not in rollups.BUCKETS:
+        return Response({'error': f"bucket must be one of {', '.join(rollups.BUCKETS)}"},
+                        status=status.HTTP_400_BAD_REQUEST)
+    try:
+        end = date.fromisoformat(request.query_params['end']) if 'end' in request.query_params else timezone.localdate()
+        start = (date.fromisoformat(request.query_params['start']) if 'start' in request.query_params
+                 else rollups.bucket_start(end - ACTIVITY_DEFAULT_SPAN[bucket], bucket))
+    except ValueError:
+        return Response({'error': 'start and end must be dates (YYYY-MM-DD)'}, status=status.HTTP_400_BAD_REQUEST)
+    return Response({
+        'bucket': bucket,
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'series': rollups.activity_series(start, end, bucket),
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def vocabularies(request):
+    """Labels of the categorical record fields, for the form dropdowns. Served from memory."""
+    return Response({field: vocabulary.labels() for field, vocabulary in vocab.VOCABULARIES.items()})
+
+
+SHELF_LISTING_LIMIT = 500
+SHELF_LISTING_COLUMNS = ('id', 'UPIN', 'PropertyOwnerName', 'ExistingArchiveCode',
+                         'Row', 'ShelfNumber', 'FolderNumber', 'sortingNumber', 'NumberOfPages')
+
+
+def _location_range(value):
+    """"3" -> (3, 3), "3-5" -> (3, 5)."""
+    low, _, high = value.partition('-')
+    low, high = int(low), int(high or low)
+    if low > high or high > LOCATION_MAX:
+        raise ValueError(value)
+    return low, high
+
+
+@read_from_replica
+@api_view(['GET'])
+@renderer_classes(RECORD_LIST_RENDERERS)
+@permission_classes([IsAuthenticated])
+@cache_response(Record)
+def shelf_contents(request):
+    """
+    Records filed in ?row=N (or a range of rows, ?row=N-M), optionally narrowed to
+    ?shelf=N or N-M, in archive order: row, shelf, folder, sorting number. At most
+    ?limit= records (capped at SHELF_LISTING_LIMIT); served from record_location_idx.
+    """
+    try:
+        rows = _location_range(request.query_params['row'])
+        shelves = _location_range(request.query_params['shelf']) if 'shelf' in request.query_params else None
+        limit = min(int(request.query_params.get('limit', SHELF_LISTING_LIMIT)), SHELF_LISTING_LIMIT)
+        if limit < 1:
+            raise ValueError(limit)
+    except (KeyError, ValueError):
+        return Response({'error': 'row is required; row and shelf take a number or a range such as 3-5; '
+                                  'limit must be a positive number'},
+                        status=status.HTTP_400_BAD_REQUEST)
+    records = Record.objects.filter(location_row__range=rows)
+    if shelves:
+        records = records.filter(location_shelf__range=shelves)
+    records = list(records.order_by(*LOCATION_FIELDS.values()).values(*SHELF_LISTING_COLUMNS)[:limit + 1])
+    return Response({
+        'row': request.query_params['row'],
+        'shelf': request.query_params.get('shelf'),
+        'truncated': len(records) > limit,
+        'records': records[:limit],
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminOrEditor])
+def next_location(request):
+    """
+    Where the next folder goes: the position after the last one in
+    ?row=&shelf=&folder=, or without ?folder=, the first position of the folder
+    after the shelf's last one. A single seek on record_location_idx, read from
+    the primary since the answer is about to be written.
+    """
+    try:
+        location = {'row': int(request.query_params['row']), 'shelf': int(request.query_params['shelf'])}
+        if 'folder' in request.query_params:
+            location['folder'] = int(request.query_params['folder'])
+    except (KeyError, ValueError):
+        return Response({'error': 'row and shelf (and optionally folder) must be numbers'},
+                        status=status.HTTP_400_BAD_REQUEST)
+    records = Record.objects.filter(**{f'location_{name}': value for name, value in location.items()})
+    if 'folder' in location:
+        last = (records.filter(location_position__isnull=False).order_by('-location_position')
+                .values_list('location_position', flat=True).first())
+        return Response({**location, 'position': (last or 0) + 1})
+    last = (records.filter(location_folder__isnull=False).order_by('-location_folder')
+            .values_list('location_folder', flat=True).first())
+    return Response({**location, 'folder': (last or 0) + 1, 'position': 1})
+
+
+RECORD_HISTORY_LIMIT = 500
+
+
+@read_from_replica
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def record_history(request, pk):
+    """
+    The timeline of a record, newest first: one entry per edit with only the
+    fields that changed. A single range scan of recordhistory_record_time_idx.
+    """
+    entries = RecordHistory.objects.filter(record_id=pk).order_by('-changed_at')[:RECORD_HISTORY_LIMIT]
+    return Response(RecordHistorySerializer(entries, many=True).data)
+
+
+@read_from_replica
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@throttle_classes([ReportThrottle])
+def file_search(request):
+    """
+    Uploaded PDFs whose text matches ?q= (web-search syntax: "a phrase", or,
+    -word), best first, each with its record and a snippet of the matching text.
+    At most ?limit= files (capped at fulltext.SEARCH_LIMIT).
+    """
+    query = request.query_params.get('q', '').strip()
+    try:
+        limit = min(int(request.query_params.get('limit', fulltext.SEARCH_LIMIT)), fulltext.SEARCH_LIMIT)
+    except ValueError:
+        limit = 0
+    if not query or limit < 1:
+        return Response({'error': 'q is required; limit must be a positive number'},
+                        status=status.HTTP_400_BAD_REQUEST)
+    results = []
+    for text in fulltext.search(query, limit):
+        record_file, record = text.file, text.file.record
+        results.append({
+            'file': {
+                'id': record_file.pk,
+                'display_name': record_file.display_name,
+                'category': record_file.category,
+                'uploaded_file': record_file.uploaded_file.url,
+                'pages': text.pages,
+            },
+            'record': {'id': record.pk, 'UPIN': record.UPIN, 'PropertyOwnerName': record.PropertyOwnerName},
+            'rank': round(text.rank, 4),
+            'snippet': text.snippet,
+        })
+    return Response({'query': query, 'results': results})
+
+
+JOB_LIST_LIMIT = 100
+
+
+@api_view(['GET'])
+@permission_classes([IsAdministrator])
+def job_list(request):
+    """The latest background jobs, optionally of one ?status= (queued, running, done, failed)."""
+    jobs = Job.objects.order_by('-pk')
+    if 'status' in request.query_params:
+        jobs = jobs.filter(status=request.query_params['status'])
+    return Response(JobSerializer(jobs[:JOB_LIST_LIMIT], many=True).data)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def job_detail(request, pk):
+    """The status of a job: visible to administrators and to the user who queued it."""
+    job = get_object_or_404(Job, pk=pk)
+    if job.created_by != request.user.username and not IsAdministrator().has_permission(request, None):
+        return Response({'detail': 'Not found.'}, status=status.HTTP_404_NOT_FOUND)
+    return Response(JobSerializer(job).data)
+
+
+@api_view(['POST'])
+@permission_classes([IsAdministrator])
+def job_retry(request, pk):
+    """Queue a failed job again, with a fresh set of attempts."""
+    updated = (Job.objects.filter(pk=pk, status=Job.FAILED)
+               .update(status=Job.QUEUED, run_at=timezone.now(), attempts=0, worker=''))
+    if not updated:
+        get_object_or_404(Job, pk=pk)
+        return Response({'error': 'Only failed jobs can be retried.'}, status=status.HTTP_409_CONFLICT)
+    return Response(JobSerializer(Job.objects.get(pk=pk)).data)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def live_ticket(request):
+    """
+    A single-use ticket opening a live stream (async_views.live_dashboard) as
+    ?ticket=, for EventSource clients, which can't send the JWT in a header.
+    The stream ends when the access token used here expires.
+    """
+    expires_at = request.auth['exp'] if request.auth is not None else None
+    return Response({'ticket': live.issue_ticket(request.user, expires_at),
+                     'expires_in': settings.LIVE_TICKET_SECONDS})
+
+
+@require_safe
+def media_file(request, name):
+    """
+    An uploaded file (MEDIA_URL), streamed and decompressed on the fly when it
+    is kept in the compressed tier. The read is recorded for the tiering
+    (core/tiering.py) after the response is sent. Unauthenticated: outside
+    DEBUG it answers only with SERVE_MEDIA set (see settings.py).
+    """
+    if not (settings.DEBUG or settings.SERVE_MEDIA):
+        raise Http404(name)
+    try:
+        file = default_storage.open(name)
+    except (FileNotFoundError, IsADirectoryError, SuspiciousFileOperation):
+        raise Http404(name)
+    response = FileResponse(file, content_type=mimetypes.guess_type(name)[0] or 'application/octet-stream')
+    if not response.has_header('Content-Length'):
+        response['Content-Length'] = file.size  # a decompressing stream can't seek to its end
+    defer(request, tiering.touch, name)
+    return response
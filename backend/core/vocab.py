@@ -0,0 +1,139 @@
+# backend/core/vocab.py
+"""
+In-process cache of the lookup tables behind Record's categorical columns.
+
+Records store small-integer keys; the API still speaks labels. Each process loads
+a vocabulary once and answers label <-> key questions from memory, reloading the
+table only on a miss (a label added by another process) and creating unknown
+labels on write, as the free-text columns used to accept anything. A label
+created in a transaction is cached only once that commits, so a rollback can't
+leave the cache pointing at a row that doesn't exist.
+"""
+
+import threading
+
+from django.db import transaction
+
+from .models import DebtRestrictionType, EstateService, Kebele, PlaceLevel, PossessionProof, PossessionStatus
+
+
+class Vocabulary:
+    def __init__(self, model):
+        self.model = model
+        self._labels = None  # pk -> label
+        self._keys = None    # label -> pk
+        self._pending = set()  # pks created by transactions not committed yet
+        self._lock = threading.Lock()
+
+    def _load(self):
+        rows = [row for row in self.model.objects.values_list("pk", "name") if row[0] not in self._pending]
+        labels, keys = dict(rows), {name: pk for pk, name in rows}
+        with self._lock:
+            self._labels, self._keys = labels, keys
+        return labels, keys
+
+    def clear(self):
+        with self._lock:
+            self._labels = self._keys = None
+
+    def reset(self):
+        """Forget the cache and the uncommitted labels (their transaction is over)."""
+        with self._lock:
+            self._labels = self._keys = None
+            self._pending.clear()
+
+    def label(self, pk):
+        if pk is None:
+            return None
+        if pk in self._pending:  # seen by its own transaction only: not cached
+            return self.model.objects.filter(pk=pk).values_list("name", flat=True).first()
+        labels = self._labels
+        if labels is None or pk not in labels:
+            labels, _ = self._load()
+        return labels.get(pk)
+
+    def key(self, label, create=False):
+        """The key of ``label``; None if unknown, unless ``create``."""
+        keys = self._keys
+        if keys is None or label not in keys:
+            _, keys = self._load()
+        pk = keys.get(label)
+        if pk is None and self._pending:  # maybe created by this very transaction
+            pk = self.model.objects.filter(name=label).values_list("pk", flat=True).first()
+        if pk is None and create:
+            entry, created = self.model.objects.get_or_create(name=label)
+            pk = entry.pk
+            if created:
+                with self._lock:
+                    self._pending.add(pk)
+                transaction.on_commit(lambda: self._committed(pk))
+        return pk
+
+    def _committed(self, pk):
+        with self._lock:
+            self._pending.discard(pk)
+            self._labels = self._keys = None  # reloaded with the new label on the next miss
+
+    def labels(self):
+        keys = self._keys
+        if keys is None:
+            _, keys = self._load()
+        return sorted(keys)
+
+    def warm(self, pks):
+        """Load once if any of ``pks`` is unknown (call before serializing in async code)."""
+        labels = self._labels
+        if labels is None or not set(pks) <= labels.keys():
+            self._load()
+
+
+# Record field -> vocabulary of its lookup table
+VOCABULARIES = {
+    "kebele": Vocabulary(Kebele),
+    "ServiceOfEstate": Vocabulary(EstateService),
+    "placeLevel": Vocabulary(PlaceLevel),
+    "possessionStatus": Vocabulary(PossessionStatus),
+    "proofOfPossession": Vocabulary(PossessionProof),
+    "DebtRestriction": Vocabulary(DebtRestrictionType),
+}
+
+
+def vocabulary(field):
+    return VOCABULARIES[field]
+
+
+def filter_by_label(queryset, field, label):
+    """``queryset`` narrowed to the rows whose lookup ``field`` has ``label``."""
+    pk = VOCABULARIES[field].key(label)
+    return queryset.filter(**{f"{field}_id": pk}) if pk is not None else queryset.none()
+
+
+def with_labels(rows, field):
+    """Replace the lookup keys under ``field`` in ``rows`` (dicts from .values()) by their labels."""
+    rows = list(rows)
+    vocab = VOCABULARIES[field]
+    vocab.warm({row[field] for row in rows})
+    return [{**row, field: vocab.label(row[field])} for row in rows]
+
+
+def warm_records(records, fields=None):
+    """
+    Make sure every label of ``records`` is cached, with at most one query per
+    vocabulary. ``fields`` limits this to the given lookup fields (the others may be deferred).
+    """
+    for field, vocab in VOCABULARIES.items():
+        if fields is None or field in fields:
+            vocab.warm({getattr(record, f"{field}_id") for record in records})
+
+
+def clear():
+    """Forget every cached vocabulary (after restoring a database, between test classes)."""
+    for vocab in VOCABULARIES.values():
+        vocab.reset()
+
+
+def reload():
+    """Forget, then load every vocabulary, uncommitted labels included."""
+    clear()
+    for vocab in VOCABULARIES.values():
+        vocab.labels()
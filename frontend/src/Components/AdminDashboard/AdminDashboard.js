@@ -67,6 +67,43 @@ const AdminDashboard = () => {
         setError(err.message);
         setLoading(false);
       });
+
+    // Live updates: the server pushes only the figures that changed. EventSource
+    // can't send the token, so each connection opens with a single-use ticket.
+    let source = null;
+    let closed = false;
+    const merge = (event) => {
+      const update = JSON.parse(event.data).dashboard;
+      if (update) {
+        setData((current) => ({ ...current, ...update }));
+      }
+    };
+    const connect = () =>
+      axiosInstance
+        .post("http://localhost:8000/api/live/ticket/")
+        .then((response) => {
+          if (closed) {
+            return;
+          }
+          source = new EventSource(
+            `http://localhost:8000/api/async/live/dashboard/?ticket=${encodeURIComponent(response.data.ticket)}`
+          );
+          source.addEventListener("snapshot", merge);
+          source.addEventListener("delta", merge);
+          // The token ran out: reconnect with a new ticket (axiosInstance refreshes the token)
+          source.addEventListener("expired", () => {
+            source.close();
+            connect();
+          });
+        })
+        .catch(() => {}); // no live updates; the figures loaded above stay
+    connect();
+    return () => {
+      closed = true;
+      if (source) {
+        source.close();
+      }
+    };
   }, []);
 
   // ...existing code...
@@ -96,10 +96,15 @@ const UserManagement = () => {
   const [actionLoading, setActionLoading] = useState(false);
   const [fieldErrors, setFieldErrors] = useState({});
   const [userToDelete, setUserToDelete] = useState(null);
+  const [search, setSearch] = useState("");
+  const [nextPage, setNextPage] = useState(null);
 
   useEffect(() => {
-    fetchUsersAndGroups();
-  }, []);
+    // Wait for a pause in typing before searching
+    const timer = setTimeout(fetchUsersAndGroups, search ? 300 : 0);
+    return () => clearTimeout(timer);
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [search]);
 
   useEffect(() => {
     if (message || error) {
@@ -115,19 +120,34 @@ const UserManagement = () => {
     setLoading(true);
     setError("");
     try {
-      const usersData = await authService.getUsers();
+      const usersPage = await authService.getUsers({ search: search.trim() });
       const groupsData = await authService.getGroups();
-      setUsers(usersData);
+      setUsers(usersPage.results);
+      setNextPage(usersPage.next);
       setGroups(groupsData);
     } catch (err) {
       setError(err.message || "Failed to fetch data.");
       setUsers([]);
+      setNextPage(null);
       setGroups([]);
     } finally {
       setLoading(false);
     }
   };
 
+  const loadMoreUsers = async () => {
+    setActionLoading(true);
+    try {
+      const usersPage = await authService.getUsers({ url: nextPage });
+      setUsers((loaded) => [...loaded, ...usersPage.results]);
+      setNextPage(usersPage.next);
+    } catch (err) {
+      setError(err.message || "Failed to fetch users.");
+    } finally {
+      setActionLoading(false);
+    }
+  };
+
   // --- Add User Modal Logic ---
   const openAddUserModal = () => {
     setNewUser({ ...emptyUser }); // Always empty!
@@ -494,6 +514,14 @@ const UserManagement = () => {
             + Add New User
           </button>
         </div>
+        <input
+          type="search"
+          className="user-search"
+          placeholder="Search by username or email"
+          value={search}
+          onChange={(e) => setSearch(e.target.value)}
+          aria-label="Search users"
+        />
         {message && (
           <div className="app-message success" role="status">
             {message}
@@ -556,6 +584,15 @@ const UserManagement = () => {
                 ))}
               </tbody>
             </table>
+            {nextPage && (
+              <button
+                className="load-more-button"
+                onClick={loadMoreUsers}
+                disabled={actionLoading}
+              >
+                Load more users
+              </button>
+            )}
           </div>
         )}
 
@@ -2,6 +2,9 @@
 import axiosInstance from "../../utils/axiosInstance"; // ADDED: Import axiosInstance
 import React, { useRef, useState } from "react";
 
+// Only the columns this report shows (the API sends every field otherwise)
+const REPORT_FIELDS = "PropertyOwnerName,ServiceOfEstate,UPIN,kebele,placeLevel,spaceSize";
+
 const Report1 = () => {
   const [selectedProof, setSelectedProof] = useState("");
   const [records, setRecords] = useState([]);
@@ -37,7 +40,7 @@ const Report1 = () => {
       const response = await axiosInstance.get(
         `http://localhost:8000/api/records/search-by-service/?ServiceOfEstate=${encodeURIComponent(
           selectedProof
-        )}` // Added encodeURIComponent
+        )}&fields=${REPORT_FIELDS}` // Added encodeURIComponent
       );
       setRecords(response.data);
       setShowModal(true);
@@ -75,7 +78,7 @@ const Report1 = () => {
       const response = await axiosInstance.get(
         `http://localhost:8000/api/records/search-by-service/?ServiceOfEstate=${encodeURIComponent(
           selectedProof
-        )}` // Added encodeURIComponent
+        )}&fields=${REPORT_FIELDS}` // Added encodeURIComponent
       );
       setRecords(response.data);
 
@@ -1,6 +1,9 @@
 import React, { useRef, useState } from "react";
 import axiosInstance from "../../utils/axiosInstance";
 
+// Only the columns this report shows (the API sends every field otherwise)
+const REPORT_FIELDS = "PropertyOwnerName,ServiceOfEstate,UPIN,kebele,placeLevel,spaceSize";
+
 const Report2 = () => {
   const [selectedProof, setSelectedProof] = useState("");
   const [records, setRecords] = useState([]);
@@ -30,7 +33,7 @@ const Report2 = () => {
       const response = await axiosInstance.get(
         `http://localhost:8000/api/records/search-by-kebele/?kebele=${encodeURIComponent(
           selectedProof
-        )}` // Changed endpoint and parameter to 'kebele'
+        )}&fields=${REPORT_FIELDS}` // Changed endpoint and parameter to 'kebele'
       );
       setRecords(response.data);
       setShowModal(true);
@@ -68,7 +71,7 @@ const Report2 = () => {
       const response = await axiosInstance.get(
         `http://localhost:8000/api/records/search-by-kebele/?kebele=${encodeURIComponent(
           selectedProof
-        )}` // Changed endpoint and parameter to 'kebele'
+        )}&fields=${REPORT_FIELDS}` // Changed endpoint and parameter to 'kebele'
       );
       const dataToPrint = response.data;
 
@@ -2,6 +2,9 @@ import React, { useRef, useState } from "react";
 // import axios from "axios"; // REMOVED: Use axiosInstance instead
 import axiosInstance from "../../utils/axiosInstance"; // ADDED: Import axiosInstance
 
+// Only the columns this report shows (the API sends every field otherwise)
+const REPORT_FIELDS = "PropertyOwnerName,UPIN,kebele,placeLevel,proofOfPossession,spaceSize";
+
 const Report3 = () => {
   const [selectedProof, setSelectedProof] = useState("");
   const [records, setRecords] = useState([]);
@@ -37,7 +40,7 @@ const Report3 = () => {
       const response = await axiosInstance.get(
         `http://localhost:8000/api/records/search-by-proof/?proofOfPossession=${encodeURIComponent(
           selectedProof
-        )}` // Added encodeURIComponent
+        )}&fields=${REPORT_FIELDS}` // Added encodeURIComponent
       );
       setRecords(response.data);
       setShowModal(true);
@@ -75,7 +78,7 @@ const Report3 = () => {
       const response = await axiosInstance.get(
         `http://localhost:8000/api/records/search-by-proof/?proofOfPossession=${encodeURIComponent(
           selectedProof
-        )}` // Changed endpoint and parameter
+        )}&fields=${REPORT_FIELDS}` // Changed endpoint and parameter
       );
       const dataToPrint = response.data;
 
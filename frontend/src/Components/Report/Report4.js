@@ -2,6 +2,9 @@ import React, { useRef, useState } from "react";
 // import axios from "axios"; // REMOVED: Use axiosInstance instead
 import axiosInstance from "../../utils/axiosInstance"; // ADDED: Import axiosInstance
 
+// Only the columns this report shows (the API sends every field otherwise)
+const REPORT_FIELDS = "PropertyOwnerName,UPIN,kebele,placeLevel,proofOfPossession,spaceSize";
+
 const Report4 = () => {
   const [selectedKebele, setSelectedKebele] = useState(""); // CHANGED: selectedProof to selectedKebele
   const [records, setRecords] = useState([]);
@@ -33,7 +36,7 @@ const Report4 = () => {
         // CHANGED: axios.get to axiosInstance.get
         `http://localhost:8000/api/records/search-by-kebele/?kebele=${encodeURIComponent(
           selectedKebele
-        )}` // CHANGED: selectedProof to selectedKebele and parameter name
+        )}&fields=${REPORT_FIELDS}` // CHANGED: selectedProof to selectedKebele and parameter name
       );
       setRecords(response.data);
       setShowModal(true);
@@ -70,7 +73,7 @@ const Report4 = () => {
         // CHANGED: axios.get to axiosInstance.get
         `http://localhost:8000/api/records/search-by-kebele/?kebele=${encodeURIComponent(
           selectedKebele
-        )}` // CHANGED: selectedProof to selectedKebele and parameter name
+        )}&fields=${REPORT_FIELDS}` // CHANGED: selectedProof to selectedKebele and parameter name
       );
       const dataToPrint = response.data;
 
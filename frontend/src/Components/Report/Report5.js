@@ -2,6 +2,9 @@ import React, { useRef, useState } from "react";
 // import axios from "axios"; // REMOVED: Use axiosInstance instead
 import axiosInstance from "../../utils/axiosInstance"; // ADDED: Import axiosInstance
 
+// Only the columns this report shows (the API sends every field otherwise)
+const REPORT_FIELDS = "PropertyOwnerName,ServiceOfEstate,UPIN,kebele,placeLevel,possessionStatus,spaceSize";
+
 const Report5 = () => {
   const [selectedProof, setSelectedProof] = useState("");
   const [records, setRecords] = useState([]);
@@ -37,7 +40,7 @@ const Report5 = () => {
       const response = await axiosInstance.get(
         `http://localhost:8000/api/records/search-by-possession/?possessionStatus=${encodeURIComponent(
           selectedProof
-        )}` // Added encodeURIComponent
+        )}&fields=${REPORT_FIELDS}` // Added encodeURIComponent
       );
       setRecords(response.data);
       setShowModal(true);
@@ -76,7 +79,7 @@ const Report5 = () => {
         // CHANGED: axios.get to axiosInstance.get
         `http://localhost:8000/api/records/search-by-possession/?possessionStatus=${encodeURIComponent(
           selectedProof
-        )}` // Added encodeURIComponent
+        )}&fields=${REPORT_FIELDS}` // Added encodeURIComponent
       );
       const fetchedRecords = response.data;
       // setRecords(fetchedRecords); // No need to set state here, just use fetchedRecords for print content
@@ -2,6 +2,9 @@ import React, { useRef, useState } from "react";
 // import axios from "axios"; // REMOVED: Use axiosInstance instead
 import axiosInstance from "../../utils/axiosInstance"; // ADDED: Import axiosInstance
 
+// Only the columns this report shows (the API sends every field otherwise)
+const REPORT_FIELDS = "PropertyOwnerName,ServiceOfEstate,UPIN,kebele,placeLevel,spaceSize";
+
 const Report6 = () => {
   const [selectedProof, setSelectedProof] = useState(""); // This state holds the selected kebele
   const [records, setRecords] = useState([]);
@@ -34,7 +37,7 @@ const Report6 = () => {
       const response = await axiosInstance.get(
         `http://localhost:8000/api/records/search-by-kebele/?kebele=${encodeURIComponent(
           selectedProof
-        )}` // Added encodeURIComponent
+        )}&fields=${REPORT_FIELDS}` // Added encodeURIComponent
       );
       setRecords(response.data);
       setShowModal(true);
@@ -70,7 +73,7 @@ const Report6 = () => {
         // CHANGED: axios.get to axiosInstance.get
         `http://localhost:8000/api/records/search-by-kebele/?kebele=${encodeURIComponent(
           selectedProof
-        )}` // Added encodeURIComponent
+        )}&fields=${REPORT_FIELDS}` // Added encodeURIComponent
       );
       const fetchedRecords = response.data;
       // setRecords(fetchedRecords); // No need to set state here, just use fetchedRecords for print content
@@ -247,11 +247,15 @@ const authService = {
   },
 
   /**
-   * Fetches all users (admin only).
-   * @returns {Promise<Array>} - List of users.
+   * Fetches one page of users (admin only), in username order.
+   * @param {Object} [options]
+   * @param {string} [options.search] - Username or email prefix.
+   * @param {string} [options.url] - The "next" link of the previous page.
+   * @returns {Promise<Object>} - { next, previous, results }.
    */
-  getUsers: async () => {
-    const response = await fetch(`${API_BASE_URL}/accounts/users/`, {
+  getUsers: async ({ search = "", url = null } = {}) => {
+    const query = search ? `?search=${encodeURIComponent(search)}` : "";
+    const response = await fetch(url || `${API_BASE_URL}/accounts/users/${query}`, {
       method: "GET",
       headers: {
         "Content-Type": "application/json",